@@ -0,0 +1,202 @@
+import numpy as np
+
+from batch_simulation import (broadcast_params, monthly_payment, remaining_balance, simulate_chunk,
+                              default_chunk_size, SUMMARY_FIELDS)
+
+# Annual-step approximation of the batch engine for coarse screening.
+# Everything linear in the monthly terms (principal, rent, interest,
+# future-value weights) is summed in closed form: within a year each term
+# is a geometric sequence in the month, so a year costs a handful of
+# array operations instead of twelve months. Only two things are not
+# geometric: the monthly deduction cap min(interest + tax, cap) and the
+# investment clamp max(0, home cost - tax savings - rent). Interest,
+# rent and the weights are monotone in the month, so their values at
+# the first and last month of a year bound the whole year. Years where
+# the cap or the clamp is the same in both bounds are exact; in the
+# rare years where one switches, the year's sum is taken at the middle
+# of its bounds and half their width is added to the error bound.
+
+# Relative allowance for the different rounding of closed-form sums and
+# the monthly engine's sums.
+ROUNDING_ALLOWANCE = 1e-9
+
+
+def geometric_sum(log_ratio, count):
+    """sum_{j < count} exp(j * log_ratio), accurate for ratios near 1."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        total = np.expm1(count * log_ratio) / np.expm1(log_ratio)
+    return np.where(log_ratio == 0, count, total)
+
+
+def annual_chunk(cols):
+    """Approximate summary of one block of broadcast scenarios.
+
+    Returns the SUMMARY_FIELDS of simulate_chunk plus
+    "approximation_error_bound", a per-scenario bound on
+    |buy_advantage - buy_advantage of the monthly engine|.
+    """
+    home_price = cols["home_price"]
+    down_payment = home_price * cols["down_payment_pct"]
+    loan_amount = home_price * (1 - cols["down_payment_pct"])
+    property_tax_monthly = home_price * cols["property_tax_rate_annual"] / 12
+    cap_monthly = cols["property_tax_deduction_cap"] / 12
+    tax_rate = cols["tax_rate"]
+    rate = cols["mortgage_rate_annual"]
+    payment = monthly_payment(loan_amount, rate, cols["mortgage_term_years"])
+    home_cost = (payment + property_tax_monthly + cols["maintenance_annual"] / 12 +
+                 cols["insurance_annual"] / 12 + cols["hoa_monthly"])
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+
+    r = rate / 12
+    log_g = np.log1p(r)
+    log_rent = np.log1p(cols["rent_growth_annual"]) / 12
+    log_invest = np.log1p(cols["monthly_invest_growth_annual"]) / 12
+    log_alt = np.log1p(cols["alt_invest_growth_annual"]) / 12
+    # Interest in month k is payment + (r * loan - payment) * (1 + r)^(k - 1).
+    interest_step = np.where(r == 0, 0.0, r * loan_amount - payment)
+    interest_base = np.where(r == 0, 0.0, payment)
+
+    # (n, years) blocks of months first..last.
+    num_years = int(np.ceil(total_months.max() / 12))
+    first = 12 * np.arange(num_years, dtype=np.float64)[None, :] + 1
+    col = lambda values: values[:, None]
+    last = np.minimum(first + 11, col(total_months))
+    count = np.maximum(last - first + 1, 0)
+    last = np.maximum(last, first)
+
+    def interest(k):
+        return col(interest_base) + col(interest_step) * np.exp((k - 1) * col(log_g))
+
+    def rent(k):
+        return col(cols["rent_current"]) * np.exp((k - 1) * col(log_rent))
+
+    # Sums over each year of w_k, (1 + r)^(k-1) w_k and rent growth * w_k
+    # for the monthly-investment weights w_k = (1 + i)^((T - k) / 12),
+    # and of 1 and (1 + r)^(k-1) for the plain tax total.
+    weight_first = np.exp((col(total_months) - first) * col(log_invest))
+    w_sum = weight_first * geometric_sum(-col(log_invest), count)
+    w_growth = weight_first * np.exp((first - 1) * col(log_g)) * geometric_sum(col(log_g - log_invest), count)
+    w_rent = weight_first * np.exp((first - 1) * col(log_rent)) * geometric_sum(col(log_rent - log_invest), count)
+    plain_growth = np.exp((first - 1) * col(log_g)) * geometric_sum(col(log_g), count)
+
+    interest_ends = (interest(first), interest(last))
+    interest_low, interest_high = np.minimum(*interest_ends), np.maximum(*interest_ends)
+    deduction_low = np.minimum(interest_low + col(property_tax_monthly), col(cap_monthly))
+    deduction_high = np.minimum(interest_high + col(property_tax_monthly), col(cap_monthly))
+    cap_never = interest_high + col(property_tax_monthly) <= col(cap_monthly)
+    cap_always = interest_low + col(property_tax_monthly) >= col(cap_monthly)
+    deduction_mid = (deduction_low + deduction_high) / 2
+    deduction_spread = np.where(cap_never | cap_always, 0.0, (deduction_high - deduction_low) / 2)
+
+    def deduction_sum(weights, growth_weights):
+        uncapped = (col(property_tax_monthly) + col(interest_base)) * weights + col(interest_step) * growth_weights
+        return np.where(cap_never, uncapped,
+                        np.where(cap_always, col(cap_monthly) * weights, deduction_mid * weights))
+
+    weighted_deduction = deduction_sum(w_sum, w_growth)
+    total_deduction = deduction_sum(count, plain_growth)
+
+    rent_ends = (rent(first), rent(last))
+    rent_low, rent_high = np.minimum(*rent_ends), np.maximum(*rent_ends)
+    gap_low = col(home_cost) - col(tax_rate) * deduction_high - rent_high
+    gap_high = col(home_cost) - col(tax_rate) * deduction_low - rent_low
+    always_invest = gap_low >= 0
+    never_invest = gap_high <= 0
+    gap_floor = np.maximum(gap_low, 0.0)
+    exact_contribution = (col(home_cost) * w_sum - col(tax_rate) * weighted_deduction -
+                          col(cols["rent_current"]) * w_rent)
+    contribution = np.where(always_invest, exact_contribution,
+                            np.where(never_invest, 0.0, (gap_floor + gap_high) / 2 * w_sum))
+    contribution_error = np.where(always_invest, col(tax_rate) * deduction_spread * w_sum,
+                                  np.where(never_invest, 0.0, (gap_high - gap_floor) / 2 * w_sum))
+
+    fv_monthly_invest = contribution.sum(axis=1)
+    total_tax_savings = tax_rate * total_deduction.sum(axis=1)
+    tax_error = tax_rate * (deduction_spread * count).sum(axis=1)
+
+    total_rent_no_buy = cols["rent_current"] * geometric_sum(log_rent, total_months)
+    fv_principal_opportunity = ((payment - np.where(r == 0, 0.0, r * loan_amount)) *
+                                np.exp((total_months - 1) * log_alt) * geometric_sum(log_g - log_alt, total_months))
+
+    remaining_principal = remaining_balance(loan_amount, rate, payment, total_months)
+    home_value_after = home_price * (1 + cols["home_appreciation_annual"]) ** (total_months / 12)
+    selling_costs = home_value_after * cols["closing_costs_sell_pct"]
+    final_equity = home_value_after - selling_costs - remaining_principal
+    closing_costs_buy = cols["closing_costs_buy_pct"] * home_price
+    total_monthly_paid = home_cost * total_months
+    fv_down_payment = down_payment * (1 + cols["alt_invest_growth_annual"]) ** (total_months / 12)
+
+    net_cost_after_selling = (down_payment + closing_costs_buy + total_monthly_paid -
+                              total_tax_savings - final_equity)
+    fv_invest_if_rent = fv_down_payment + fv_principal_opportunity
+    owning_effective_net = fv_monthly_invest - net_cost_after_selling
+    renting_effective_net = fv_invest_if_rent - total_rent_no_buy
+
+    scale = (np.abs(fv_monthly_invest) + np.abs(total_tax_savings) + np.abs(fv_principal_opportunity) +
+             np.abs(total_rent_no_buy) + np.abs(total_monthly_paid) + np.abs(home_value_after) + home_price)
+    return {
+        "monthly_payment": payment,
+        "home_value_after": home_value_after,
+        "remaining_principal": remaining_principal,
+        "selling_costs": selling_costs,
+        "final_equity": final_equity,
+        "down_payment": down_payment,
+        "closing_costs_buy": closing_costs_buy,
+        "total_monthly_paid": total_monthly_paid,
+        "total_tax_savings": total_tax_savings,
+        "net_cost_after_selling": net_cost_after_selling,
+        "total_rent_no_buy": total_rent_no_buy,
+        "fv_monthly_invest": fv_monthly_invest,
+        "fv_down_payment": fv_down_payment,
+        "fv_principal_opportunity": fv_principal_opportunity,
+        "fv_invest_if_rent": fv_invest_if_rent,
+        "owning_effective_net": owning_effective_net,
+        "renting_effective_net": renting_effective_net,
+        "buy_advantage": owning_effective_net - renting_effective_net,
+        "approximation_error_bound": contribution_error.sum(axis=1) + tax_error + ROUNDING_ALLOWANCE * scale,
+    }
+
+
+def simulate_annual(params, chunk_size=None):
+    """Annual-step approximation of simulate_batch (summaries only).
+
+    Returns the SUMMARY_FIELDS plus "approximation_error_bound".
+    """
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    chunk_size = chunk_size or default_chunk_size(int((cols["months_live_in"] + cols["months_rent_out"]).max()))
+    results = {name: np.empty(n) for name in SUMMARY_FIELDS + ("approximation_error_bound",)}
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        summary = annual_chunk({name: col[start:stop] for name, col in cols.items()})
+        for name, values in summary.items():
+            results[name][start:stop] = values
+    return results
+
+
+def screen_batch(params, band=10000.0, max_error=None, chunk_size=None):
+    """Screen scenarios with the annual approximation, refining near break-even.
+
+    Scenarios whose approximate buy_advantage lies within `band` dollars
+    of zero, widened by their error bound (so any scenario whose sign is
+    in doubt), are re-run with the monthly engine, as are scenarios whose
+    bound exceeds max_error when one is given. Re-run rows get the exact
+    values and a bound of 0; "full_resolution" marks them.
+    """
+    cols = broadcast_params(params)
+    results = simulate_annual(cols, chunk_size)
+    bound = results["approximation_error_bound"]
+    rerun = np.abs(results["buy_advantage"]) <= band + bound
+    if max_error is not None:
+        rerun |= bound > max_error
+
+    rows = np.flatnonzero(rerun)
+    chunk_size = chunk_size or default_chunk_size(int((cols["months_live_in"] + cols["months_rent_out"]).max()))
+    for start in range(0, len(rows), chunk_size):
+        index = rows[start:start + chunk_size]
+        summary, _ = simulate_chunk({name: col[index] for name, col in cols.items()})
+        for name in SUMMARY_FIELDS:
+            results[name][index] = summary[name]
+    bound[rows] = 0.0
+    results["full_resolution"] = rerun
+    return results
@@ -1,5 +1,6 @@
 
 # entry point for the app
+from scenario import Scenario
 from simulation import simulate_scenario
 
 def input_with_default(prompt, default, value_type=float):
@@ -51,30 +52,36 @@ def main():
         rent_while_out = 0
         rent_collected_home = 0
 
+    try:
+        scenario = Scenario(
+            home_price=home_price,
+            down_payment_pct=down_payment_pct,
+            mortgage_rate_annual=mortgage_rate_annual,
+            mortgage_term_years=mortgage_term_years,
+            property_tax_rate_annual=property_tax_rate_annual,
+            maintenance_annual=maintenance_annual,
+            insurance_annual=insurance_annual,
+            hoa_monthly=hoa_monthly,
+            closing_costs_buy_pct=closing_costs_buy_pct,
+            closing_costs_sell_pct=closing_costs_sell_pct,
+            rent_current=rent_current,
+            rent_growth_annual=rent_growth_annual,
+            alt_invest_growth_annual=alt_invest_growth_annual,
+            monthly_invest_growth_annual=monthly_invest_growth_annual,
+            home_appreciation_annual=home_appreciation_annual,
+            tax_rate=tax_rate,
+            property_tax_deduction_cap=property_tax_deduction_cap,
+            months_live_in=months_live_in,
+            months_rent_out=months_rent_out,
+            rent_while_out=rent_while_out,
+            rent_collected_home=rent_collected_home
+        )
+    except ValueError as e:
+        print(f"Invalid scenario: {e}")
+        return
+
     # Run the scenario simulation
-    simulate_scenario(
-        home_price,
-        down_payment_pct,
-        mortgage_rate_annual,
-        mortgage_term_years,
-        property_tax_rate_annual,
-        maintenance_annual,
-        insurance_annual,
-        hoa_monthly,
-        closing_costs_buy_pct,
-        closing_costs_sell_pct,
-        rent_current,
-        rent_growth_annual,
-        alt_invest_growth_annual,
-        monthly_invest_growth_annual,
-        home_appreciation_annual,
-        tax_rate,
-        property_tax_deduction_cap,
-        months_live_in,
-        months_rent_out,
-        rent_while_out,
-        rent_collected_home
-    )
+    simulate_scenario(**scenario.as_dict())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,356 @@
+import argparse
+import ctypes
+import ctypes.util
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_simulation import (broadcast_params, chunk_size_for_budget,
+                              WORKING_BYTES_PER_SCENARIO_MONTH, WORKING_BYTES_PER_SCENARIO)
+
+# Throughput autotuner for the batch engine. Short calibration passes time
+# simulate_batch over a range of chunk sizes for a few horizons and
+# simulate_batch_parallel over a range of worker counts, and the winners
+# are saved as this machine's profile:
+#
+#   chunk_sizes         best chunk size per calibrated horizon (months)
+#   memory_block_bytes  working memory of the best chunks, used to size
+#                       chunks of runs with ledgers
+#   allocator           whether to keep chunk-sized blocks in the C heap
+#   workers             best worker count for parallel runs
+#   scaling             throughput against chunk size, workers and batch
+#                       size
+#
+# Every timing runs in a fresh process, as real runs do. That matters:
+# by default glibc returns each chunk's temporaries to the system as soon
+# as they are freed, and the next chunk page-faults them back in, which
+# can cost more than the arithmetic. With `allocator` set, the mmap and
+# trim thresholds are raised to the memory block size (glibc only), so
+# chunk after chunk reuses the same heap memory.
+#
+# Profiles live in one JSON file (HOMECALC_TUNING_PROFILE, by default
+# ~/.homecalc_tuning.json) keyed by a machine fingerprint, so a shared
+# home directory holds one profile per kind of machine. When no chunk
+# size or worker count is given, batch_simulation.default_chunk_size and
+# parallel_runner.default_workers read the profile for this machine and
+# fall back to the built-in defaults without one (or with a corrupt
+# file). The allocator setting changes the whole process, so only entry
+# points apply it, through apply_profile. Set
+# HOMECALC_TUNING_PROFILE=off to ignore profiles.
+
+PROFILE_VERSION = 1
+
+CALIBRATION_HORIZONS = (36, 120, 360)
+CALIBRATION_CHUNK_SIZES = (256, 512, 1024, 2048, 4096, 8192, 16384)
+CALIBRATION_BATCH_SIZES = (1000, 10000, 100000)
+
+# Scenario-months timed per chunk-size candidate (the batch is at least
+# two chunks of the largest candidate).
+CALIBRATION_CELLS = 4_000_000
+
+# mallopt parameters (malloc.h).
+M_TRIM_THRESHOLD = -1
+M_MMAP_THRESHOLD = -3
+MAX_MMAP_THRESHOLD = 32 << 20
+
+_loaded = {}
+_allocator_block = None
+
+
+def profile_path():
+    """Path of the tuning profile file, or None when profiles are turned off."""
+    path = os.environ.get("HOMECALC_TUNING_PROFILE", os.path.join(os.path.expanduser("~"), ".homecalc_tuning.json"))
+    return None if path.lower() in ("", "off", "none") else path
+
+
+def machine_fingerprint():
+    """Identifies the kind of machine a profile was measured on (not the host name)."""
+    return f"{platform.machine()}/{platform.processor() or 'unknown'}/{os.cpu_count()}cpu"
+
+
+def load_profile(path=None):
+    """This machine's saved profile, or None. Reads the file once per change.
+
+    An unreadable or corrupt profile file counts as no profile (with one
+    warning per change of the file), so batch runs fall back to the
+    built-in defaults.
+    """
+    path = path or profile_path()
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _loaded.get(path, (None,))[0] != mtime:
+        try:
+            profiles = _read_profiles(path)
+        except (OSError, ValueError) as e:
+            warnings.warn(f"Ignoring tuning profile {path}: {e}")
+            profiles = {}
+        _loaded[path] = (mtime, profiles)
+    profile = _loaded[path][1].get(machine_fingerprint())
+    if not isinstance(profile, dict) or profile.get("version") != PROFILE_VERSION:
+        return None
+    return profile
+
+
+def _read_profiles(path):
+    with open(path) as f:
+        profiles = json.load(f)
+    if not isinstance(profiles, dict):
+        raise ValueError("expected a JSON object of profiles")
+    return profiles
+
+
+def save_profile(profile, path=None):
+    """Store profile as this machine's entry, keeping other machines' entries."""
+    path = path or profile_path()
+    if path is None:
+        raise ValueError("Tuning profiles are turned off (HOMECALC_TUNING_PROFILE)")
+    profiles = {}
+    if os.path.exists(path):
+        try:
+            profiles = _read_profiles(path)
+        except ValueError:
+            # A corrupt file is replaced rather than blocking a new profile.
+            profiles = {}
+    profiles[machine_fingerprint()] = profile
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _mallopt():
+    """glibc's mallopt, or None on other C libraries."""
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c")).mallopt
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+def configure_allocator(block_bytes):
+    """Keep blocks up to block_bytes in the C heap between chunks (glibc only).
+
+    Returns True if the allocator was configured. Settings last for the
+    process and are inherited by forked workers.
+    """
+    global _allocator_block
+    if _allocator_block is not None and _allocator_block >= block_bytes:
+        return True
+    mallopt = _mallopt()
+    if mallopt is None or not (mallopt(M_MMAP_THRESHOLD, min(int(block_bytes), MAX_MMAP_THRESHOLD)) and
+            mallopt(M_TRIM_THRESHOLD, 4 * int(block_bytes))):
+        return False
+    _allocator_block = block_bytes
+    return True
+
+
+def apply_profile(path=None):
+    """Apply this machine's allocator setting to the process; returns True if configured.
+
+    Library calls only read chunk sizes and worker counts from the
+    profile. Process-wide settings are left to entry points: the
+    command-line tools call this first, and an application embedding the
+    engine can call it once at startup.
+    """
+    profile = load_profile(path)
+    if profile is None or not profile.get("allocator"):
+        return False
+    return configure_allocator(profile["memory_block_bytes"])
+
+
+def tuned_chunk_size(num_months, ledgers=False, dtype=np.float64):
+    """Profile chunk size for a batch whose longest horizon is num_months, or None.
+
+    Without ledgers the chunk size of the nearest calibrated horizon (in
+    log scale) is used; with ledgers, chunks are sized so their working
+    memory matches memory_block_bytes.
+    """
+    profile = load_profile()
+    if profile is None:
+        return None
+    if ledgers or np.dtype(dtype) != np.float64:
+        return chunk_size_for_budget(profile["memory_block_bytes"], num_months, ledgers, dtype)
+    horizons = sorted(int(h) for h in profile["chunk_sizes"])
+    nearest = min(horizons, key=lambda h: abs(np.log(h) - np.log(max(num_months, 1))))
+    return profile["chunk_sizes"][str(nearest)]
+
+
+def tuned_workers():
+    """Profile worker count, or None."""
+    profile = load_profile()
+    return None if profile is None else profile["workers"]
+
+
+def _calibration_params(num_scenarios, num_months, seed=0):
+    """Random scenarios around the app defaults, all with the given horizon."""
+    from fuzz_harness import BASE_SCENARIO
+    rng = np.random.default_rng(seed)
+    live_in = rng.integers(1, num_months + 1, num_scenarios)
+    return dict(BASE_SCENARIO,
+                home_price=rng.uniform(200000, 2000000, num_scenarios),
+                mortgage_rate_annual=rng.uniform(0.02, 0.09, num_scenarios),
+                rent_current=rng.uniform(1000, 6000, num_scenarios),
+                months_live_in=live_in, months_rent_out=num_months - live_in)
+
+
+def block_bytes(chunk_size, num_months):
+    """Working memory of one chunk without ledgers (see batch_simulation)."""
+    return chunk_size * (num_months * WORKING_BYTES_PER_SCENARIO_MONTH[(False, 8)] + WORKING_BYTES_PER_SCENARIO)
+
+
+def _timing_task(task):
+    """Worker: best scenarios/s of one configuration, measured in a fresh process."""
+    num_scenarios, horizon, chunk_size, workers, allocator_bytes, repeats = task
+    if allocator_bytes:
+        configure_allocator(allocator_bytes)
+    from parallel_runner import simulate_batch_parallel
+    cols = broadcast_params(_calibration_params(num_scenarios, horizon))
+    best = float("inf")
+    for _ in range(repeats):
+        began = time.perf_counter()
+        simulate_batch_parallel(cols, workers=workers, chunk_size=chunk_size)
+        best = min(best, time.perf_counter() - began)
+    return num_scenarios / best
+
+
+def _measure(num_scenarios, horizon, chunk_size, workers=1, allocator_bytes=None, repeats=2):
+    """Run _timing_task in a new spawned process so no allocator state carries over."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_timing_task, (num_scenarios, horizon, chunk_size, workers,
+                                          allocator_bytes, repeats)).result()
+
+
+def calibrate_chunk_sizes(horizons=CALIBRATION_HORIZONS, chunk_sizes=CALIBRATION_CHUNK_SIZES,
+                          cells=CALIBRATION_CELLS, repeats=2, log=None):
+    """Time simulate_batch per chunk size for each horizon, with and without allocator tuning.
+
+    Returns {horizon: [(chunk_size, scenarios/s default, scenarios/s tuned), ...]};
+    the tuned rate is None where the allocator cannot be configured.
+    """
+    timings = {}
+    for horizon in horizons:
+        n = max(cells // horizon, 2 * max(chunk_sizes))
+        timings[horizon] = []
+        for chunk_size in chunk_sizes:
+            default = _measure(n, horizon, chunk_size, repeats=repeats)
+            tuned = None
+            if _mallopt() is not None:
+                tuned = _measure(n, horizon, chunk_size, allocator_bytes=block_bytes(chunk_size, horizon),
+                                 repeats=repeats)
+            timings[horizon].append((chunk_size, default, tuned))
+            if log:
+                log(f"  {horizon} months, chunks of {chunk_size}: {default:,.0f} scenarios/s" +
+                    (f", {tuned:,.0f} with allocator tuning" if tuned else ""))
+    return timings
+
+
+def calibrate_workers(chunk_size, horizon=120, allocator_bytes=None, worker_counts=None, repeats=2, log=None):
+    """Time simulate_batch_parallel per worker count; returns [(workers, scenarios per second), ...]."""
+    cpus = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, cpus} | {2 ** i for i in range(1, cpus.bit_length()) if 2 ** i < cpus})
+    n = 4 * chunk_size * max(worker_counts)
+    timings = []
+    for workers in worker_counts:
+        rate = _measure(n, horizon, chunk_size, workers, allocator_bytes, repeats)
+        timings.append((workers, rate))
+        if log:
+            log(f"  {workers} workers: {rate:,.0f} scenarios/s")
+    return timings
+
+
+def calibrate_batch_sizes(chunk_size, workers, horizon=120, allocator_bytes=None,
+                          batch_sizes=CALIBRATION_BATCH_SIZES, repeats=2, log=None):
+    """Throughput of tuned runs per batch size; returns [(batch size, scenarios per second), ...]."""
+    timings = []
+    for n in batch_sizes:
+        rate = _measure(n, horizon, chunk_size, workers, allocator_bytes, repeats)
+        timings.append((n, rate))
+        if log:
+            log(f"  {n:,} scenarios: {rate:,.0f} scenarios/s")
+    return timings
+
+
+def autotune(quick=False, log=None):
+    """Run every calibration pass and return the profile (not saved)."""
+    horizons = CALIBRATION_HORIZONS[:2] if quick else CALIBRATION_HORIZONS
+    chunk_sizes = CALIBRATION_CHUNK_SIZES[1:-1] if quick else CALIBRATION_CHUNK_SIZES
+    cells = CALIBRATION_CELLS // 4 if quick else CALIBRATION_CELLS
+    repeats = 1 if quick else 2
+
+    if log:
+        log("Chunk size:")
+    chunk_timings = calibrate_chunk_sizes(horizons, chunk_sizes, cells, repeats, log)
+    # Allocator tuning is worth it when it beats the best default setting
+    # by a clear margin on most horizons.
+    wins = sum(max(t[2] or 0 for t in timings) > 1.05 * max(t[1] for t in timings)
+               for timings in chunk_timings.values())
+    allocator = wins * 2 > len(chunk_timings)
+    column = 2 if allocator else 1
+    best_chunks = {horizon: max(timings, key=lambda t: t[column])[0] for horizon, timings in chunk_timings.items()}
+    memory_block = int(np.median([block_bytes(chunk, horizon) for horizon, chunk in best_chunks.items()]))
+    allocator_bytes = memory_block if allocator else None
+
+    reference_horizon = min(best_chunks, key=lambda h: abs(h - 120))
+    chunk_size = best_chunks[reference_horizon]
+    if log:
+        log("Workers:")
+    worker_timings = calibrate_workers(chunk_size, reference_horizon, allocator_bytes, repeats=repeats, log=log)
+    workers = max(worker_timings, key=lambda t: t[1])[0]
+    if log:
+        log("Batch size:")
+    batch_sizes = CALIBRATION_BATCH_SIZES[:2] if quick else CALIBRATION_BATCH_SIZES
+    batch_timings = calibrate_batch_sizes(chunk_size, workers, reference_horizon, allocator_bytes,
+                                          batch_sizes, repeats, log)
+
+    return {
+        "version": PROFILE_VERSION,
+        "created": time.time(),
+        "machine": {"fingerprint": machine_fingerprint(), "cpus": os.cpu_count(),
+                    "processor": platform.processor() or platform.machine(), "numpy": np.__version__},
+        "chunk_sizes": {str(horizon): chunk for horizon, chunk in best_chunks.items()},
+        "memory_block_bytes": memory_block,
+        "allocator": bool(allocator),
+        "workers": workers,
+        "scaling": {
+            "chunk_size": {str(horizon): timings for horizon, timings in chunk_timings.items()},
+            "workers": worker_timings,
+            "batch_size": batch_timings,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate chunk size and worker count for this machine")
+    parser.add_argument("--quick", action="store_true", help="fewer, shorter calibration passes")
+    parser.add_argument("--no-save", action="store_true", help="only print the report")
+    parser.add_argument("--report", action="store_true", help="print the saved profile without calibrating")
+    parser.add_argument("--profile", help="profile file (default: HOMECALC_TUNING_PROFILE or ~/.homecalc_tuning.json)")
+    args = parser.parse_args(argv)
+
+    from display_utils import display_tuning_report
+    if args.report:
+        profile = load_profile(args.profile)
+        if profile is None:
+            raise SystemExit("No tuning profile for this machine; run autotune.py first")
+    else:
+        profile = autotune(quick=args.quick, log=print)
+    display_tuning_report(profile)
+    if not (args.report or args.no_save):
+        print(f"Saved profile to {save_profile(profile, args.profile)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import csv
+import re
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from batch_simulation import broadcast_params, default_chunk_size, simulate_paths
+
+# Historical rent-vs-buy backtest. Each start month opens a window of
+# months_live_in + months_rent_out months in which the scenario uses the
+# realized mortgage rate at origination, home price index, rent index and
+# market returns instead of the constant *_growth_annual inputs.
+#
+# Market returns are turned into one cumulative-product index up front;
+# every window is then a strided view into the long series, so all
+# windows share the same arrays and no per-window growth is recomputed.
+
+
+_MONTH_PATTERN = re.compile(r"(\d{4})[-/](\d{1,2})(?:[-/]\d{1,2})?")
+
+
+def parse_month(text):
+    """Read "2005-01", "2005-01-31" or "2005/1" as a "YYYY-MM" string."""
+    match = _MONTH_PATTERN.fullmatch(text.strip())
+    if match is None or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"Cannot read {text!r} as a year and month")
+    return f"{int(match.group(1)):04d}-{int(match.group(2)):02d}"
+
+
+def _month_number(date):
+    year, month = date.split("-")
+    return int(year) * 12 + int(month) - 1
+
+
+def load_series(path, value_column=None, date_column="date"):
+    """Load a (date, value) monthly series from a CSV file.
+
+    Dates are read as year and month (see parse_month) and returned as
+    "YYYY-MM" strings; a month that appears twice is a ValueError. If
+    value_column is not given, the first non-date column is used. Rows
+    with an empty value are skipped.
+    """
+    dates = []
+    values = []
+    seen = set()
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if value_column is None:
+            value_column = next(name for name in reader.fieldnames if name != date_column)
+        for row in reader:
+            value = row[value_column].strip()
+            if not value:
+                continue
+            try:
+                date = parse_month(row[date_column])
+            except ValueError as e:
+                raise ValueError(f"{path}, line {reader.line_num}: {e}") from None
+            if date in seen:
+                raise ValueError(f"{path}, line {reader.line_num}: month {date} appears twice")
+            seen.add(date)
+            dates.append(date)
+            values.append(float(value))
+    return dates, np.array(values)
+
+
+def load_history(mortgage_rates_csv, home_prices_csv, rents_csv, market_csv,
+                 rates_in_percent=False, market_is_index=False):
+    """Load and align the four historical series on their common months.
+
+    mortgage rates are annual (0.065, or 6.5 with rates_in_percent),
+    home prices and rents are index levels, and the market file holds
+    monthly total returns (0.01 for 1%) unless market_is_index is set,
+    in which case it holds index levels. Returns a dict with "dates",
+    "mortgage_rate", "home_index", "rent_index" and "market_index"
+    (the cumulative product of returns, one entry longer than the
+    return series so it starts at 1.0 before the first month). The
+    common months must be consecutive: a month missing from any series
+    inside the common range is a ValueError, since every window assumes
+    one row per month.
+    """
+    loaded = {
+        "mortgage_rate": load_series(mortgage_rates_csv),
+        "home_index": load_series(home_prices_csv),
+        "rent_index": load_series(rents_csv),
+        "market": load_series(market_csv),
+    }
+    common = set(loaded["mortgage_rate"][0])
+    for dates, _ in loaded.values():
+        common &= set(dates)
+    dates = sorted(common)
+    if not dates:
+        raise ValueError("The historical series have no dates in common")
+    months = np.array([_month_number(date) for date in dates])
+    gaps = np.flatnonzero(np.diff(months) != 1)
+    if len(gaps):
+        first = gaps[0]
+        raise ValueError(f"The historical series have a gap between {dates[first]} and {dates[first + 1]} "
+                         f"({len(gaps)} gap(s) in total)")
+
+    aligned = {}
+    for name, (series_dates, values) in loaded.items():
+        position = {date: i for i, date in enumerate(series_dates)}
+        aligned[name] = values[[position[date] for date in dates]]
+
+    if rates_in_percent:
+        aligned["mortgage_rate"] = aligned["mortgage_rate"] / 100
+    if market_is_index:
+        market_returns = aligned["market"][1:] / aligned["market"][:-1] - 1
+        market_returns = np.append(market_returns, 0.0)
+    else:
+        market_returns = aligned["market"]
+
+    return {
+        "dates": dates,
+        "mortgage_rate": aligned["mortgage_rate"],
+        "home_index": aligned["home_index"],
+        "rent_index": aligned["rent_index"],
+        "market_index": np.concatenate([[1.0], np.cumprod(1 + market_returns)]),
+    }
+
+
+def run_backtest(history, params, chunk_size=None):
+    """Run a scenario for every start month that has a full window of history.
+
+    `params` is a single scenario (all PARAMETER_NAMES); its mortgage rate
+    and growth rates are replaced by the realized series. Month k of a
+    window starting at s uses rent and home index levels from row s + k
+    and the market return of month s + k. Returns a dict with the start
+    "dates" and (windows,) arrays of the summary fields.
+    """
+    cols = broadcast_params(params)
+    if len(cols["home_price"]) != 1:
+        raise ValueError("run_backtest takes a single scenario")
+    window = int(cols["months_live_in"][0] + cols["months_rent_out"][0])
+
+    num_rows = len(history["dates"])
+    num_windows = num_rows - window
+    if num_windows < 1:
+        raise ValueError(f"History has {num_rows} months, needs more than {window}")
+
+    home_windows = sliding_window_view(history["home_index"], window + 1)
+    rent_windows = sliding_window_view(history["rent_index"], window + 1)
+    market_windows = sliding_window_view(history["market_index"][:num_rows], window + 1)
+    rates = history["mortgage_rate"][:num_windows]
+
+    chunk_size = chunk_size or default_chunk_size(window)
+    results = None
+    for start in range(0, num_windows, chunk_size):
+        stop = min(start + chunk_size, num_windows)
+        summary, _ = simulate_paths(
+            params, home_windows[start:stop], rent_windows[start:stop],
+            market_windows[start:stop], mortgage_rate=rates[start:stop])
+        if results is None:
+            results = {name: np.empty(num_windows) for name in summary}
+        for name, values in summary.items():
+            results[name][start:stop] = values
+
+    results["dates"] = history["dates"][:num_windows]
+    return results
+
+
+def summarize_backtest(results, percentiles=(5, 25, 50, 75, 95)):
+    """Distribution of buy_advantage across start dates."""
+    advantage = results["buy_advantage"]
+    best = int(np.argmax(advantage))
+    worst = int(np.argmin(advantage))
+    return {
+        "windows": len(advantage),
+        "mean": float(advantage.mean()),
+        "std": float(advantage.std()),
+        "percentiles": {p: float(v) for p, v in zip(percentiles, np.percentile(advantage, percentiles))},
+        "buy_wins_share": float((advantage > 0).mean()),
+        "best_start": (results["dates"][best], float(advantage[best])),
+        "worst_start": (results["dates"][worst], float(advantage[worst])),
+    }
@@ -0,0 +1,394 @@
+import argparse
+import csv
+import html
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from string import Formatter
+
+import numpy as np
+
+from batch_simulation import broadcast_params, simulate_chunk, PARAMETER_NAMES, SUMMARY_FIELDS
+from parallel_runner import default_workers
+from rollups import period_firsts, period_sums
+
+# Client reports for many scenarios at once. Each report carries the
+# same numbers as display_results (summary, costs, investments, final
+# comparison, rent progression and yearly amortization) as a text,
+# Markdown or HTML file. Templates are compiled once into functions that
+# join pre-split literals and formatted fields, tables are laid out by a
+# small fixed-format formatter instead of tabulate, and the yearly
+# tables are rolled up from the chunk's ledgers in one pass.
+# Worker processes each simulate, render and write one chunk of
+# scenarios, so only small status tuples travel between processes.
+
+REPORT_FORMATS = {"text": ".txt", "markdown": ".md", "html": ".html"}
+
+DEFAULT_REPORT_CHUNK = 500
+
+_BODY = {
+    "text": """{title}
+--------------- SUMMARY AFTER PERIOD ---------------
+Home value after {years:.1f} years: ${home_value_after:,.2f}
+Remaining loan principal: ${remaining_principal:,.2f}
+Selling costs: ${selling_costs:,.2f}
+Final Equity if sold: ${final_equity:,.2f}
+
+--- Costs of Owning Scenario ---
+Down payment: ${down_payment:,.2f}
+Closing costs on buying: ${closing_costs_buy:,.2f}
+Total monthly paid: ${total_monthly_paid:,.2f}
+Total tax savings: ${total_tax_savings:,.2f}
+Net cost after selling: ${net_cost_after_selling:,.2f}
+
+--- Rent Scenario (No Buy) ---
+Total rent paid (if never bought): ${total_rent_no_buy:,.2f}
+
+--- Investment Calculations ---
+Value of monthly difference investment: ${fv_monthly_invest:,.2f}
+Value if renting and investing principal/down payment: ${fv_invest_if_rent:,.2f}
+
+--- Final Comparison ---
+Owning effective net position: ${owning_effective_net:,.2f}
+Renting effective net position: ${renting_effective_net:,.2f}
+Conclusion: {conclusion}
+
+--- Rent Progression (Annual) ---
+{rent_table}
+
+--- Amortization by Year ---
+{amortization_table}
+""",
+    "markdown": """# {title}
+
+## Summary after {years:.1f} years
+
+| | |
+|---|---:|
+| Home value | ${home_value_after:,.2f} |
+| Remaining loan principal | ${remaining_principal:,.2f} |
+| Selling costs | ${selling_costs:,.2f} |
+| Final equity if sold | ${final_equity:,.2f} |
+
+## Costs of owning
+
+| | |
+|---|---:|
+| Down payment | ${down_payment:,.2f} |
+| Closing costs on buying | ${closing_costs_buy:,.2f} |
+| Total monthly paid | ${total_monthly_paid:,.2f} |
+| Total tax savings | ${total_tax_savings:,.2f} |
+| Net cost after selling | ${net_cost_after_selling:,.2f} |
+
+## Renting and investing
+
+| | |
+|---|---:|
+| Total rent paid (if never bought) | ${total_rent_no_buy:,.2f} |
+| Value of monthly difference investment | ${fv_monthly_invest:,.2f} |
+| Value if renting and investing principal/down payment | ${fv_invest_if_rent:,.2f} |
+
+## Final comparison
+
+| | |
+|---|---:|
+| Owning effective net position | ${owning_effective_net:,.2f} |
+| Renting effective net position | ${renting_effective_net:,.2f} |
+
+**Conclusion:** {conclusion}
+
+## Rent progression
+
+{rent_table}
+
+## Amortization by year
+
+{amortization_table}
+""",
+    "html": """<section class="report">
+<h1>{title}</h1>
+<h2>Summary after {years:.1f} years</h2>
+<table>
+<tr><td>Home value</td><td>${home_value_after:,.2f}</td></tr>
+<tr><td>Remaining loan principal</td><td>${remaining_principal:,.2f}</td></tr>
+<tr><td>Selling costs</td><td>${selling_costs:,.2f}</td></tr>
+<tr><td>Final equity if sold</td><td>${final_equity:,.2f}</td></tr>
+</table>
+<h2>Costs of owning</h2>
+<table>
+<tr><td>Down payment</td><td>${down_payment:,.2f}</td></tr>
+<tr><td>Closing costs on buying</td><td>${closing_costs_buy:,.2f}</td></tr>
+<tr><td>Total monthly paid</td><td>${total_monthly_paid:,.2f}</td></tr>
+<tr><td>Total tax savings</td><td>${total_tax_savings:,.2f}</td></tr>
+<tr><td>Net cost after selling</td><td>${net_cost_after_selling:,.2f}</td></tr>
+</table>
+<h2>Renting and investing</h2>
+<table>
+<tr><td>Total rent paid (if never bought)</td><td>${total_rent_no_buy:,.2f}</td></tr>
+<tr><td>Value of monthly difference investment</td><td>${fv_monthly_invest:,.2f}</td></tr>
+<tr><td>Value if renting and investing principal/down payment</td><td>${fv_invest_if_rent:,.2f}</td></tr>
+</table>
+<h2>Final comparison</h2>
+<table>
+<tr><td>Owning effective net position</td><td>${owning_effective_net:,.2f}</td></tr>
+<tr><td>Renting effective net position</td><td>${renting_effective_net:,.2f}</td></tr>
+</table>
+<p><strong>Conclusion:</strong> {conclusion}</p>
+<h2>Rent progression</h2>
+{rent_table}
+<h2>Amortization by year</h2>
+{amortization_table}
+</section>
+""",
+}
+
+_DOCUMENT = {
+    "text": ("", "", "\n"),
+    "markdown": ("", "", "\n---\n\n"),
+    "html": ("<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>Buy vs Rent</title>\n"
+             "<style>table{border-collapse:collapse}td,th{padding:2px 8px;text-align:right}</style>\n"
+             "</head>\n<body>\n", "</body>\n</html>\n", ""),
+}
+
+_CONCLUSIONS = ("Renting the entire period is more favorable.",
+                "Buying and then renting out is more favorable.")
+
+_CONVERSIONS = {"r": repr, "s": str, "a": ascii}
+
+
+def compile_template(template):
+    """Compile a str.format template into a function of one mapping.
+
+    The template is parsed once; the returned function only looks up and
+    formats the fields (e.g. "{price:,.2f}") and joins the pieces.
+    """
+    pieces = [(literal, field, spec or "", _CONVERSIONS[conversion] if conversion else None)
+              for literal, field, spec, conversion in Formatter().parse(template)]
+
+    def render(row):
+        out = []
+        for literal, field, spec, convert in pieces:
+            out.append(literal)
+            if field is not None:
+                value = row[field]
+                out.append(format(convert(value) if convert else value, spec))
+        return "".join(out)
+
+    return render
+
+
+def format_table(headers, columns, fmt="text"):
+    """Lay out string columns as a table in the report format.
+
+    The text layout matches tabulate's "pretty" format (centered cells).
+    """
+    if fmt == "markdown":
+        lines = ["| " + " | ".join(headers) + " |", "|" + "|".join("---:" for _ in headers) + "|"]
+        lines.extend("| " + " | ".join(row) + " |" for row in zip(*columns))
+        return "\n".join(lines)
+    if fmt == "html":
+        head = "".join(f"<th>{html.escape(h)}</th>" for h in headers)
+        body = "".join("<tr><td>" + "</td><td>".join(row) + "</td></tr>\n" for row in zip(*columns))
+        return f"<table>\n<tr>{head}</tr>\n{body}</table>"
+
+    widths = [max(len(header), max(map(len, column), default=0)) + 2 for header, column in zip(headers, columns)]
+    rule = "+" + "+".join("-" * width for width in widths) + "+"
+    lines = [rule, "|" + "|".join(h.center(w) for h, w in zip(headers, widths)) + "|", rule]
+    lines.extend("|" + "|".join(cell.center(w) for cell, w in zip(row, widths)) + "|" for row in zip(*columns))
+    lines.append(rule)
+    return "\n".join(lines)
+
+
+_MARKDOWN_SPECIAL = re.compile(r"([\\`*_\[\]<>#|~!()&])")
+
+
+def escape_markdown(text):
+    """Backslash-escape the characters Markdown would treat as markup.
+
+    Line breaks become spaces so a name cannot end the heading it is in.
+    """
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", " ".join(str(text).splitlines()))
+
+
+# How names are made safe for each report format.
+_ESCAPES = {"text": str, "markdown": escape_markdown, "html": html.escape}
+
+
+def _safe_name(name):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(name)) or "report"
+
+
+def _file_stems(names):
+    """Unique file names for the reports; names that sanitize to the same
+    file (ignoring case) get a "_2", "_3", ... suffix in scenario order."""
+    stems, taken = [], set()
+    for name in names:
+        stem = base = _safe_name(name)
+        suffix = 1
+        while stem.lower() in taken:
+            suffix += 1
+            stem = f"{base}_{suffix}"
+        taken.add(stem.lower())
+        stems.append(stem)
+    return stems
+
+
+def render_reports(summary, monthly, total_months, names, fmt="text"):
+    """Render one report per scenario of a chunk simulated with ledgers; returns a list of strings."""
+    render = compile_template(_BODY[fmt])
+    escape = _ESCAPES[fmt]
+    principal = period_sums(monthly["monthly_principal_paid"])
+    interest = period_sums(monthly["monthly_interest_paid"])
+    yearly_rent = period_firsts(monthly["monthly_rent_if_no_buy"])
+    total_months = total_months.tolist()
+    values = {name: summary[name].tolist() for name in SUMMARY_FIELDS}
+
+    reports = []
+    for i, name in enumerate(names):
+        row = {field: column[i] for field, column in values.items()}
+        months = int(total_months[i])
+        years = -(-months // 12)
+        rents = yearly_rent[i, :months // 12].tolist()
+        row["title"] = escape(f"Buy vs Rent: {name}")
+        row["years"] = months / 12
+        row["conclusion"] = _CONCLUSIONS[row["owning_effective_net"] > row["renting_effective_net"]]
+        row["rent_table"] = format_table(
+            ["Year", "Monthly Rent"],
+            [[str(year) for year in range(1, len(rents) + 1)], [f"${rent:,.2f}" for rent in rents]], fmt)
+        row["amortization_table"] = format_table(
+            ["Year", "Principal Paid", "Interest Paid"],
+            [[str(year) for year in range(1, years + 1)],
+             [f"${value:,.2f}" for value in principal[i, :years].tolist()],
+             [f"${value:,.2f}" for value in interest[i, :years].tolist()]], fmt)
+        reports.append(render(row))
+    return reports
+
+
+def _report_chunk(task):
+    """Simulate, render and write one chunk; returns (files written, bytes, text or None)."""
+    cols, names, stems, output_dir, fmt, combined = task
+    summary, monthly = simulate_chunk(cols, ledgers=True)
+    reports = render_reports(summary, monthly, cols["months_live_in"] + cols["months_rent_out"], names, fmt)
+    if combined:
+        text = _DOCUMENT[fmt][2].join(reports)
+        return len(reports), len(text.encode()), text
+
+    head, tail, _ = _DOCUMENT[fmt]
+    written = 0
+    for stem, report in zip(stems, reports):
+        with open(os.path.join(output_dir, stem + REPORT_FORMATS[fmt]), "w", encoding="utf-8") as f:
+            written += f.write(head) + f.write(report) + f.write(tail)
+    return len(reports), written, None
+
+
+def _bounded_map(pool, fn, tasks, window):
+    """pool.map that keeps at most `window` tasks in flight, in task order.
+
+    Executor.map submits every task up front, which would slice and
+    pickle all chunks before the first one is written.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_reports(params, output_dir, fmt="text", names=None, workers=None,
+                  chunk_size=DEFAULT_REPORT_CHUNK, combined=False):
+    """Write a report for every scenario in `params` to output_dir.
+
+    One file per scenario, named after `names` (default "scenario_000000",
+    ...), or with combined=True a single "reports" file holding all of
+    them in scenario order, streamed to disk chunk by chunk. Chunks are
+    rendered by `workers` processes. Returns a dict with "reports",
+    "bytes" and "seconds".
+    """
+    if fmt not in REPORT_FORMATS:
+        raise ValueError(f"Unknown report format {fmt!r}; use one of {', '.join(REPORT_FORMATS)}")
+    began = time.perf_counter()
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    names = [f"scenario_{i:06d}" for i in range(n)] if names is None else list(names)
+    if len(names) != n:
+        raise ValueError(f"Got {len(names)} names for {n} scenarios")
+    os.makedirs(output_dir, exist_ok=True)
+
+    stems = _file_stems(names)
+    tasks = ((({name: col[start:start + chunk_size] for name, col in cols.items()},
+               names[start:start + chunk_size], stems[start:start + chunk_size], output_dir, fmt, combined))
+             for start in range(0, n, chunk_size))
+    workers = workers or default_workers()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and n > chunk_size else None
+    results = _bounded_map(pool, _report_chunk, tasks, 2 * workers) if pool is not None else map(_report_chunk, tasks)
+
+    total_reports = total_bytes = 0
+    try:
+        if combined:
+            head, tail, separator = _DOCUMENT[fmt]
+            with open(os.path.join(output_dir, "reports" + REPORT_FORMATS[fmt]), "w", encoding="utf-8") as f:
+                total_bytes += f.write(head)
+                for count, _, text in results:
+                    if total_reports:
+                        total_bytes += f.write(separator)
+                    total_bytes += f.write(text)
+                    total_reports += count
+                total_bytes += f.write(tail)
+        else:
+            for count, written, _ in results:
+                total_reports += count
+                total_bytes += written
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return {"reports": total_reports, "bytes": total_bytes, "seconds": time.perf_counter() - began}
+
+
+def load_scenarios_csv(path, base=None):
+    """Columns and names from a CSV with one scenario per row.
+
+    Columns named after PARAMETER_NAMES override the values in `base`; an
+    optional "name" column names the reports.
+    """
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    params = dict(base or {})
+    for name in PARAMETER_NAMES:
+        if rows and name in rows[0]:
+            params[name] = np.array([float(row[name]) for row in rows])
+    names = [row["name"] for row in rows] if rows and "name" in rows[0] else None
+    return params, names
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write buy vs rent reports for many scenarios")
+    parser.add_argument("scenarios", help="CSV file with one scenario per row (and an optional name column)")
+    parser.add_argument("output_dir")
+    parser.add_argument("--base", help="JSON file with default values for inputs missing from the CSV")
+    parser.add_argument("--format", choices=sorted(REPORT_FORMATS), default="text")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--combined", action="store_true", help="write one file holding every report")
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    base = None
+    if args.base:
+        with open(args.base) as f:
+            base = json.load(f)
+    params, names = load_scenarios_csv(args.scenarios, base)
+    stats = write_reports(params, args.output_dir, args.format, names, args.workers, combined=args.combined)
+    print(f"Wrote {stats['reports']:,} reports ({stats['bytes'] / 2 ** 20:,.1f} MB) "
+          f"in {stats['seconds']:,.2f}s to {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,642 @@
+import numpy as np
+
+from memory_profile import parse_memory_size, profile_stage
+
+# Vectorized version of simulation.simulate_scenario. Every input can be a
+# scalar or a sequence; scenarios are evaluated together as (scenarios x
+# months) arrays in fixed-size chunks, with the same month-by-month
+# semantics as the loop (monthly tax cap, clamped investment contribution,
+# amortization continuing past the horizon, ...).
+
+PARAMETER_NAMES = (
+    "home_price",
+    "down_payment_pct",
+    "mortgage_rate_annual",
+    "mortgage_term_years",
+    "property_tax_rate_annual",
+    "maintenance_annual",
+    "insurance_annual",
+    "hoa_monthly",
+    "closing_costs_buy_pct",
+    "closing_costs_sell_pct",
+    "rent_current",
+    "rent_growth_annual",
+    "alt_invest_growth_annual",
+    "monthly_invest_growth_annual",
+    "home_appreciation_annual",
+    "tax_rate",
+    "property_tax_deduction_cap",
+    "months_live_in",
+    "months_rent_out",
+    "rent_while_out",
+    "rent_collected_home",
+)
+
+SUMMARY_FIELDS = (
+    "monthly_payment",
+    "home_value_after",
+    "remaining_principal",
+    "selling_costs",
+    "final_equity",
+    "down_payment",
+    "closing_costs_buy",
+    "total_monthly_paid",
+    "total_tax_savings",
+    "net_cost_after_selling",
+    "total_rent_no_buy",
+    "fv_monthly_invest",
+    "fv_down_payment",
+    "fv_principal_opportunity",
+    "fv_invest_if_rent",
+    "owning_effective_net",
+    "renting_effective_net",
+    "buy_advantage",
+)
+
+LEDGER_FIELDS = (
+    "monthly_interest_paid",
+    "monthly_principal_paid",
+    "monthly_total_home_cost",
+    "monthly_tax_savings",
+    "monthly_investment_contribution",
+    "monthly_home_value",
+    "monthly_equity",
+    "monthly_rent_if_no_buy",
+)
+
+DEFAULT_CHUNK_SIZE = 4096
+
+# Peak working memory of simulate_chunk per scenario-month, keyed by
+# (ledgers, ledger itemsize): tracemalloc peaks of about 84/48/156/92
+# bytes (roughly ten (n, months) temporaries without ledgers) plus
+# headroom. Each scenario also needs a fixed amount for its columns.
+WORKING_BYTES_PER_SCENARIO_MONTH = {(False, 8): 96, (False, 4): 56, (True, 8): 180, (True, 4): 104}
+WORKING_BYTES_PER_SCENARIO = 1024
+
+
+def broadcast_params(params):
+    """Turn a mapping of scalars/sequences into equal-length float64 columns."""
+    missing = [name for name in PARAMETER_NAMES if name not in params]
+    if missing:
+        raise ValueError(f"Missing scenario parameters: {', '.join(missing)}")
+
+    columns = [np.atleast_1d(np.asarray(params[name], dtype=np.float64))
+               for name in PARAMETER_NAMES]
+    columns = np.broadcast_arrays(*columns)
+    cols = {name: np.ascontiguousarray(col) for name, col in zip(PARAMETER_NAMES, columns)}
+
+    if np.any(cols["months_live_in"] + cols["months_rent_out"] < 1):
+        raise ValueError("Every scenario needs at least one month (months_live_in + months_rent_out)")
+    return cols
+
+
+def monthly_payment(loan_amount, mortgage_rate_annual, mortgage_term_years):
+    """Vectorized PropertyCosts.calculate_monthly_payment (zero rates allowed)."""
+    r = np.asarray(mortgage_rate_annual, dtype=np.float64) / 12
+    n = np.asarray(mortgage_term_years, dtype=np.float64) * 12
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + r) ** n
+        payment = loan_amount * (r * growth) / (growth - 1)
+    return np.where(r == 0, loan_amount / n, payment)
+
+
+def remaining_balance(loan_amount, mortgage_rate_annual, payment, months):
+    """Balance after `months` scheduled payments, matching the loop's update.
+
+    Like simulate_scenario the schedule is not stopped at the end of the
+    term, so horizons longer than the term run the balance negative.
+    """
+    r = np.asarray(mortgage_rate_annual, dtype=np.float64) / 12
+    growth = (1 + r) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance = loan_amount * growth - payment * (growth - 1) / r
+    return np.where(r == 0, loan_amount - payment * months, balance)
+
+
+def rate_path_schedule(loan_amount, rates, mortgage_term_years):
+    """Balances (n, months + 1) and payments (n, months) of a loan whose rate follows `rates`.
+
+    `rates` holds the annual rate charged in each month. Whenever it
+    changes, the payment is re-amortized over the rest of the term (an
+    adjustable-rate reset); past the end of the term the last payment
+    continues, as in the fixed-rate schedule.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    n, num_months = rates.shape
+    term_months = np.broadcast_to(np.asarray(mortgage_term_years, dtype=np.float64) * 12, (n,))
+    balance = np.empty((n, num_months + 1))
+    balance[:, 0] = loan_amount
+    payments = np.empty((n, num_months))
+    payment = monthly_payment(loan_amount, rates[:, 0], term_months / 12)
+    for k in range(num_months):
+        if k:
+            reset = (rates[:, k] != rates[:, k - 1]) & (term_months > k)
+            if reset.any():
+                payment = np.where(reset, monthly_payment(balance[:, k], rates[:, k],
+                                                          np.maximum(term_months - k, 1) / 12), payment)
+        payments[:, k] = payment
+        balance[:, k + 1] = balance[:, k] * (1 + rates[:, k] / 12) - payment
+    return balance, payments
+
+
+def rent_side(rent_current, rent_growth_annual, alt_invest_growth_annual,
+              monthly_invest_growth_annual, total_months, num_months, dtype=np.float64,
+              annual_rent_steps=False):
+    """Renting-side arrays shared by every listing with the same baseline.
+
+    Inputs broadcast against each other; the month axis is appended last.
+    Month slots beyond a scenario's horizon get zero weight. Growth
+    factors are exp(exponent * log-rate) with the log-rates taken in
+    float64, so a float32 `dtype` only rounds the final factors.
+    annual_rent_steps raises the rent once a year instead of every month.
+    """
+    k = np.arange(1, num_months + 1, dtype=np.float64)
+    total_months = np.asarray(total_months, dtype=np.float64)[..., None]
+    mask = k <= total_months
+    months_left = np.where(mask, total_months - k, 0.0).astype(dtype)
+
+    def log_rate(annual_rate, scale):
+        return (np.log1p(np.asarray(annual_rate, dtype=np.float64)) * scale)[..., None].astype(dtype)
+
+    rent_years = np.floor((k - 1) / 12) if annual_rent_steps else (k - 1) / 12
+    rent = np.asarray(rent_current, dtype=np.float64)[..., None].astype(dtype) * \
+        np.exp(rent_years.astype(dtype) * log_rate(rent_growth_annual, 1.0))
+    rent = np.where(mask, rent, 0.0)
+
+    return {
+        "mask": mask,
+        "monthly_rent_if_no_buy": rent,
+        "total_rent_no_buy": rent.sum(axis=-1, dtype=np.float64),
+        "alt_weights": np.where(mask, np.exp(months_left * log_rate(alt_invest_growth_annual, 1 / 12)), 0.0),
+        "invest_weights": np.where(mask, np.exp(months_left * log_rate(monthly_invest_growth_annual, 1 / 12)), 0.0),
+        "down_payment_growth": (1 + np.asarray(alt_invest_growth_annual, dtype=np.float64)) **
+                               (total_months[..., 0] / 12),
+    }
+
+
+def rental_cash_flow(cols, num_months):
+    """Landlord cash flow (n, num_months) of the rent-out months, zero in the others.
+
+    This is RentalScenario.calculate_monthly_cashflow: rent collected
+    minus rent paid elsewhere, both growing with rent_growth_annual from
+    the start of the horizon (rental_operations gives the stochastic
+    version as "monthly_landlord_cash_flow").
+    """
+    months = np.arange(num_months)
+    growth = np.exp(months * (np.log1p(cols["rent_growth_annual"]) / 12)[:, None])
+    live_in = cols["months_live_in"][:, None]
+    renting_out = (months >= live_in) & (months < live_in + cols["months_rent_out"][:, None])
+    return np.where(renting_out, (cols["rent_collected_home"] - cols["rent_while_out"])[:, None] * growth, 0.0)
+
+
+def buy_side(cols, rent, total_months, num_months, ledgers=False, home_growth=None,
+             dtype=np.float64, tax_savings=None, sale_taxes=None, contribution_cost=None,
+             schedule=None, rental_cash_flow=None):
+    """Owning-side kernel for a block of listings against precomputed rent arrays.
+
+    `cols` holds (n,) listing columns, `rent` is the output of rent_side
+    (or path_side) either per row (n, months) or shared (months,).
+    `home_growth` optionally replaces the constant appreciation with
+    realized (n, months) home value factors for months 1..months.
+    Returns the summary columns and, if requested, the (n, months) ledgers.
+
+    `dtype` is the storage type of the (n, months) ledgers. The balance
+    schedule and every sum over months stay in float64.
+
+    `tax_savings` optionally replaces the monthly capped deduction with
+    (n, months) tax savings, and `sale_taxes` adds (n,) taxes due on the
+    sale to the net cost (see tax_engine).
+
+    `contribution_cost` optionally replaces the monthly cost whose excess
+    over rent is invested (home cost minus tax savings): it is called as
+    contribution_cost(interest, principal, month_home_cost, tax_savings)
+    and returns (n, months) costs (see cost_models).
+
+    `schedule` optionally replaces the fixed-rate amortization with the
+    (balances, payments, rates) of rate_path_schedule; "monthly_payment"
+    is then the first month's payment.
+
+    `rental_cash_flow` optionally credits (n, months) landlord cash flow
+    (see rental_cash_flow) to the owner: its total is reported as
+    "total_rental_cash_flow" and taken off the net cost.
+    """
+    home_price = cols["home_price"]
+    down_payment = home_price * cols["down_payment_pct"]
+    loan_amount = home_price * (1 - cols["down_payment_pct"])
+    property_tax_annual = home_price * cols["property_tax_rate_annual"]
+    rate = cols["mortgage_rate_annual"]
+    if schedule is None:
+        payment = monthly_payment(loan_amount, rate, cols["mortgage_term_years"])
+        k = np.arange(0, num_months + 1, dtype=np.float64)
+        balance = remaining_balance(loan_amount[:, None], rate[:, None], payment[:, None], k)
+        payments, rates = payment[:, None], rate[:, None]
+    else:
+        balance, payments, rates = schedule
+        payment = payments[:, 0]
+    interest_64 = balance[:, :-1] * (rates / 12)
+    interest = interest_64.astype(dtype, copy=False)
+    principal = (payments - interest_64).astype(dtype, copy=False)
+    del interest_64
+
+    # (n, 1) for a fixed payment, (n, months) along a rate path.
+    home_cost = (payments + (property_tax_annual / 12)[:, None] + (cols["maintenance_annual"] / 12)[:, None] +
+                 (cols["insurance_annual"] / 12)[:, None] + cols["hoa_monthly"][:, None])
+    month_home_cost = home_cost[:, 0]
+    if tax_savings is None:
+        monthly_deductible = np.minimum(interest + (property_tax_annual / 12)[:, None].astype(dtype),
+                                        (cols["property_tax_deduction_cap"] / 12)[:, None].astype(dtype))
+        tax_savings = monthly_deductible * cols["tax_rate"][:, None].astype(dtype)
+    else:
+        tax_savings = tax_savings.astype(dtype, copy=False)
+    if contribution_cost is None:
+        invested_cost = home_cost.astype(dtype) - tax_savings
+    else:
+        invested_cost = contribution_cost(interest, principal, month_home_cost, tax_savings).astype(dtype, copy=False)
+    contribution = np.maximum(0, invested_cost - rent["monthly_rent_if_no_buy"])
+
+    mask = rent["mask"]
+    total_months = np.asarray(total_months, dtype=np.float64)
+    months_idx = total_months.astype(np.int64)
+    remaining_principal = balance[np.arange(len(home_price)), months_idx]
+
+    if home_growth is None:
+        home_value_after = home_price * (1 + cols["home_appreciation_annual"]) ** (total_months / 12)
+    else:
+        home_value_after = home_price * np.take_along_axis(
+            home_growth, np.broadcast_to(months_idx - 1, home_price.shape)[:, None], axis=1)[:, 0]
+    selling_costs = home_value_after * cols["closing_costs_sell_pct"]
+    final_equity = home_value_after - selling_costs - remaining_principal
+    closing_costs_buy = cols["closing_costs_buy_pct"] * home_price
+
+    if schedule is None:
+        total_monthly_paid = month_home_cost * total_months
+    else:
+        total_monthly_paid = np.where(mask, home_cost, 0.0).sum(axis=-1)
+    total_tax_savings = np.where(mask, tax_savings, 0.0).sum(axis=-1, dtype=np.float64)
+    fv_monthly_invest = (contribution * rent["invest_weights"]).sum(axis=-1, dtype=np.float64)
+    fv_down_payment = down_payment * rent["down_payment_growth"]
+    fv_principal_opportunity = (principal * rent["alt_weights"]).sum(axis=-1, dtype=np.float64)
+
+    total_buying_cost = down_payment + closing_costs_buy + total_monthly_paid - total_tax_savings
+    net_cost_after_selling = total_buying_cost - final_equity
+    if sale_taxes is not None:
+        net_cost_after_selling = net_cost_after_selling + sale_taxes
+    if rental_cash_flow is not None:
+        total_rental_cash_flow = np.where(mask, rental_cash_flow, 0.0).sum(axis=-1)
+        net_cost_after_selling = net_cost_after_selling - total_rental_cash_flow
+    fv_invest_if_rent = fv_down_payment + fv_principal_opportunity
+    owning_effective_net = fv_monthly_invest - net_cost_after_selling
+    renting_effective_net = fv_invest_if_rent - rent["total_rent_no_buy"]
+
+    summary = {
+        "monthly_payment": payment,
+        "home_value_after": home_value_after,
+        "remaining_principal": remaining_principal,
+        "selling_costs": selling_costs,
+        "final_equity": final_equity,
+        "down_payment": down_payment,
+        "closing_costs_buy": closing_costs_buy,
+        "total_monthly_paid": total_monthly_paid,
+        "total_tax_savings": total_tax_savings,
+        "net_cost_after_selling": net_cost_after_selling,
+        "total_rent_no_buy": np.broadcast_to(rent["total_rent_no_buy"], home_price.shape),
+        "fv_monthly_invest": fv_monthly_invest,
+        "fv_down_payment": fv_down_payment,
+        "fv_principal_opportunity": fv_principal_opportunity,
+        "fv_invest_if_rent": fv_invest_if_rent,
+        "owning_effective_net": owning_effective_net,
+        "renting_effective_net": renting_effective_net,
+        "buy_advantage": owning_effective_net - renting_effective_net,
+    }
+    if sale_taxes is not None:
+        summary["sale_taxes"] = sale_taxes
+    if rental_cash_flow is not None:
+        summary["total_rental_cash_flow"] = total_rental_cash_flow
+    if not ledgers:
+        return summary, None
+
+    if home_growth is None:
+        months = np.arange(1, num_months + 1, dtype=np.float64)
+        home_value = home_price[:, None] * (1 + cols["home_appreciation_annual"][:, None]) ** (months / 12)
+    else:
+        home_value = home_price[:, None] * home_growth
+    monthly = {
+        "monthly_interest_paid": interest,
+        "monthly_principal_paid": principal,
+        "monthly_total_home_cost": np.broadcast_to(home_cost.astype(dtype), interest.shape),
+        "monthly_tax_savings": tax_savings,
+        "monthly_investment_contribution": contribution,
+        "monthly_home_value": home_value.astype(dtype, copy=False),
+        "monthly_equity": (home_value - balance[:, 1:]).astype(dtype, copy=False),
+        "monthly_rent_if_no_buy": np.broadcast_to(rent["monthly_rent_if_no_buy"], interest.shape),
+    }
+    monthly = {name: np.where(mask, values, 0.0) for name, values in monthly.items()}
+    return summary, monthly
+
+
+def path_side(rent_current, rent_index, invest_index, alt_index=None):
+    """Renting-side arrays from realized (n, months + 1) index paths.
+
+    Column 0 of every index is the level at the start of the window. Rent
+    in month k is rent_current scaled by the rent index at the start of
+    that month; a contribution made at the end of month i grows by
+    invest_index[months] / invest_index[i]. The alternative investment
+    (down payment and principal) follows alt_index, defaulting to the
+    same market as the monthly difference investment.
+    """
+    alt_index = invest_index if alt_index is None else alt_index
+    rent = np.asarray(rent_current, dtype=np.float64)[:, None] * rent_index[:, :-1] / rent_index[:, :1]
+    return {
+        "mask": np.ones(rent.shape, dtype=bool),
+        "monthly_rent_if_no_buy": rent,
+        "total_rent_no_buy": rent.sum(axis=-1),
+        "alt_weights": alt_index[:, -1:] / alt_index[:, 1:],
+        "invest_weights": invest_index[:, -1:] / invest_index[:, 1:],
+        "down_payment_growth": alt_index[:, -1] / alt_index[:, 0],
+    }
+
+
+def simulate_paths(params, home_index, rent_index, invest_index, alt_index=None,
+                   mortgage_rate=None, ledgers=False):
+    """Evaluate scenarios along realized or simulated market paths.
+
+    The index arrays are (n, months + 1) levels (any normalization) and
+    replace the constant *_growth_annual rates; `mortgage_rate` optionally
+    replaces mortgage_rate_annual per row (e.g. the rate at origination).
+    Every scenario's months_live_in + months_rent_out must equal `months`.
+    A 2-D (n, months) `mortgage_rate` is the rate charged in each month
+    of an adjustable-rate loan (see rate_path_schedule).
+    """
+    home_index = np.asarray(home_index, dtype=np.float64)
+    rent_index = np.asarray(rent_index, dtype=np.float64)
+    invest_index = np.asarray(invest_index, dtype=np.float64)
+    if alt_index is not None:
+        alt_index = np.asarray(alt_index, dtype=np.float64)
+    n, width = home_index.shape
+    num_months = width - 1
+
+    params = dict(params)
+    rates = None
+    if mortgage_rate is not None:
+        mortgage_rate = np.asarray(mortgage_rate, dtype=np.float64)
+        if mortgage_rate.ndim == 2:
+            rates = mortgage_rate
+            mortgage_rate = rates[:, 0]
+        params["mortgage_rate_annual"] = mortgage_rate
+    cols = broadcast_params(params)
+    cols = {name: np.ascontiguousarray(np.broadcast_to(col, (n,))) for name, col in cols.items()}
+    if np.any(cols["months_live_in"] + cols["months_rent_out"] != num_months):
+        raise ValueError(f"Index paths cover {num_months} months but scenarios use a different horizon")
+
+    rent = path_side(cols["rent_current"], rent_index, invest_index, alt_index)
+    home_growth = home_index[:, 1:] / home_index[:, :1]
+    schedule = None
+    if rates is not None:
+        loan_amount = cols["home_price"] * (1 - cols["down_payment_pct"])
+        schedule = rate_path_schedule(loan_amount, rates, cols["mortgage_term_years"]) + (rates,)
+    return buy_side(cols, rent, num_months, num_months, ledgers=ledgers, home_growth=home_growth,
+                    schedule=schedule)
+
+
+def float32_error_bound(cols, summary):
+    """Per-scenario bound on |buy_advantage(float32) - buy_advantage(float64)|.
+
+    In float32 mode every ledger entry (rent, growth weight, interest,
+    principal, tax saving, contribution) is a few float32 operations on
+    exactly rounded float64 inputs, plus an exp() whose argument x
+    carries a relative error of one rounding. Each entry is therefore
+    within (8 + |x|max) * eps32 of its float64 value relative to the
+    magnitude of its operands, where |x|max is the largest growth
+    exponent in the scenario. The clamps (max(0, .), min(., cap)) are
+    1-Lipschitz and all sums are accumulated in float64, so errors add
+    up linearly over the month terms:
+
+        bound = (8 + |x|max) * eps32 * (
+            w_invest * (T * home_cost + tax_savings + rent)
+            + w_alt * T * (payment + r * max|balance|)
+            + tax_savings + rent)
+
+    with w_* the largest future-value weight, T the horizon, and the
+    totals taken from the float64-accumulated summary. The terminal
+    quantities (home value, remaining balance, down payment growth) are
+    computed in float64 and contribute nothing.
+    """
+    eps = float(np.finfo(np.float32).eps)
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+    log_invest = np.log1p(cols["monthly_invest_growth_annual"]) / 12 * (total_months - 1)
+    log_alt = np.log1p(cols["alt_invest_growth_annual"]) / 12 * (total_months - 1)
+    log_rent = np.abs(np.log1p(cols["rent_growth_annual"])) / 12 * (total_months - 1)
+    exponent = np.maximum.reduce([np.abs(log_invest), np.abs(log_alt), log_rent])
+
+    w_invest = np.exp(np.maximum(log_invest, 0))
+    w_alt = np.exp(np.maximum(log_alt, 0))
+    loan_amount = cols["home_price"] * (1 - cols["down_payment_pct"])
+    max_balance = np.maximum(np.abs(loan_amount), np.abs(summary["remaining_principal"]))
+    home_cost = summary["total_monthly_paid"] / total_months
+    tax_savings = np.abs(summary["total_tax_savings"])
+    rent = np.abs(summary["total_rent_no_buy"])
+
+    magnitude = (w_invest * (total_months * np.abs(home_cost) + tax_savings + rent) +
+                 w_alt * total_months * (np.abs(summary["monthly_payment"]) +
+                                         np.abs(cols["mortgage_rate_annual"]) / 12 * max_balance) +
+                 tax_savings + rent)
+    return (8 + exponent) * eps * magnitude
+
+
+def simulate_chunk(cols, ledgers=False, dtype=np.float64, tax_rules=None, rental_income=False):
+    """Run one block of scenarios whose columns are already broadcast.
+
+    With a tax_engine.TaxRules as `tax_rules`, taxes come from the annual
+    tax engine instead of the monthly capped deduction. rental_income=True
+    credits the landlord cash flow of the rent-out months to the owner
+    (see rental_cash_flow), with or without tax_rules; the default engine,
+    like simulate_scenario, leaves it out.
+    """
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+    num_months = int(total_months.max())
+    rent = rent_side(cols["rent_current"], cols["rent_growth_annual"],
+                     cols["alt_invest_growth_annual"], cols["monthly_invest_growth_annual"],
+                     total_months, num_months, dtype=dtype)
+    tax_savings = sale_taxes = cash_flow = None
+    if tax_rules is not None:
+        from tax_engine import annual_taxes, monthly_tax_savings
+        taxes = annual_taxes(cols, tax_rules)
+        tax_savings = monthly_tax_savings(taxes, total_months, num_months)
+        sale_taxes = taxes["sale_taxes"]
+    if rental_income:
+        cash_flow = rental_cash_flow(cols, num_months)
+    summary, monthly = buy_side(cols, rent, total_months, num_months, ledgers=ledgers, dtype=dtype,
+                                tax_savings=tax_savings, sale_taxes=sale_taxes, rental_cash_flow=cash_flow)
+    if np.dtype(dtype) == np.float32:
+        summary["float32_error_bound"] = float32_error_bound(cols, summary)
+    return summary, monthly
+
+
+def chunk_size_for_budget(memory_budget, num_months, ledgers=False, dtype=np.float64):
+    """Largest chunk whose working memory stays within memory_budget.
+
+    memory_budget is bytes or a string like "2GB"; num_months is the
+    longest horizon in the batch.
+    """
+    budget = parse_memory_size(memory_budget)
+    per_month = WORKING_BYTES_PER_SCENARIO_MONTH[(bool(ledgers), np.dtype(dtype).itemsize)]
+    chunk_size = int(budget // (num_months * per_month + WORKING_BYTES_PER_SCENARIO))
+    if chunk_size < 1:
+        raise ValueError(f"A memory budget of {budget:,} bytes cannot fit one {num_months}-month scenario")
+    return chunk_size
+
+
+def longest_horizon(cols):
+    """Longest horizon (months) of broadcast scenario columns; 0 for an empty batch."""
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+    return int(total_months.max()) if len(total_months) else 0
+
+
+def default_chunk_size(num_months, ledgers=False, dtype=np.float64):
+    """Chunk size used when none is given.
+
+    This is the autotune profile's choice for this machine and horizon,
+    or DEFAULT_CHUNK_SIZE without a profile (see autotune).
+    """
+    from autotune import tuned_chunk_size
+    return tuned_chunk_size(num_months, ledgers, dtype) or DEFAULT_CHUNK_SIZE
+
+
+def iter_batch_chunks(params, ledgers=False, chunk_size=None, dtype=np.float64,
+                      memory_budget=None, profiler=None, tax_rules=None, rental_income=False):
+    """Yield (start, stop, summary, ledgers) for consecutive chunks of scenarios.
+
+    Lets callers stream results (aggregate, write, plot) without ever
+    holding every scenario's output at once. chunk_size defaults to
+    default_chunk_size for the longest horizon. With a memory_budget the
+    chunk size is capped so one chunk's working memory fits in it. A
+    MemoryProfiler passed as `profiler` records each chunk under the
+    "simulation" stage.
+    """
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    max_months = longest_horizon(cols)
+    chunk_size = chunk_size or default_chunk_size(max_months, ledgers, dtype)
+    if memory_budget is not None:
+        chunk_size = min(chunk_size, chunk_size_for_budget(memory_budget, max_months, ledgers, dtype))
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = {name: col[start:stop] for name, col in cols.items()}
+        with profile_stage(profiler, "simulation"):
+            summary, monthly = simulate_chunk(chunk, ledgers=ledgers, dtype=dtype, tax_rules=tax_rules,
+                                              rental_income=rental_income)
+        yield start, stop, summary, monthly
+
+
+def simulate_batch(params, ledgers=False, chunk_size=None, dtype=np.float64,
+                   memory_budget=None, profiler=None, tax_rules=None, rental_income=False):
+    """Evaluate many scenarios at once.
+
+    `params` maps every name in PARAMETER_NAMES to a scalar or a sequence
+    (all sequences must have the same length). Returns a dict of (n,)
+    summary arrays keyed by SUMMARY_FIELDS; with ledgers=True the dict
+    also holds (n, max_months) monthly ledgers keyed by LEDGER_FIELDS,
+    zero-padded past each scenario's horizon.
+
+    dtype=np.float32 is the compact mode for very large jobs: ledgers
+    are stored (and returned) as float32, halving memory traffic, while
+    balances and all month sums stay float64. Summaries then include
+    "float32_error_bound", a per-scenario bound on the deviation of
+    buy_advantage from the float64 engine (see float32_error_bound).
+
+    memory_budget (bytes or e.g. "2GB") covers the inputs and returned
+    arrays plus the working memory of one chunk; chunks are sized to fit
+    what is left, and a ValueError is raised if the results alone do not
+    fit (stream with iter_batch_chunks instead). Stages are recorded in
+    `profiler` ("simulation" and "collect") when one is given.
+
+    tax_rules (a tax_engine.TaxRules) switches to the annual tax engine;
+    summaries then include "sale_taxes". rental_income=True credits the
+    landlord cash flow to the owner and reports it as
+    "total_rental_cash_flow" (see simulate_chunk).
+    """
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    max_months = longest_horizon(cols)
+
+    fields = SUMMARY_FIELDS + (("float32_error_bound",) if np.dtype(dtype) == np.float32 else ())
+    if tax_rules is not None:
+        fields += ("sale_taxes",)
+    if rental_income:
+        fields += ("total_rental_cash_flow",)
+    if memory_budget is not None:
+        budget = parse_memory_size(memory_budget)
+        held = n * (len(PARAMETER_NAMES) + len(fields)) * 8
+        if ledgers:
+            held += len(LEDGER_FIELDS) * n * max_months * np.dtype(dtype).itemsize
+        if held >= budget:
+            raise ValueError(f"Inputs and results need {held:,} bytes, over the memory budget of "
+                             f"{budget:,}; use iter_batch_chunks to stream them")
+        memory_budget = budget - held
+
+    results = {name: np.empty(n) for name in fields}
+    if ledgers:
+        for name in LEDGER_FIELDS:
+            results[name] = np.zeros((n, max_months), dtype=dtype)
+
+    for start, stop, summary, monthly in iter_batch_chunks(cols, ledgers, chunk_size, dtype,
+                                                           memory_budget, profiler, tax_rules,
+                                                           rental_income):
+        with profile_stage(profiler, "collect"):
+            for name, values in summary.items():
+                results[name][start:stop] = values
+            if monthly is not None:
+                for name, values in monthly.items():
+                    results[name][start:stop, :values.shape[1]] = values
+    return results
+
+
+def grid_size(axes):
+    """Number of scenarios in the cartesian product of the sweep axes."""
+    size = 1
+    for values in axes.values():
+        size *= len(values)
+    return size
+
+
+def grid_params(base, axes, start=0, stop=None):
+    """Scenario columns for flat indices [start, stop) of a parameter sweep.
+
+    `axes` maps parameter names to the values to sweep; the grid is their
+    cartesian product in C order (last axis fastest). Parameters not in
+    `axes` come from `base`. Any slice can be built on its own, so chunks
+    of a huge sweep never need the full grid in memory.
+    """
+    names = list(axes)
+    shape = tuple(len(axes[name]) for name in names)
+    stop = grid_size(axes) if stop is None else stop
+    index = np.unravel_index(np.arange(start, stop), shape)
+
+    params = dict(base)
+    for name, positions in zip(names, index):
+        params[name] = np.asarray(axes[name], dtype=np.float64)[positions]
+    return params
+
+
+def sweep_months(base, axes):
+    """Longest horizon in the grid `axes` over `base`."""
+    return int(sum(max(np.atleast_1d(axes.get(name, base.get(name))))
+                   for name in ("months_live_in", "months_rent_out")))
+
+
+def sweep_grid(base, axes, field="buy_advantage", chunk_size=None):
+    """One summary field over a parameter sweep, shaped like the grid.
+
+    The result has one dimension per axis, in the order of `axes`
+    (e.g. rows = first axis, columns = second for a 2-D sweep).
+    """
+    shape = tuple(len(values) for values in axes.values())
+    result = np.empty(shape)
+    flat = result.reshape(-1)
+    chunk_size = chunk_size or default_chunk_size(sweep_months(base, axes))
+    for start in range(0, flat.size, chunk_size):
+        stop = min(start + chunk_size, flat.size)
+        summary, _ = simulate_chunk(broadcast_params(grid_params(base, axes, start, stop)))
+        flat[start:stop] = summary[field]
+    return result
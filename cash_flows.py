@@ -0,0 +1,163 @@
+import numpy as np
+
+from batch_simulation import broadcast_params, default_chunk_size, simulate_chunk
+
+# Monthly cash-flow streams and their IRR / NPV, for comparing buying and
+# renting with a single discount rate instead of the engine's separate
+# investment growth rates. Streams are (scenarios x months + 1) arrays:
+# column 0 is the day of purchase, column k the end of month k, and
+# columns past a scenario's horizon are zero (which leaves both NPV and
+# IRR unchanged).
+#
+#   owning:      -(down payment + buying costs) at 0, -(home cost - tax
+#                savings) every month, + equity after selling at the horizon
+#   renting:     -rent every month
+#   buy_vs_rent: owning - renting, i.e. what buying costs or returns over
+#                renting; its IRR is the return earned by buying
+
+
+def discount_vector(discount_rate_annual, num_months):
+    """Discount factors (1 + rate) ** (-k / 12) for k = 0..num_months.
+
+    A sequence of rates gives one row per rate.
+    """
+    rates = np.asarray(discount_rate_annual, dtype=np.float64)[..., None]
+    k = np.arange(num_months + 1, dtype=np.float64)
+    return np.exp(-k / 12 * np.log1p(rates))
+
+
+def npv(cash_flows, discount_rate_annual):
+    """Net present value of monthly streams at an annual discount rate.
+
+    cash_flows is (n, months + 1); a scalar rate gives (n,), a sequence
+    of k rates gives (k, n).
+    """
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    return discount_vector(discount_rate_annual, cash_flows.shape[-1] - 1) @ cash_flows.T
+
+
+def _npv_and_slope(cash_flows, rate, k):
+    """NPV at a per-period rate (one per row) and its derivative in the rate."""
+    log_v = -np.log1p(rate)[:, None]
+    weights = np.exp(k * log_v)
+    value = (cash_flows * weights).sum(axis=1)
+    slope = -(cash_flows * k * weights).sum(axis=1) / (1 + rate)
+    return value, slope
+
+
+def irr(cash_flows, guess=0.005, tol=1e-10, max_iter=50):
+    """Per-period internal rate of return of each row of cash_flows.
+
+    Vectorized Newton iteration from `guess`; rows that fail to converge
+    (or leave rate > -1) are solved by bisection on (-0.5, 1] per period,
+    widened upwards while the NPV keeps its sign. Rows without a sign
+    change in NPV over that range get NaN. Streams with several sign
+    changes may have several IRRs; the one Newton reaches is returned.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=np.float64))
+    n, width = cash_flows.shape
+    k = np.arange(width, dtype=np.float64)
+    rate = np.full(n, float(guess))
+    active = np.arange(n)
+    converged = np.zeros(n, dtype=bool)
+
+    with np.errstate(all="ignore"):
+        for _ in range(max_iter):
+            if active.size == 0:
+                break
+            value, slope = _npv_and_slope(cash_flows[active], rate[active], k)
+            step = value / slope
+            new_rate = rate[active] - step
+            bad = ~np.isfinite(new_rate) | (new_rate <= -1)
+            done = ~bad & (np.abs(step) <= tol * (1 + np.abs(new_rate)))
+            rate[active] = np.where(bad, np.nan, new_rate)
+            converged[active[done]] = True
+            active = active[~done & ~bad]
+
+        failed = np.flatnonzero(~converged)
+        if failed.size:
+            rate[failed] = _bisect(cash_flows[failed], k, tol)
+    return rate
+
+
+def _bisect(cash_flows, k, tol):
+    """Bisection fallback of irr for the rows Newton could not solve."""
+    lo = np.full(len(cash_flows), -0.5)
+    hi = np.ones(len(cash_flows))
+    value_lo, _ = _npv_and_slope(cash_flows, lo, k)
+    value_hi, _ = _npv_and_slope(cash_flows, hi, k)
+    for _ in range(10):
+        widen = np.sign(value_hi) == np.sign(value_lo)
+        if not widen.any():
+            break
+        hi = np.where(widen, hi * 4, hi)
+        value_hi = np.where(widen, _npv_and_slope(cash_flows, hi, k)[0], value_hi)
+    bracketed = np.sign(value_hi) != np.sign(value_lo)
+
+    while np.any(bracketed & (hi - lo > tol * (1 + np.abs(lo)))):
+        mid = (lo + hi) / 2
+        value_mid, _ = _npv_and_slope(cash_flows, mid, k)
+        lower = np.sign(value_mid) == np.sign(value_lo)
+        lo = np.where(lower, mid, lo)
+        value_lo = np.where(lower, value_mid, value_lo)
+        hi = np.where(lower, hi, mid)
+    return np.where(bracketed, (lo + hi) / 2, np.nan)
+
+
+def annualize(monthly_rate):
+    """Compound a monthly rate to an annual one."""
+    return (1 + np.asarray(monthly_rate, dtype=np.float64)) ** 12 - 1
+
+
+def scenario_cash_flows(cols, summary, monthly):
+    """Owning, renting and buy_vs_rent streams for one engine chunk.
+
+    `summary` and `monthly` come from simulate_chunk(cols, ledgers=True).
+    """
+    n, num_months = monthly["monthly_tax_savings"].shape
+    total_months = (cols["months_live_in"] + cols["months_rent_out"]).astype(np.int64)
+
+    owning = np.zeros((n, num_months + 1))
+    owning[:, 0] = -(summary["down_payment"] + summary["closing_costs_buy"])
+    owning[:, 1:] = monthly["monthly_tax_savings"] - monthly["monthly_total_home_cost"]
+    owning[np.arange(n), total_months] += summary["final_equity"]
+
+    renting = np.zeros((n, num_months + 1))
+    renting[:, 1:] = -monthly["monthly_rent_if_no_buy"]
+    return {"owning": owning, "renting": renting, "buy_vs_rent": owning - renting}
+
+
+def iter_cash_flows(params, chunk_size=None):
+    """Yield (start, stop, streams) for consecutive chunks of scenarios."""
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    chunk_size = chunk_size or default_chunk_size(int((cols["months_live_in"] + cols["months_rent_out"]).max()),
+                                                  ledgers=True)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = {name: col[start:stop] for name, col in cols.items()}
+        summary, monthly = simulate_chunk(chunk, ledgers=True)
+        yield start, stop, scenario_cash_flows(chunk, summary, monthly)
+
+
+def evaluate_returns(params, discount_rate_annual=0.05, chunk_size=None):
+    """IRR and NPV of buying and renting for every scenario.
+
+    Returns a dict of (n,) arrays: owning_npv, renting_npv, buy_vs_rent_npv
+    at discount_rate_annual, and the annualized owning_irr and
+    buy_vs_rent_irr (NaN where a stream has no IRR). Renting has only
+    outflows, so it has no IRR. owning_npv at a zero rate equals
+    -net_cost_after_selling from the engine.
+    """
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    fields = ("owning_npv", "renting_npv", "buy_vs_rent_npv", "owning_irr", "buy_vs_rent_irr")
+    results = {name: np.empty(n) for name in fields}
+
+    for start, stop, streams in iter_cash_flows(cols, chunk_size):
+        discount = discount_vector(discount_rate_annual, streams["owning"].shape[1] - 1)
+        for name in ("owning", "renting", "buy_vs_rent"):
+            results[f"{name}_npv"][start:stop] = streams[name] @ discount
+        results["owning_irr"][start:stop] = annualize(irr(streams["owning"]))
+        results["buy_vs_rent_irr"][start:stop] = annualize(irr(streams["buy_vs_rent"]))
+    return results
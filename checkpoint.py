@@ -0,0 +1,204 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_simulation import broadcast_params, grid_params, grid_size, simulate_chunk
+from job_queue import resolve_chunk_size, with_default_chunk_size
+from memory_profile import MemoryProfiler, profile_stage
+from parallel_runner import default_workers, map_chunks
+from stochastic_economy import EconomyModel, monte_carlo_chunk, STREAM_PATHS
+from streaming_stats import NetPositionAggregator
+
+# Checkpoint/resume for long batch sweeps and Monte Carlo runs. Runs use
+# the same JSON specs as job_queue. Chunks are computed (in parallel) in
+# small windows and their partial aggregates are always merged in chunk
+# order, so the aggregate after chunk i is the same no matter when or
+# how often the run was interrupted. The checkpoint stores the completed
+# chunk range, the merged aggregate, the RNG stream position and the
+# spec with its resolved chunk size (so a resumed run chunks the same
+# way even if the autotune profile changed), and is replaced atomically
+# so a crash mid-write leaves the previous one intact.
+
+CHECKPOINT_VERSION = 1
+
+
+def run_key(spec):
+    """Stable identifier of a run spec, used to refuse mismatched checkpoints."""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def num_chunks(spec):
+    """Number of chunks of a spec with a resolved chunk size."""
+    total = grid_size(spec["sweep"]) if spec["kind"] == "sweep" else spec["num_paths"]
+    return -(-total // spec["chunk_size"])
+
+
+def save_checkpoint(path, state):
+    """Write state as JSON atomically (temp file, fsync, rename, fsync dir)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def load_checkpoint(path, spec):
+    """Return the saved state for this spec, or None if there is no checkpoint.
+
+    The state's "spec" is the run's spec with its resolved chunk size.
+    Monte Carlo checkpoints from before paths were drawn in fixed stream
+    blocks are refused, since resuming them would mix two sets of draws.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("version") != CHECKPOINT_VERSION or state.get("run_key") != run_key(spec):
+        raise ValueError(f"Checkpoint {path} belongs to a different run; remove it or use another path")
+    rng = state.get("rng")
+    if rng is not None and rng.get("paths_per_stream") != STREAM_PATHS:
+        raise ValueError(f"Checkpoint {path} was drawn with different random streams; remove it to start over")
+    if "spec" not in state:
+        # Written before chunk sizes were stored: those runs used fixed defaults.
+        state["spec"] = dict(spec, chunk_size=spec.get("chunk_size", 4096 if spec["kind"] == "sweep" else 2048))
+    return state
+
+
+def _chunk_aggregate(task, profiler=None):
+    """Compute one chunk of a spec and return its partial aggregate."""
+    spec, chunk_index = task
+    if spec["kind"] == "sweep":
+        chunk_size = spec["chunk_size"]
+        start = chunk_index * chunk_size
+        stop = min(start + chunk_size, grid_size(spec["sweep"]))
+        with profile_stage(profiler, "simulation"):
+            summary, _ = simulate_chunk(broadcast_params(grid_params(spec["base"], spec["sweep"], start, stop)))
+        with profile_stage(profiler, "aggregation"):
+            aggregator = NetPositionAggregator()
+            aggregator.update(summary)
+        return aggregator
+
+    model = EconomyModel(**spec.get("economy", {}))
+    return monte_carlo_chunk((spec["params"], model, spec["num_paths"], spec["chunk_size"],
+                              spec.get("seed", 0), chunk_index), profiler)
+
+
+def run_checkpointed(spec, checkpoint_path, workers=None, checkpoint_every=60.0, profiler=None):
+    """Run a sweep or Monte Carlo spec, resuming from checkpoint_path if present.
+
+    A checkpoint is written whenever checkpoint_every seconds have passed
+    since the last one (0 checkpoints after every window of chunks) and
+    once more at the end. A spec without a chunk size gets the default
+    (see job_queue.with_default_chunk_size) when the run starts; resumed
+    runs keep it. The returned NetPositionAggregator is bit-identical to
+    the one an uninterrupted run produces. With a MemoryProfiler the
+    chunks are computed in this process and the simulation, aggregation
+    and checkpoint stages are recorded.
+    """
+    spec = resolve_chunk_size(spec)
+    key = run_key(spec)
+    workers = 1 if profiler is not None else workers or default_workers()
+    state = load_checkpoint(checkpoint_path, spec)
+    if state is None:
+        spec = with_default_chunk_size(spec)
+        aggregator = NetPositionAggregator()
+        next_chunk = 0
+    else:
+        spec = state["spec"]
+        aggregator = NetPositionAggregator.from_state(state["aggregate"])
+        next_chunk = state["completed_chunks"][1]
+    total_chunks = num_chunks(spec)
+
+    def checkpoint():
+        with profile_stage(profiler, "checkpoint"):
+            save_checkpoint(checkpoint_path, {
+                "version": CHECKPOINT_VERSION,
+                "run_key": key,
+                "spec": spec,
+                # Chunks [0, next_chunk) are complete and folded into "aggregate".
+                "completed_chunks": [0, next_chunk],
+                "total_chunks": total_chunks,
+                # Block b of STREAM_PATHS paths draws from SeedSequence(entropy,
+                # spawn_key=(b,)), so the stream position is fully described by
+                # the next path.
+                "rng": {"entropy": spec.get("seed", 0), "paths_per_stream": STREAM_PATHS,
+                        "next_path": next_chunk * spec["chunk_size"],
+                        "next_spawn_key": next_chunk * spec["chunk_size"] // STREAM_PATHS}
+                if spec["kind"] == "monte_carlo" else None,
+                "aggregate": aggregator.to_state(),
+                "saved": time.time(),
+            })
+
+    last_saved = time.monotonic()
+    window = 4 * workers
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while next_chunk < total_chunks:
+            stop = min(next_chunk + window, total_chunks)
+            tasks = [(spec, i) for i in range(next_chunk, stop)]
+            if profiler is not None:
+                partials = [_chunk_aggregate(task, profiler) for task in tasks]
+            else:
+                partials = map_chunks(_chunk_aggregate, tasks, workers, pool=pool)
+            for partial in partials:
+                with profile_stage(profiler, "aggregation"):
+                    aggregator.merge(partial)
+            next_chunk = stop
+            if time.monotonic() - last_saved >= checkpoint_every:
+                checkpoint()
+                last_saved = time.monotonic()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    checkpoint()
+    return aggregator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a sweep or Monte Carlo spec with checkpoint/resume")
+    parser.add_argument("spec", help="job spec JSON file (same format as job_queue)")
+    parser.add_argument("checkpoint", help="checkpoint file; an existing one is resumed")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--every", type=float, default=60.0, help="seconds between checkpoints")
+    parser.add_argument("--memory-budget", help="per-process memory budget, e.g. 2GB (sets the chunk size "
+                        "when the spec has none)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="compute in-process and print a per-stage memory report")
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    with open(args.spec) as f:
+        spec = json.load(f)
+    if args.memory_budget:
+        spec["memory_budget"] = args.memory_budget
+    profiler = MemoryProfiler() if args.profile_memory else None
+    try:
+        summary = run_checkpointed(spec, args.checkpoint, args.workers, args.every, profiler).summary()
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    for name, value in summary.items():
+        print(f"{name}: {value:,.4f}" if isinstance(value, float) else f"{name}: {value:,}")
+    if profiler is not None:
+        from display_utils import display_memory_report
+        display_memory_report(profiler.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from batch_simulation import (broadcast_params, buy_side, rent_side, rental_cash_flow, simulate_chunk,
+                              default_chunk_size, SUMMARY_FIELDS)
+
+# Registry of cost models: the methodology of simulation.simulate_scenario
+# and of the earlier scripts in old_script/, as named strategies that run
+# on the batch engine's kernels (rent_side / buy_side). The models differ
+# in how rent grows, what is deductible and which monthly cost is
+# compared with rent to decide what gets invested:
+#
+#   current       simulate_scenario: rent grows monthly, interest plus
+#                 property tax deductible up to the cap, invests what the
+#                 full payment minus tax savings costs over rent.
+#   user_input_2  rent steps up once a year, interest and property tax
+#                 fully deductible, invests what interest plus the other
+#                 non-principal expenses cost over rent; the whole horizon
+#                 is treated as living in the home.
+#   moving_out_3  user_input_2 while living in; once renting out, the
+#                 cost compared with rent is home costs minus the
+#                 landlord cash flow (rent collected minus rent paid
+#                 elsewhere), and that cash flow is credited to the
+#                 owner. Unlike the script, both rents grow with
+#                 rent_growth_annual (as in RentalScenario) and the cash
+#                 flow counts towards the owning net position.
+#   taxes_1       user_input_2 over its fixed 36-month horizon.
+#
+# simulate_models evaluates any set of models over the same scenarios in
+# one pass, sharing the rent arrays between models where they agree.
+
+
+class CostModel:
+    def __init__(self, name, description, annual_rent_steps=False, full_deduction=False,
+                 invest_non_principal=False, rent_out_cash_flow=False, fixed_months=None):
+        """A methodology for comparing buying with renting.
+
+        annual_rent_steps raises rent once a year instead of monthly;
+        full_deduction ignores property_tax_deduction_cap;
+        invest_non_principal compares interest plus non-principal expenses
+        (no tax savings) with rent instead of the full payment net of tax
+        savings; rent_out_cash_flow uses home cost minus the landlord cash
+        flow as that cost in the rent-out months and credits the cash
+        flow to the owner;
+        fixed_months replaces the horizon (all months lived in).
+        """
+        self.name = name
+        self.description = description
+        self.annual_rent_steps = annual_rent_steps
+        self.full_deduction = full_deduction
+        self.invest_non_principal = invest_non_principal
+        self.rent_out_cash_flow = rent_out_cash_flow
+        self.fixed_months = fixed_months
+
+
+COST_MODELS = {}
+
+
+def register_model(model):
+    """Add (or replace) a model in the registry and return it."""
+    COST_MODELS[model.name] = model
+    return model
+
+
+def get_model(name):
+    """The registered model called `name`."""
+    try:
+        return COST_MODELS[name]
+    except KeyError:
+        raise ValueError(f"Unknown cost model: {name} (known: {', '.join(COST_MODELS)})") from None
+
+
+register_model(CostModel("current", "simulate_scenario (monthly rent growth, capped deduction)"))
+register_model(CostModel("user_input_2", "annual rent steps, full deduction, non-principal costs invested",
+                         annual_rent_steps=True, full_deduction=True, invest_non_principal=True))
+register_model(CostModel("moving_out_3", "user_input_2 plus rent-out cash flow after moving out",
+                         annual_rent_steps=True, full_deduction=True, invest_non_principal=True,
+                         rent_out_cash_flow=True))
+register_model(CostModel("taxes_1", "user_input_2 over a fixed 36-month horizon",
+                         annual_rent_steps=True, full_deduction=True, invest_non_principal=True,
+                         fixed_months=36))
+
+
+def _model_cols(model, cols):
+    """Scenario columns as the model sees them."""
+    n = len(cols["home_price"])
+    changes = {}
+    if model.fixed_months is not None:
+        changes["months_live_in"] = np.full(n, float(model.fixed_months))
+        changes["months_rent_out"] = np.zeros(n)
+    if model.full_deduction:
+        changes["property_tax_deduction_cap"] = np.full(n, np.inf)
+    return dict(cols, **changes) if changes else cols
+
+
+def _contribution_cost(model, cols, num_months, cash_flow=None):
+    """buy_side contribution_cost hook for the model, or None for the default.
+
+    `cash_flow` is the (n, months) planned landlord cash flow, used by
+    models with rent_out_cash_flow.
+    """
+    if not model.invest_non_principal:
+        return None
+    months_live_in = cols["months_live_in"][:, None]
+    renting_out = np.arange(1, num_months + 1) > months_live_in
+
+    def cost(interest, principal, month_home_cost, tax_savings):
+        living_in = month_home_cost[:, None] - principal
+        if not model.rent_out_cash_flow:
+            return living_in
+        return np.where(renting_out, month_home_cost[:, None] - cash_flow, living_in)
+    return cost
+
+
+def model_chunk(model, cols, ledgers=False, rent_cache=None, landlord_cash_flow=None):
+    """Run one block of broadcast scenarios under `model`; like simulate_chunk.
+
+    `rent_cache` (a dict) shares rent_side arrays between models of the
+    same chunk. Models with rent_out_cash_flow credit the owner with
+    `landlord_cash_flow` ((n, months), e.g. simulated by
+    rental_operations) when given, otherwise with
+    batch_simulation.rental_cash_flow, which also sets the invested
+    difference in either case.
+    """
+    if model.name == "current":
+        return simulate_chunk(cols, ledgers=ledgers)
+    cols = _model_cols(model, cols)
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+    num_months = int(total_months.max())
+    key = (model.annual_rent_steps, model.fixed_months)
+    if rent_cache is not None and key in rent_cache:
+        rent = rent_cache[key]
+    else:
+        rent = rent_side(cols["rent_current"], cols["rent_growth_annual"],
+                         cols["alt_invest_growth_annual"], cols["monthly_invest_growth_annual"],
+                         total_months, num_months, annual_rent_steps=model.annual_rent_steps)
+        if rent_cache is not None:
+            rent_cache[key] = rent
+    planned = realized = None
+    if model.rent_out_cash_flow:
+        # The invested difference is budgeted from the contracted rent;
+        # operating losses are charged to the owner as they happen and
+        # never inflate what gets invested.
+        planned = rental_cash_flow(cols, num_months)
+        realized = planned if landlord_cash_flow is None else landlord_cash_flow
+    return buy_side(cols, rent, total_months, num_months, ledgers=ledgers,
+                    contribution_cost=_contribution_cost(model, cols, num_months, planned),
+                    rental_cash_flow=realized)
+
+
+def simulate_models(params, models=None, chunk_size=None, operations=None, seed=0):
+    """Evaluate several cost models over the same scenarios.
+
+    `models` is a list of names or CostModel objects (default: every
+    registered model). Returns {model name: {summary field: (n,) array}}.
+    With a rental_operations.RentalOperations as `operations`, models
+    with rent_out_cash_flow use the simulated landlord cash flow
+    (vacancies, turnover, fees, repairs; chunk i draws from
+    chunk_rng(seed, i), so pass chunk_size to reproduce a run under
+    another autotune profile) instead of collecting rent_collected_home
+    every month. Operations without any of those frictions reproduce the
+    result without operations.
+    """
+    models = [get_model(m) if isinstance(m, str) else m for m in (models or list(COST_MODELS))]
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    chunk_size = chunk_size or default_chunk_size(int((cols["months_live_in"] + cols["months_rent_out"]).max()))
+    results = {model.name: {name: np.empty(n) for name in SUMMARY_FIELDS} for model in models}
+    for chunk_index, start in enumerate(range(0, n, chunk_size)):
+        stop = min(start + chunk_size, n)
+        chunk = {name: col[start:stop] for name, col in cols.items()}
+        rent_cache = {}
+        landlord_cash_flow = None
+        if operations is not None and any(model.rent_out_cash_flow for model in models):
+            from rental_operations import simulate_operations
+            from stochastic_economy import chunk_rng
+            flows = simulate_operations(chunk, operations, chunk_rng(seed, chunk_index),
+                                        ledgers=["monthly_landlord_cash_flow"])
+            landlord_cash_flow = flows["monthly_landlord_cash_flow"]
+        for model in models:
+            summary, _ = model_chunk(model, chunk, rent_cache=rent_cache, landlord_cash_flow=landlord_cash_flow)
+            for name in SUMMARY_FIELDS:
+                results[model.name][name][start:stop] = summary[name]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare cost models on one scenario")
+    parser.add_argument("--scenario", help="JSON file of scenario inputs (default: the app defaults)")
+    parser.add_argument("--models", help="comma-separated model names (default: all)")
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    from display_utils import display_model_comparison
+    from fuzz_harness import BASE_SCENARIO
+    scenario = dict(BASE_SCENARIO)
+    if args.scenario:
+        with open(args.scenario) as f:
+            scenario.update(json.load(f))
+    models = args.models.split(",") if args.models else None
+    display_model_comparison(simulate_models(scenario, models))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,9 @@
+import numpy as np
 import matplotlib.pyplot as plt
 from tabulate import tabulate
-from financial_utils import calculate_future_monthly_investments
+from batch_simulation import sweep_grid
+from plot_rendering import comparison_series, render_comparison_plot, render_sweep_heatmap
+from rollups import period_firsts, period_sums
 
 def display_results(
     home_value_after, remaining_principal, selling_costs, final_equity,
@@ -28,10 +31,9 @@ def display_results(
     
     # Display rent progression
     print("\nRent Progression (Annual):")
-    current_rent = rental_scenario.monthly_rent_if_no_buy[0]
-    for year in range(int(total_months/12)):
-        print(f"Year {year+1}: ${current_rent:,.2f}/month")
-        current_rent *= (1 + rental_scenario.rent_growth_annual)
+    yearly_rent = period_firsts(rental_scenario.monthly_rent_if_no_buy)[:int(total_months/12)]
+    for year, rent in enumerate(yearly_rent.tolist()):
+        print(f"Year {year+1}: ${rent:,.2f}/month")
 
     print("\n--- Investment Calculations ---")
     print(f"Value of monthly difference investment: ${fv_monthly_invest:,.2f}")
@@ -50,23 +52,15 @@ def display_results(
 
 def print_amortization_table(monthly_principal_paid, monthly_interest_paid):
     """Print amortization schedule by year."""
-    principal_by_year = {}
-    interest_by_year = {}
-    
-    for i, (principal, interest) in enumerate(zip(monthly_principal_paid, monthly_interest_paid)):
-        year = (i // 12) + 1
-        if year not in principal_by_year:
-            principal_by_year[year] = 0
-            interest_by_year[year] = 0
-        principal_by_year[year] += principal
-        interest_by_year[year] += interest
+    principal_by_year = period_sums(monthly_principal_paid).tolist()
+    interest_by_year = period_sums(monthly_interest_paid).tolist()
 
     amort_table = []
-    for year in sorted(principal_by_year.keys()):
+    for year, (principal, interest) in enumerate(zip(principal_by_year, interest_by_year), start=1):
         amort_table.append([
             year,
-            f"${principal_by_year[year]:,.2f}",
-            f"${interest_by_year[year]:,.2f}"
+            f"${principal:,.2f}",
+            f"${interest:,.2f}"
         ])
     
     print("\n--- Amortization by Year ---")
@@ -76,34 +70,32 @@ def print_amortization_table(monthly_principal_paid, monthly_interest_paid):
 
 def create_comparison_plots(
     total_months, monthly_rent_no_buy, monthly_total_home_cost,
-    monthly_investment_contribution, monthly_equity, monthly_invest_rate
+    monthly_investment_contribution, monthly_equity, monthly_invest_rate,
+    output_path=None
 ):
-    cumulative_rent_no_buy = []
-    cumulative_home_cost = []
-    cumulative_investment_balance = []
-    
-    running_rent = 0
-    running_home_cost = 0
-    invested_amounts = []
+    """Plot the cumulative comparison chart.
 
-    for i in range(total_months):
-        running_rent += monthly_rent_no_buy[i]
-        running_home_cost += monthly_total_home_cost[i]
-        invested_amounts.append(monthly_investment_contribution[i])
+    With output_path set the chart is rendered off-screen (Agg) to that
+    file instead of opening an interactive pyplot window.
+    """
+    if output_path is not None:
+        return render_comparison_plot(
+            output_path, monthly_rent_no_buy[:total_months],
+            monthly_total_home_cost[:total_months],
+            monthly_investment_contribution[:total_months],
+            monthly_equity[:total_months], monthly_invest_rate)
 
-        current_fv = calculate_future_monthly_investments(
-            invested_amounts, monthly_invest_rate, i+1)
-
-        cumulative_rent_no_buy.append(running_rent)
-        cumulative_home_cost.append(running_home_cost)
-        cumulative_investment_balance.append(current_fv)
+    series = comparison_series(
+        monthly_rent_no_buy[:total_months], monthly_total_home_cost[:total_months],
+        monthly_investment_contribution[:total_months],
+        monthly_equity[:total_months], monthly_invest_rate)
 
     plt.figure(figsize=(10,6))
     months = range(1, total_months+1)
-    plt.plot(months, cumulative_rent_no_buy, label='Cumulative Rent (No Buy)', color='red')
-    plt.plot(months, cumulative_home_cost, label='Cumulative Home Cost', color='blue')
-    plt.plot(months, cumulative_investment_balance, label='Investment from Monthly Diff', color='green')
-    plt.plot(months, monthly_equity, label='Home Equity', color='purple')
+    plt.plot(months, series["cumulative_rent_no_buy"], label='Cumulative Rent (No Buy)', color='red')
+    plt.plot(months, series["cumulative_home_cost"], label='Cumulative Home Cost', color='blue')
+    plt.plot(months, series["cumulative_investment_balance"], label='Investment from Monthly Diff', color='green')
+    plt.plot(months, series["monthly_equity"], label='Home Equity', color='purple')
 
     plt.title("Cumulative Comparison Over Time")
     plt.xlabel("Month")
@@ -112,6 +104,18 @@ def create_comparison_plots(
     plt.grid(True)
     plt.show()
 
+def create_sweep_heatmap(base, y_axis, x_axis, output_path, field="buy_advantage", title=None):
+    """Sweep two inputs with the batch engine and save a heatmap with break-even contour.
+
+    y_axis and x_axis are (parameter name, values) pairs, e.g.
+    ("mortgage_rate_annual", rates) and ("home_price", prices); all other
+    inputs come from base. Rendered off-screen (Agg) to output_path.
+    """
+    (y_name, y_values), (x_name, x_values) = y_axis, x_axis
+    grid = sweep_grid(base, {y_name: y_values, x_name: x_values}, field=field)
+    title = title or f"{field.replace('_', ' ').title()} (USD)"
+    return render_sweep_heatmap(output_path, grid, y_name, y_values, x_name, x_values, title=title)
+
 def display_monthly_payments(
     property_costs,
     monthly_payment,
@@ -166,4 +170,140 @@ def display_monthly_payments(
     if avg_monthly_ownership < avg_monthly_renting:
         print("\nBuying appears to be more cost-effective on a monthly basis")
     else:
-        print("\nRenting appears to be more cost-effective on a monthly basis") 
\ No newline at end of file
+        print("\nRenting appears to be more cost-effective on a monthly basis") 
+
+def display_listing_comparison(ranked_rows, limit=None):
+    """Print the ranked listing table produced by compare_listings."""
+    rows = ranked_rows if limit is None else ranked_rows[:limit]
+    table = [[
+        row["rank"],
+        row["listing"],
+        f"${row['home_price']:,.0f}",
+        f"${row['monthly_payment']:,.2f}",
+        f"${row['owning_effective_net']:,.2f}",
+        f"${row['renting_effective_net']:,.2f}",
+        f"${row['buy_advantage']:,.2f}",
+    ] for row in rows]
+
+    print("\n--- Listings vs Renting (ranked) ---")
+    print(tabulate(table,
+                  headers=["Rank", "Listing", "Price", "Mortgage Payment",
+                           "Owning Net", "Renting Net", "Buy Advantage"],
+                  tablefmt="pretty"))
+
+
+def display_backtest_summary(summary):
+    """Print the distribution of outcomes from summarize_backtest."""
+    print("\n--------------- HISTORICAL BACKTEST ---------------")
+    print(f"Start months tested: {summary['windows']}")
+    print(f"Buying won in {summary['buy_wins_share']:.1%} of start months")
+    print(f"Mean buy advantage: ${summary['mean']:,.2f} (std ${summary['std']:,.2f})")
+
+    table = [[f"P{p}", f"${value:,.2f}"] for p, value in summary["percentiles"].items()]
+    print(tabulate(table, headers=["Percentile", "Buy Advantage"], tablefmt="pretty"))
+
+    best_date, best_value = summary["best_start"]
+    worst_date, worst_value = summary["worst_start"]
+    print(f"Best start month: {best_date} (${best_value:,.2f})")
+    print(f"Worst start month: {worst_date} (${worst_value:,.2f})")
+
+
+def display_prepayment_comparison(ranked_rows, limit=None):
+    """Print the ranked strategies from evaluate_prepayment_strategies."""
+    rows = ranked_rows if limit is None else ranked_rows[:limit]
+    table = [[
+        row["rank"],
+        row["strategy"],
+        f"${row['total_prepaid']:,.2f}",
+        f"${row['interest_saved']:,.2f}",
+        row["payoff_month"] if row["payoff_month"] is not None else "-",
+        f"${row['benefit_vs_investing']:,.2f}",
+    ] for row in rows]
+
+    print("\n--- Prepayment Strategies vs Investing ---")
+    print(tabulate(table,
+                  headers=["Rank", "Strategy", "Prepaid", "Interest Saved",
+                           "Payoff Month", "Benefit vs Investing"],
+                  tablefmt="pretty"))
+
+
+def display_memory_report(report, top=True):
+    """Print a MemoryProfiler report: per-stage time, net and peak allocation."""
+    mb = 2 ** 20
+    table = [[
+        stage["stage"],
+        stage["calls"],
+        f"{stage['seconds']:,.2f}s",
+        f"{stage['net_bytes'] / mb:,.1f} MB",
+        f"{stage['peak_bytes'] / mb:,.1f} MB",
+    ] for stage in report["stages"]]
+
+    print("\n--- Memory by Stage ---")
+    print(tabulate(table, headers=["Stage", "Calls", "Time", "Net Allocated", "Peak"], tablefmt="pretty"))
+    print(f"Overall peak traced memory: {report['peak_bytes'] / mb:,.1f} MB")
+    if top:
+        for stage in report["stages"]:
+            if stage["top"]:
+                print(f"\nLargest allocations in {stage['stage']} (first call):")
+                for location, size in stage["top"]:
+                    print(f"  {size / mb:+10.2f} MB  {location}")
+
+
+def display_query_results(results, columns):
+    """Print rows returned by ResultsStore.query."""
+    table = [[f"{value:.4g}" if abs(value) < 1 else f"{value:,.2f}" for value in values]
+             for values in zip(*(results[name].tolist() for name in columns))]
+    print(tabulate(table, headers=columns, tablefmt="pretty"))
+
+
+def display_model_comparison(results, fields=("total_tax_savings", "fv_monthly_invest", "owning_effective_net",
+                                               "renting_effective_net", "buy_advantage")):
+    """Print the first scenario of simulate_models output, one row per cost model."""
+    table = [[name] + [f"${summary[field][0]:,.2f}" for field in fields] for name, summary in results.items()]
+    print("\n--- Cost Models ---")
+    print(tabulate(table, headers=["Model"] + [field.replace("_", " ").title() for field in fields],
+                   tablefmt="pretty"))
+
+
+def display_rental_operations(results):
+    """Print the distribution of simulate_rental_operations totals over paths."""
+    names = ["rent_collected", "vacancy_loss", "management_fees", "turnover_costs", "repair_costs",
+             "net_operating_income", "landlord_cash_flow"]
+    table = [[name.replace("_", " ").title()] +
+             [f"${value:,.2f}" for value in (results["total_" + name].mean(),
+                                              *np.percentile(results["total_" + name], [5, 50, 95]))]
+             for name in names]
+    print("\n--- Rental Period Cash Flow ---")
+    print(f"Mean vacant months: {results['vacant_months'].mean():.1f}, "
+          f"mean turnovers: {results['turnovers'].mean():.1f}")
+    print(tabulate(table, headers=["", "Mean", "P5", "P50", "P95"], tablefmt="pretty"))
+
+
+def display_tuning_report(profile):
+    """Print an autotune profile: chosen settings and measured throughput."""
+    scaling = profile["scaling"]
+    print("\n--------------- THROUGHPUT PROFILE ---------------")
+    print(f"Machine: {profile['machine']['fingerprint']} ({profile['machine']['processor']})")
+    print(f"Workers: {profile['workers']}, memory block: {profile['memory_block_bytes'] / 2**20:,.1f} MiB, "
+          f"allocator tuning: {'on' if profile['allocator'] else 'off'}")
+
+    horizons = list(scaling["chunk_size"])
+    chunk_sizes = [timing[0] for timing in scaling["chunk_size"][horizons[0]]]
+
+    def cell(timing, horizon):
+        text = f"{timing[1]:,.0f}" + (f" / {timing[2]:,.0f}" if timing[2] else "")
+        return text + (" *" if profile["chunk_sizes"][horizon] == timing[0] else "")
+    table = [[f"{chunk:,}"] + [cell(timing, h) for h in horizons
+                               for timing in scaling["chunk_size"][h] if timing[0] == chunk]
+             for chunk in chunk_sizes]
+    print("\n--- Scenarios/s by Chunk Size (default / allocator tuning, * = chosen) ---")
+    print(tabulate(table, headers=["Chunk Size"] + [f"{h} months" for h in horizons], tablefmt="pretty"))
+
+    base = scaling["workers"][0][1]
+    table = [[workers, f"{rate:,.0f}", f"{rate / base:.2f}x"] for workers, rate in scaling["workers"]]
+    print("\n--- Scenarios/s by Workers ---")
+    print(tabulate(table, headers=["Workers", "Scenarios/s", "Speedup"], tablefmt="pretty"))
+
+    table = [[f"{n:,}", f"{rate:,.0f}"] for n, rate in scaling["batch_size"]]
+    print("\n--- Scenarios/s by Batch Size ---")
+    print(tabulate(table, headers=["Batch Size", "Scenarios/s"], tablefmt="pretty"))
@@ -0,0 +1,212 @@
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from batch_simulation import PARAMETER_NAMES, SUMMARY_FIELDS, LEDGER_FIELDS, simulate_batch
+from parallel_runner import simulate_batch_parallel
+from reference_engine import reference_scenario
+from scenario_engine import ThreadedEngine
+
+# Differential testing of the fast engines against the frozen reference
+# loop. Randomized scenarios plus hand-picked edge cases are run through
+# every engine; each result must match the reference within tolerance,
+# and the float32 engine must stay within its own reported error bound.
+# The same runs are timed to report each engine's speedup.
+
+# Relative tolerance for float64 engines. Differences are measured
+# against the larger of the value itself and the home price, so fields
+# that pass through zero (remaining principal, advantage) are compared on
+# the scale of the scenario rather than of the value.
+RTOL = 1e-9
+
+BASE_SCENARIO = {
+    "home_price": 900000,
+    "down_payment_pct": 0.20,
+    "mortgage_rate_annual": 0.06,
+    "mortgage_term_years": 30,
+    "property_tax_rate_annual": 0.011,
+    "maintenance_annual": 5000,
+    "insurance_annual": 3500,
+    "hoa_monthly": 300,
+    "closing_costs_buy_pct": 0.04,
+    "closing_costs_sell_pct": 0.06,
+    "rent_current": 2400,
+    "rent_growth_annual": 0.04,
+    "alt_invest_growth_annual": 0.16,
+    "monthly_invest_growth_annual": 0.15,
+    "home_appreciation_annual": 0.08,
+    "tax_rate": 0.30,
+    "property_tax_deduction_cap": 10000,
+    "months_live_in": 36,
+    "months_rent_out": 36,
+    "rent_while_out": 2500,
+    "rent_collected_home": 3500,
+}
+
+
+def edge_case_scenarios():
+    """Hand-picked scenarios at the boundaries of the loop's branches."""
+    cases = {
+        "defaults": {},
+        "zero mortgage rate": {"mortgage_rate_annual": 0.0},
+        "all rates zero": {"mortgage_rate_annual": 0.0, "rent_growth_annual": 0.0,
+                           "alt_invest_growth_annual": 0.0, "monthly_invest_growth_annual": 0.0,
+                           "home_appreciation_annual": 0.0},
+        "0% down": {"down_payment_pct": 0.0},
+        "100% down": {"down_payment_pct": 1.0},
+        "1-month horizon": {"months_live_in": 1, "months_rent_out": 0},
+        "1-month rent-out only": {"months_live_in": 0, "months_rent_out": 1},
+        "never rented out": {"months_rent_out": 0},
+        "40-year term": {"mortgage_term_years": 40},
+        "40-year horizon": {"mortgage_term_years": 40, "months_live_in": 240, "months_rent_out": 240},
+        "horizon past term": {"mortgage_term_years": 10, "months_live_in": 180, "months_rent_out": 0},
+        "no deduction cap": {"property_tax_deduction_cap": 0},
+        "cap never binds": {"property_tax_deduction_cap": 1e9},
+        "contribution always clamped": {"rent_current": 50000},
+        "negative growth": {"home_appreciation_annual": -0.05, "rent_growth_annual": -0.02},
+        "no tax": {"tax_rate": 0.0},
+    }
+    return [(name, dict(BASE_SCENARIO, **changes)) for name, changes in cases.items()]
+
+
+def random_scenario(rng):
+    """A random but plausible scenario, biased towards branch boundaries."""
+    return {
+        "home_price": rng.uniform(50000, 3000000),
+        "down_payment_pct": rng.choice([0.0, 0.035, 0.2, rng.random()]),
+        "mortgage_rate_annual": rng.choice([0.0, rng.uniform(0, 0.12)]),
+        "mortgage_term_years": rng.choice([10, 15, 20, 30, 40]),
+        "property_tax_rate_annual": rng.uniform(0, 0.03),
+        "maintenance_annual": rng.uniform(0, 20000),
+        "insurance_annual": rng.uniform(0, 8000),
+        "hoa_monthly": rng.choice([0.0, rng.uniform(0, 1500)]),
+        "closing_costs_buy_pct": rng.uniform(0, 0.06),
+        "closing_costs_sell_pct": rng.uniform(0, 0.08),
+        "rent_current": rng.uniform(300, 15000),
+        "rent_growth_annual": rng.uniform(-0.03, 0.10),
+        "alt_invest_growth_annual": rng.choice([0.0, rng.uniform(-0.05, 0.20)]),
+        "monthly_invest_growth_annual": rng.choice([0.0, rng.uniform(-0.05, 0.20)]),
+        "home_appreciation_annual": rng.uniform(-0.08, 0.12),
+        "tax_rate": rng.uniform(0, 0.5),
+        "property_tax_deduction_cap": rng.choice([0.0, 10000.0, rng.uniform(0, 50000), 1e9]),
+        "months_live_in": rng.choice([0, 1, 12, rng.randint(0, 480)]),
+        "months_rent_out": rng.choice([0, 1, rng.randint(0, 240)]),
+        "rent_while_out": rng.uniform(0, 8000),
+        "rent_collected_home": rng.uniform(0, 10000),
+    }
+
+
+def generate_scenarios(num_random, seed=0):
+    """Edge cases followed by num_random random scenarios (all with >= 1 month)."""
+    rng = random.Random(seed)
+    scenarios = edge_case_scenarios()
+    while len(scenarios) < len(edge_case_scenarios()) + num_random:
+        scenario = random_scenario(rng)
+        if scenario["months_live_in"] + scenario["months_rent_out"] >= 1:
+            scenarios.append((f"random #{len(scenarios)}", scenario))
+    return scenarios
+
+
+def _engines(workers):
+    return {
+        "batch": lambda cols: simulate_batch(cols, ledgers=True),
+        "batch (chunks of 7)": lambda cols: simulate_batch(cols, ledgers=True, chunk_size=7),
+        "batch float32": lambda cols: simulate_batch(cols, dtype=np.float32),
+        "parallel": lambda cols: simulate_batch_parallel(cols, workers=workers, chunk_size=64),
+        "threaded": lambda cols: _threaded(cols, workers),
+    }
+
+
+def _threaded(cols, workers):
+    with ThreadedEngine(workers, chunk_size=64) as engine:
+        return engine.submit(cols, ledgers=True).result()
+
+
+def _mismatches(engine, names, scenarios, reference, result):
+    problems = []
+    scale = np.array([max(abs(s["home_price"]), 1.0) for _, s in scenarios])
+    float32 = "float32_error_bound" in result
+    fields = ("buy_advantage",) if float32 else SUMMARY_FIELDS
+
+    for field in fields:
+        expected = np.array([ref[field] for ref in reference])
+        got = result[field]
+        if float32:
+            allowed = result["float32_error_bound"]
+        else:
+            allowed = RTOL * np.maximum(np.abs(expected), scale)
+        bad = np.flatnonzero(~(np.abs(got - expected) <= allowed))
+        for i in bad[:5]:
+            problems.append(f"{engine}: {names[i]} {field} = {got[i]!r}, reference {expected[i]!r}")
+
+    for field in LEDGER_FIELDS:
+        if field not in result or float32:
+            continue
+        for i, ref in enumerate(reference):
+            expected = np.asarray(ref[field], dtype=np.float64)
+            got = result[field][i, :len(expected)]
+            allowed = RTOL * np.maximum(np.abs(expected), scale[i])
+            if not np.all(np.abs(got - expected) <= allowed):
+                problems.append(f"{engine}: {names[i]} ledger {field} differs from reference")
+    return problems
+
+
+def run_differential(num_random=500, seed=0, workers=2):
+    """Run every engine against the reference; return (problems, timings).
+
+    timings maps engine name to seconds for the whole scenario set,
+    including "reference" for the loop itself.
+    """
+    scenarios = generate_scenarios(num_random, seed)
+    names = [name for name, _ in scenarios]
+    cols = {key: np.array([s[key] for _, s in scenarios], dtype=np.float64)
+            for key in PARAMETER_NAMES}
+
+    start = time.perf_counter()
+    reference = [reference_scenario(**scenario) for _, scenario in scenarios]
+    timings = {"reference": time.perf_counter() - start}
+
+    problems = []
+    for engine, run in _engines(workers).items():
+        start = time.perf_counter()
+        result = run(cols)
+        timings[engine] = time.perf_counter() - start
+        problems.extend(_mismatches(engine, names, scenarios, reference, result))
+    return problems, timings
+
+
+def check_engines(num_random=500, seed=0, workers=2):
+    """Assert that every fast engine agrees with the reference loop."""
+    problems, timings = run_differential(num_random, seed, workers)
+    assert not problems, "Engines disagree with the reference:\n" + "\n".join(problems[:50])
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential check of fast engines vs the reference loop")
+    parser.add_argument("--scenarios", type=int, default=500, help="number of random scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    problems, timings = run_differential(args.scenarios, args.seed, args.workers)
+    total = args.scenarios + len(edge_case_scenarios())
+    print(f"Checked {total} scenarios ({len(edge_case_scenarios())} edge cases)")
+    for engine, seconds in timings.items():
+        speedup = timings["reference"] / seconds if seconds else float("inf")
+        print(f"{engine:>22}: {seconds:8.3f}s  ({speedup:,.1f}x vs reference)")
+
+    if problems:
+        print(f"\n{len(problems)} mismatches:")
+        for problem in problems[:50]:
+            print(f"  {problem}")
+        return 1
+    print("All engines agree with the reference.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
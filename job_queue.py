@@ -0,0 +1,447 @@
+import argparse
+import io
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from multiprocessing import Process
+
+import numpy as np
+
+from batch_simulation import (grid_params, grid_size, simulate_chunk, broadcast_params, chunk_size_for_budget,
+                              default_chunk_size, sweep_months, SUMMARY_FIELDS)
+from memory_profile import MemoryProfiler, profile_stage
+from stochastic_economy import EconomyModel, monte_carlo_chunk, monte_carlo_chunk_size
+from streaming_stats import NetPositionAggregator
+
+# Local job queue for long sweeps and Monte Carlo runs. A job spec is
+# split into chunks that are recorded in a SQLite database; any number
+# of local worker processes claim pending chunks, compute them and store
+# each chunk's result as soon as it is done. Clients poll progress and
+# throughput or cancel a job through the same database file, so nothing
+# but the file system is shared and no broker is needed.
+#
+# Job specs are JSON objects:
+#   {"kind": "sweep", "base": {...scenario...}, "sweep": {"home_price": [...], ...},
+#    "chunk_size": 4096}
+#   {"kind": "monte_carlo", "params": {...scenario...}, "economy": {...EconomyModel kwargs...},
+#    "num_paths": 100000, "seed": 0, "chunk_size": 2048}
+# Instead of "chunk_size" a spec may give "memory_budget" (bytes or e.g.
+# "2GB" per worker process); the chunk size is then derived from it when
+# the job is submitted.
+
+DEFAULT_DB = "jobs.sqlite3"
+
+# A claimed chunk is handed out again when its lease runs out. Workers
+# renew the lease every HEARTBEAT_SECONDS while they compute, so only
+# chunks of workers that died (or hang) expire, however long a chunk runs.
+LEASE_SECONDS = 600
+HEARTBEAT_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL,
+    num_chunks INTEGER NOT NULL,
+    total_items INTEGER NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    job_id INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    worker TEXT,
+    claimed REAL,
+    finished REAL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+CREATE INDEX IF NOT EXISTS chunks_by_status ON chunks (status, job_id, chunk_index);
+CREATE TABLE IF NOT EXISTS results (
+    job_id INTEGER NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+"""
+
+
+def connect(db_path=DEFAULT_DB):
+    """Open the queue database (creating it if needed) in WAL mode."""
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _chunk_sizes(spec):
+    """Number of items in each chunk of a job spec."""
+    if spec["kind"] == "sweep":
+        total = grid_size(spec["sweep"])
+        chunk_size = spec.get("chunk_size", 4096)
+    elif spec["kind"] == "monte_carlo":
+        total = spec["num_paths"]
+        chunk_size = spec.get("chunk_size", 2048)
+    else:
+        raise ValueError(f"Unknown job kind: {spec['kind']!r}")
+    return [min(chunk_size, total - start) for start in range(0, total, chunk_size)]
+
+
+def resolve_chunk_size(spec):
+    """Copy of spec with "chunk_size" derived from "memory_budget" if only that is given."""
+    if "memory_budget" not in spec or "chunk_size" in spec:
+        return spec
+    spec = dict(spec)
+    if spec["kind"] == "sweep":
+        months = {name: max(spec["sweep"].get(name, [spec["base"][name]]))
+                  for name in ("months_live_in", "months_rent_out")}
+        spec["chunk_size"] = chunk_size_for_budget(spec["memory_budget"], int(sum(months.values())))
+    else:
+        num_months = int(spec["params"]["months_live_in"] + spec["params"]["months_rent_out"])
+        spec["chunk_size"] = min(2048, monte_carlo_chunk_size(spec["memory_budget"], num_months))
+    return spec
+
+
+def with_default_chunk_size(spec):
+    """Copy of spec with "chunk_size" filled in when it has none.
+
+    Sweeps get the autotune profile's chunk size for their longest
+    horizon, Monte Carlo runs 2048 paths. The result depends on this
+    machine's profile, so store it with the run rather than resolving it
+    again later.
+    """
+    if "chunk_size" in spec:
+        return spec
+    if spec["kind"] == "sweep":
+        return dict(spec, chunk_size=default_chunk_size(sweep_months(spec["base"], spec["sweep"])))
+    return dict(spec, chunk_size=2048)
+
+
+def submit_job(spec, db_path=DEFAULT_DB):
+    """Queue a batch spec and return its job ID.
+
+    Specs without "chunk_size" or "memory_budget" are queued with the
+    default chunk size (the spec is stored as resolved).
+    """
+    spec = with_default_chunk_size(resolve_chunk_size(spec))
+    sizes = _chunk_sizes(spec)
+    if spec["kind"] == "sweep":
+        broadcast_params(grid_params(spec["base"], spec["sweep"], 0, 1))
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute(
+            "INSERT INTO jobs (spec, status, num_chunks, total_items, created) VALUES (?, 'queued', ?, ?, ?)",
+            (json.dumps(spec), len(sizes), sum(sizes), time.time()))
+        job_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO chunks (job_id, chunk_index, status, items) VALUES (?, ?, 'pending', ?)",
+            [(job_id, i, size) for i, size in enumerate(sizes)])
+        conn.execute("COMMIT")
+        return job_id
+    finally:
+        conn.close()
+
+
+def _claim_chunk(conn, worker):
+    """Atomically take the oldest pending chunk of an active job, or return None."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Chunks held by a worker that died are handed out again.
+        conn.execute(
+            "UPDATE chunks SET status = 'pending', worker = NULL "
+            "WHERE status = 'running' AND claimed < ?", (now - LEASE_SECONDS,))
+        row = conn.execute(
+            "SELECT c.job_id, c.chunk_index, j.spec FROM chunks c JOIN jobs j ON j.id = c.job_id "
+            "WHERE c.status = 'pending' AND j.status IN ('queued', 'running') "
+            "ORDER BY c.job_id, c.chunk_index LIMIT 1").fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        job_id, chunk_index, spec = row
+        conn.execute(
+            "UPDATE chunks SET status = 'running', worker = ?, claimed = ? "
+            "WHERE job_id = ? AND chunk_index = ?", (worker, now, job_id, chunk_index))
+        conn.execute(
+            "UPDATE jobs SET status = 'running', started = COALESCE(started, ?) WHERE id = ?",
+            (now, job_id))
+        conn.execute("COMMIT")
+        return job_id, chunk_index, json.loads(spec)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+class LeaseHeartbeat:
+    """Renews a claimed chunk's lease from a background thread.
+
+    Use as a context manager around the computation; the thread uses its
+    own connection and stops renewing once the chunk is no longer held by
+    `worker` (stored, cancelled or reassigned).
+    """
+
+    def __init__(self, db_path, job_id, chunk_index, worker, interval=HEARTBEAT_SECONDS):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.chunk_index = chunk_index
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def renew(self, conn):
+        """Extend the lease to now; returns False once the chunk is no longer ours."""
+        cursor = conn.execute(
+            "UPDATE chunks SET claimed = ? WHERE job_id = ? AND chunk_index = ? "
+            "AND status = 'running' AND worker = ?", (time.time(), self.job_id, self.chunk_index, self.worker))
+        return cursor.rowcount > 0
+
+    def _run(self):
+        conn = connect(self.db_path)
+        try:
+            while not self._stop.wait(self.interval):
+                if not self.renew(conn):
+                    return
+        finally:
+            conn.close()
+
+
+def compute_chunk(spec, chunk_index, profiler=None):
+    """Compute one chunk of a job and return its serialized result.
+
+    With a MemoryProfiler the "simulation" (and, for Monte Carlo,
+    "aggregation") and "export" stages are recorded.
+    """
+    if spec["kind"] == "sweep":
+        chunk_size = spec.get("chunk_size", 4096)
+        start = chunk_index * chunk_size
+        stop = min(start + chunk_size, grid_size(spec["sweep"]))
+        with profile_stage(profiler, "simulation"):
+            summary, _ = simulate_chunk(broadcast_params(grid_params(spec["base"], spec["sweep"], start, stop)))
+        with profile_stage(profiler, "export"):
+            buffer = io.BytesIO()
+            np.savez(buffer, **{name: summary[name] for name in SUMMARY_FIELDS})
+            return buffer.getvalue()
+
+    model = EconomyModel(**spec.get("economy", {}))
+    task = (spec["params"], model, spec["num_paths"], spec.get("chunk_size", 2048),
+            spec.get("seed", 0), chunk_index)
+    aggregator = monte_carlo_chunk(task, profiler)
+    with profile_stage(profiler, "export"):
+        return json.dumps(aggregator.to_state()).encode()
+
+
+def _store_result(conn, job_id, chunk_index, worker, payload):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        status = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        owner = conn.execute(
+            "SELECT worker FROM chunks WHERE job_id = ? AND chunk_index = ?",
+            (job_id, chunk_index)).fetchone()[0]
+        if status != "running" or owner != worker:
+            conn.execute("COMMIT")
+            return
+        conn.execute("INSERT OR REPLACE INTO results (job_id, chunk_index, payload) VALUES (?, ?, ?)",
+                     (job_id, chunk_index, payload))
+        conn.execute("UPDATE chunks SET status = 'done', finished = ? WHERE job_id = ? AND chunk_index = ?",
+                     (time.time(), job_id, chunk_index))
+        remaining = conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE job_id = ? AND status != 'done'", (job_id,)).fetchone()[0]
+        if remaining == 0:
+            conn.execute("UPDATE jobs SET status = 'done', finished = ? WHERE id = ?", (time.time(), job_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _fail_job(conn, job_id, error):
+    conn.execute("UPDATE jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+                 (time.time(), error, job_id))
+
+
+def run_worker(db_path=DEFAULT_DB, poll_interval=0.5, exit_when_idle=True, profiler=None,
+               heartbeat_seconds=HEARTBEAT_SECONDS):
+    """Claim and compute chunks until the queue is empty (or forever).
+
+    Each chunk's lease is renewed every heartbeat_seconds while it computes.
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(db_path)
+    try:
+        while True:
+            claimed = _claim_chunk(conn, worker)
+            if claimed is None:
+                if exit_when_idle:
+                    return
+                time.sleep(poll_interval)
+                continue
+            job_id, chunk_index, spec = claimed
+            try:
+                with LeaseHeartbeat(db_path, job_id, chunk_index, worker, heartbeat_seconds):
+                    payload = compute_chunk(spec, chunk_index, profiler)
+            except Exception as exc:
+                _fail_job(conn, job_id, f"chunk {chunk_index}: {exc!r}")
+                continue
+            _store_result(conn, job_id, chunk_index, worker, payload)
+    finally:
+        conn.close()
+
+
+def start_workers(num_workers, db_path=DEFAULT_DB, exit_when_idle=True):
+    """Start local worker processes; returns the Process objects."""
+    workers = [Process(target=run_worker, args=(db_path,), kwargs={"exit_when_idle": exit_when_idle})
+               for _ in range(num_workers)]
+    for process in workers:
+        process.start()
+    return workers
+
+
+def job_status(job_id, db_path=DEFAULT_DB):
+    """Progress and throughput of a job."""
+    conn = connect(db_path)
+    try:
+        row = conn.execute(
+            "SELECT status, num_chunks, total_items, created, started, finished, error FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"No job {job_id}")
+        status, num_chunks, total_items, created, started, finished, error = row
+        done_chunks, done_items = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(items), 0) FROM chunks WHERE job_id = ? AND status = 'done'",
+            (job_id,)).fetchone()
+        running = conn.execute(
+            "SELECT COUNT(*) FROM chunks WHERE job_id = ? AND status = 'running'", (job_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+    elapsed = ((finished or time.time()) - started) if started else 0.0
+    throughput = done_items / elapsed if elapsed > 0 else 0.0
+    remaining_items = total_items - done_items
+    return {
+        "job_id": job_id,
+        "status": status,
+        "chunks_done": done_chunks,
+        "chunks_running": running,
+        "chunks_total": num_chunks,
+        "items_done": done_items,
+        "items_total": total_items,
+        "progress": done_items / total_items if total_items else 1.0,
+        "elapsed_seconds": elapsed,
+        "items_per_second": throughput,
+        "eta_seconds": remaining_items / throughput if throughput and status == "running" else None,
+        "error": error,
+    }
+
+
+def cancel_job(job_id, db_path=DEFAULT_DB):
+    """Cancel a job; running chunks finish but their results are discarded."""
+    conn = connect(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished = ? "
+                     "WHERE id = ? AND status IN ('queued', 'running')", (time.time(), job_id))
+        conn.execute("UPDATE chunks SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'",
+                     (job_id,))
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def job_results(job_id, db_path=DEFAULT_DB):
+    """Results stored so far, in chunk order.
+
+    Sweeps return a dict of summary arrays covering the finished chunks
+    plus an "index" array of their flat grid indices; Monte Carlo jobs
+    return the merged NetPositionAggregator.
+    """
+    conn = connect(db_path)
+    try:
+        spec = json.loads(conn.execute("SELECT spec FROM jobs WHERE id = ?", (job_id,)).fetchone()[0])
+        rows = conn.execute("SELECT chunk_index, payload FROM results WHERE job_id = ? ORDER BY chunk_index",
+                            (job_id,)).fetchall()
+    finally:
+        conn.close()
+
+    if spec["kind"] == "monte_carlo":
+        aggregator = NetPositionAggregator()
+        for _, payload in rows:
+            aggregator.merge(NetPositionAggregator.from_state(json.loads(payload)))
+        return aggregator
+
+    chunk_size = spec.get("chunk_size", 4096)
+    parts = {name: [] for name in SUMMARY_FIELDS}
+    index = []
+    for chunk_index, payload in rows:
+        with np.load(io.BytesIO(payload)) as arrays:
+            for name in SUMMARY_FIELDS:
+                parts[name].append(arrays[name])
+            start = chunk_index * chunk_size
+            index.append(np.arange(start, start + len(arrays["buy_advantage"])))
+    results = {name: np.concatenate(values) if values else np.empty(0) for name, values in parts.items()}
+    results["index"] = np.concatenate(index) if index else np.empty(0, dtype=np.int64)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local job queue for batch and Monte Carlo runs")
+    parser.add_argument("--db", default=DEFAULT_DB, help="queue database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    submit = commands.add_parser("submit", help="queue a job spec (JSON file)")
+    submit.add_argument("spec")
+    work = commands.add_parser("work", help="run local worker processes")
+    work.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    work.add_argument("--forever", action="store_true", help="keep polling when the queue is empty")
+    work.add_argument("--profile-memory", action="store_true",
+                      help="run one in-process worker and print a per-stage memory report")
+    status = commands.add_parser("status", help="show job progress")
+    status.add_argument("job_id", type=int)
+    cancel = commands.add_parser("cancel", help="cancel a job")
+    cancel.add_argument("job_id", type=int)
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    if args.command == "submit":
+        with open(args.spec) as f:
+            print(submit_job(json.load(f), args.db))
+    elif args.command == "work" and args.profile_memory:
+        from display_utils import display_memory_report
+        with MemoryProfiler() as profiler:
+            run_worker(args.db, exit_when_idle=not args.forever, profiler=profiler)
+        display_memory_report(profiler.report())
+    elif args.command == "work":
+        for process in start_workers(args.workers, args.db, exit_when_idle=not args.forever):
+            process.join()
+    elif args.command == "status":
+        info = job_status(args.job_id, args.db)
+        print(f"Job {info['job_id']}: {info['status']} "
+              f"{info['items_done']:,}/{info['items_total']:,} ({info['progress']:.1%}), "
+              f"{info['items_per_second']:,.0f} items/s")
+        if info["error"]:
+            print(f"Error: {info['error']}")
+    elif args.command == "cancel":
+        cancel_job(args.job_id, args.db)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
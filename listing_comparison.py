@@ -0,0 +1,130 @@
+import numpy as np
+
+from batch_simulation import buy_side, default_chunk_size, rent_side, rental_cash_flow
+
+# Columns that describe a listing (or the buyer's tax situation for it).
+# Everything else in a scenario belongs to the shared rental baseline.
+LISTING_FIELDS = (
+    "home_price",
+    "down_payment_pct",
+    "mortgage_rate_annual",
+    "mortgage_term_years",
+    "property_tax_rate_annual",
+    "maintenance_annual",
+    "insurance_annual",
+    "hoa_monthly",
+    "closing_costs_buy_pct",
+    "closing_costs_sell_pct",
+    "home_appreciation_annual",
+    "tax_rate",
+    "property_tax_deduction_cap",
+)
+
+
+class RentBaseline:
+    """The renting alternative shared by every listing a client compares.
+
+    The rent path, total rent, and the growth factors used for the
+    renting-side future values (down payment and principal opportunity)
+    as well as the monthly-difference investment are computed once here
+    and reused for every listing. So is the landlord cash flow of the
+    rent-out months (rent_collected_home minus rent_while_out), which
+    compare_listings credits with rental_income=True.
+    """
+
+    def __init__(self, rent_current, rent_growth_annual, alt_invest_growth_annual,
+                 monthly_invest_growth_annual, months_live_in, months_rent_out,
+                 rent_while_out=0, rent_collected_home=0):
+        self.rent_current = rent_current
+        self.rent_growth_annual = rent_growth_annual
+        self.alt_invest_growth_annual = alt_invest_growth_annual
+        self.monthly_invest_growth_annual = monthly_invest_growth_annual
+        self.months_live_in = months_live_in
+        self.months_rent_out = months_rent_out
+        self.rent_while_out = rent_while_out if months_rent_out > 0 else 0
+        self.rent_collected_home = rent_collected_home if months_rent_out > 0 else 0
+        self.total_months = months_live_in + months_rent_out
+        if self.total_months < 1:
+            raise ValueError("The baseline needs at least one month")
+
+        self.arrays = rent_side(rent_current, rent_growth_annual, alt_invest_growth_annual,
+                                monthly_invest_growth_annual, self.total_months,
+                                self.total_months)
+        self.monthly_rent_if_no_buy = self.arrays["monthly_rent_if_no_buy"]
+        self.total_rent_no_buy = float(self.arrays["total_rent_no_buy"])
+        self.rental_cash_flow = rental_cash_flow({
+            "rent_growth_annual": np.array([rent_growth_annual], dtype=np.float64),
+            "months_live_in": np.array([months_live_in]),
+            "months_rent_out": np.array([months_rent_out]),
+            "rent_collected_home": np.array([self.rent_collected_home], dtype=np.float64),
+            "rent_while_out": np.array([self.rent_while_out], dtype=np.float64),
+        }, self.total_months)
+
+
+def _listing_columns(listings):
+    """Accept a list of dicts or a dict of columns; return names and (n,) columns."""
+    if isinstance(listings, dict):
+        columns = dict(listings)
+    else:
+        listings = list(listings)
+        columns = {key: [row[key] for row in listings] for key in listings[0]} if listings else {}
+
+    missing = [name for name in LISTING_FIELDS if name not in columns]
+    if missing:
+        raise ValueError(f"Missing listing fields: {', '.join(missing)}")
+
+    arrays = np.broadcast_arrays(*[np.atleast_1d(np.asarray(columns[name], dtype=np.float64))
+                                   for name in LISTING_FIELDS])
+    cols = {name: np.ascontiguousarray(col) for name, col in zip(LISTING_FIELDS, arrays)}
+    n = len(cols["home_price"])
+    names = columns.get("listing")
+    names = [str(i + 1) for i in range(n)] if names is None else list(names)
+    return names, cols
+
+
+def compare_listings(baseline, listings, chunk_size=None, rental_income=False):
+    """Evaluate every listing against one RentBaseline and rank them.
+
+    `listings` is a list of dicts or a dict of columns with every field
+    in LISTING_FIELDS and an optional "listing" label. Returns one row
+    dict per listing, best buy advantage first, each with its "rank".
+    As in simulate_batch, rental_income=True credits the baseline's
+    landlord cash flow to every owner and adds "total_rental_cash_flow".
+    """
+    names, cols = _listing_columns(listings)
+    n = len(names)
+    chunk_size = chunk_size or default_chunk_size(baseline.total_months)
+
+    advantage = np.empty(n)
+    owning = np.empty(n)
+    renting = np.empty(n)
+    payment = np.empty(n)
+    cash_flow = baseline.rental_cash_flow if rental_income else None
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = {name: col[start:stop] for name, col in cols.items()}
+        summary, _ = buy_side(chunk, baseline.arrays, baseline.total_months,
+                              baseline.total_months, rental_cash_flow=cash_flow)
+        advantage[start:stop] = summary["buy_advantage"]
+        owning[start:stop] = summary["owning_effective_net"]
+        renting[start:stop] = summary["renting_effective_net"]
+        payment[start:stop] = summary["monthly_payment"]
+
+    order = np.argsort(-advantage, kind="stable")
+    rows = [
+        {
+            "rank": rank,
+            "listing": names[i],
+            "home_price": float(cols["home_price"][i]),
+            "monthly_payment": float(payment[i]),
+            "owning_effective_net": float(owning[i]),
+            "renting_effective_net": float(renting[i]),
+            "buy_advantage": float(advantage[i]),
+        }
+        for rank, i in enumerate(order, start=1)
+    ]
+    if rental_income:
+        total_cash_flow = float(cash_flow.sum())
+        for row in rows:
+            row["total_rental_cash_flow"] = total_cash_flow
+    return rows
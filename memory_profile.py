@@ -0,0 +1,126 @@
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Opt-in memory profiling for batch and Monte Carlo runs. A
+# MemoryProfiler wraps the stages of a run (simulation, aggregation,
+# export, ...) and records, per stage, the number of calls, time, net
+# allocation and peak allocation above the stage's starting point, as
+# seen by tracemalloc (numpy reports its buffers to it). The first call
+# of every stage also keeps the source lines that allocated the most,
+# from tracemalloc snapshots taken before and after it. Profiling only
+# sees the current process, so profiled runs compute in-process.
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 2 ** 10, "KB": 2 ** 10, "M": 2 ** 20, "MB": 2 ** 20,
+               "G": 2 ** 30, "GB": 2 ** 30, "T": 2 ** 40, "TB": 2 ** 40}
+
+
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def parse_memory_size(size):
+    """Bytes from an int or a string such as "512MB" or "2.5 GB" (binary units)."""
+    if isinstance(size, (int, float)):
+        return int(size)
+    match = re.fullmatch(r"\s*([0-9]+(?:\.[0-9]*)?|\.[0-9]+)\s*([A-Za-z]*)\s*", size)
+    if not match or match.group(2).upper() not in _SIZE_UNITS:
+        raise ValueError(f"Cannot parse memory size: {size!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+class MemoryProfiler:
+    """Per-stage tracemalloc statistics; use as `with profiler.stage("name"):`.
+
+    Stages may nest; an outer stage's peak includes its inner stages.
+    tracemalloc is started on first use if it is not already running and
+    stopped by stop() (or on leaving `with MemoryProfiler() as profiler:`).
+    """
+
+    def __init__(self, top=5, snapshot_calls=1):
+        self.top = top
+        self.snapshot_calls = snapshot_calls
+        self.stages = {}
+        self._stack = []
+        self._started = False
+        self._peak = 0
+
+    def __enter__(self):
+        self._start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def stop(self):
+        if self._started:
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self._started = False
+
+    @contextmanager
+    def stage(self, name):
+        self._start()
+        record = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "net_bytes": 0,
+                                               "peak_bytes": 0, "top": []})
+        before = _snapshot() if record["calls"] < self.snapshot_calls else None
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        self._peak = max(self._peak, peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self._stack.append(frame)
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - began
+            current, peak = tracemalloc.get_traced_memory()
+            self._stack.pop()
+            peak = max(peak, frame[1])
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self._peak = max(self._peak, peak)
+
+            record["calls"] += 1
+            record["seconds"] += seconds
+            record["net_bytes"] += current - frame[0]
+            record["peak_bytes"] = max(record["peak_bytes"], peak - frame[0])
+            if before is not None:
+                after = _snapshot()
+                record["top"] = [(str(diff.traceback), diff.size_diff)
+                                 for diff in after.compare_to(before, "lineno")[:self.top]]
+
+    @property
+    def peak_bytes(self):
+        """Highest traced memory seen while profiling."""
+        if tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        return self._peak
+
+    def report(self):
+        """One dict per stage (in first-use order) plus the overall peak."""
+        return {
+            "peak_bytes": self.peak_bytes,
+            "stages": [dict(record, stage=name) for name, record in self.stages.items()],
+        }
+
+
+def profile_stage(profiler, name):
+    """profiler.stage(name), or a no-op when profiling is off (profiler=None)."""
+    return nullcontext() if profiler is None else profiler.stage(name)
@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from batch_simulation import (broadcast_params, chunk_size_for_budget, default_chunk_size, simulate_batch,
+                              simulate_chunk, PARAMETER_NAMES, SUMMARY_FIELDS, LEDGER_FIELDS)
+
+# Process-pool execution of chunked work. Tasks are plain picklable
+# tuples handled by module-level functions, and results always come back
+# in task order so parallel runs reproduce serial runs exactly.
+#
+# Batch runs move data through multiprocessing.shared_memory: the parent
+# places the input columns and preallocated output arrays in shared
+# blocks, workers write each chunk's summaries (and ledgers) straight into
+# their rows, and only small status tuples travel back through pickling.
+
+
+def default_workers():
+    """Number of worker processes to use when none is given.
+
+    This is the autotune profile's worker count for this machine, or the
+    number of CPUs without a profile.
+    """
+    from autotune import tuned_workers
+    return tuned_workers() or os.cpu_count() or 1
+
+
+def map_chunks(func, tasks, workers=None, pool=None):
+    """Apply func to every task, in parallel when workers > 1, results in task order.
+
+    Pass an open ProcessPoolExecutor as `pool` to reuse it across calls.
+    """
+    tasks = list(tasks)
+    if pool is not None:
+        return list(pool.map(func, tasks))
+    workers = workers or default_workers()
+    if workers == 1 or len(tasks) <= 1:
+        return [func(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(func, tasks))
+
+
+class _SharedBlock(np.ndarray):
+    """ndarray over a shared-memory block; keeps the block mapped while any view exists."""
+
+
+def _shared_array(shape, dtype):
+    """Allocate a zeroed array in a new shared-memory block; returns (array, block)."""
+    size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+    block = shared_memory.SharedMemory(create=True, size=size)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf).view(_SharedBlock)
+    array._shm = block
+    array.fill(0)
+    return array, block
+
+
+# Blocks a worker process has attached to, by name. Reset whenever a task
+# refers to a different set of blocks so old runs are unmapped.
+_attached = {}
+
+
+def _attach(specs):
+    """Map the named shared blocks in a worker; specs are (name, shape, dtype)."""
+    global _attached
+    names = tuple(name for name, _, _ in specs)
+    if tuple(_attached) != names:
+        _attached = {}
+        for name, shape, dtype in specs:
+            block = shared_memory.SharedMemory(name=name)
+            _attached[name] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+    return [_attached[name][1] for name in names]
+
+
+def _detach():
+    """Unmap every attached block (after in-process tasks have run in the parent)."""
+    global _attached
+    blocks = [block for block, _ in _attached.values()]
+    _attached = {}
+    for block in blocks:
+        block.close()
+
+
+def _shared_batch_chunk(task):
+    """Worker: simulate rows [start, stop) and write them into shared outputs."""
+    start, stop, specs, dtype = task
+    began = time.perf_counter()
+    arrays = _attach(specs)
+    inputs, summary_out = arrays[0], arrays[1]
+    cols = {name: inputs[i, start:stop] for i, name in enumerate(PARAMETER_NAMES)}
+    summary, monthly = simulate_chunk(cols, ledgers=len(arrays) > 2, dtype=dtype)
+    for i, name in enumerate(summary):
+        summary_out[i, start:stop] = summary[name]
+    if monthly is not None:
+        ledger_out = arrays[2]
+        for i, name in enumerate(LEDGER_FIELDS):
+            ledger_out[i, start:stop, :monthly[name].shape[1]] = monthly[name]
+    return start, stop, os.getpid(), time.perf_counter() - began
+
+
+def simulate_batch_parallel(params, workers=None, chunk_size=None, ledgers=False,
+                            dtype=np.float64, status=None, memory_budget=None):
+    """simulate_batch spread over worker processes, without pickling results.
+
+    Returns the same dict as simulate_batch. Its arrays are views into the
+    shared output blocks the workers wrote to (the blocks are unlinked as
+    soon as the run ends and unmapped when the arrays are released), so
+    the parent never holds a second copy. If `status` is a list, one
+    (start, stop, worker pid, seconds) tuple per chunk is appended to it.
+    memory_budget caps each worker's chunk working memory (see
+    batch_simulation.chunk_size_for_budget).
+    """
+    workers = workers or default_workers()
+    if workers == 1:
+        return simulate_batch(params, ledgers=ledgers, chunk_size=chunk_size, dtype=dtype,
+                              memory_budget=memory_budget)
+
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    max_months = int((cols["months_live_in"] + cols["months_rent_out"]).max())
+    chunk_size = chunk_size or default_chunk_size(max_months, ledgers, dtype)
+    if memory_budget is not None:
+        chunk_size = min(chunk_size, chunk_size_for_budget(memory_budget, max_months, ledgers, dtype))
+    fields = SUMMARY_FIELDS + (("float32_error_bound",) if np.dtype(dtype) == np.float32 else ())
+
+    blocks = []
+    try:
+        inputs, block = _shared_array((len(PARAMETER_NAMES), n), np.float64)
+        blocks.append(block)
+        for i, name in enumerate(PARAMETER_NAMES):
+            inputs[i] = cols[name]
+        del cols
+        summary_out, block = _shared_array((len(fields), n), np.float64)
+        blocks.append(block)
+        specs = [(blocks[0].name, inputs.shape, "float64"), (block.name, summary_out.shape, "float64")]
+        if ledgers:
+            ledger_out, block = _shared_array((len(LEDGER_FIELDS), n, max_months), dtype)
+            blocks.append(block)
+            specs.append((block.name, ledger_out.shape, np.dtype(dtype).str))
+
+        tasks = [(start, min(start + chunk_size, n), specs, dtype) for start in range(0, n, chunk_size)]
+        chunk_status = map_chunks(_shared_batch_chunk, tasks, workers)
+        if status is not None:
+            status.extend(chunk_status)
+    finally:
+        # A single chunk runs in this process (see map_chunks).
+        _detach()
+        for block in blocks:
+            block.unlink()
+
+    results = {name: summary_out[i].view(np.ndarray) for i, name in enumerate(fields)}
+    if ledgers:
+        results.update({name: ledger_out[i].view(np.ndarray) for i, name in enumerate(LEDGER_FIELDS)})
+    return results
@@ -0,0 +1,234 @@
+import os
+import threading
+from multiprocessing import Pool
+
+import numpy as np
+from matplotlib.colors import TwoSlopeNorm
+from matplotlib.figure import Figure
+from matplotlib.image import NonUniformImage
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from rollups import period_sums
+
+# Off-screen rendering of the comparison chart. Everything here uses the
+# object-oriented Figure API on an Agg canvas, so nothing touches pyplot's
+# global figure manager: no display is needed, nothing blocks, and figures
+# are reused per thread instead of piling up across a loop.
+
+SERIES_STYLES = [
+    ("cumulative_rent_no_buy", "Cumulative Rent (No Buy)", "red"),
+    ("cumulative_home_cost", "Cumulative Home Cost", "blue"),
+    ("cumulative_investment_balance", "Investment from Monthly Diff", "green"),
+    ("monthly_equity", "Home Equity", "purple"),
+]
+
+_local = threading.local()
+
+
+def comparison_series(monthly_rent_no_buy, monthly_total_home_cost,
+                      monthly_investment_contribution, monthly_equity,
+                      monthly_invest_rate):
+    """Build the cumulative series plotted by the comparison chart.
+
+    The investment balance at month i is the future value of every
+    contribution made so far, i.e. b_i = b_(i-1) * (1 + r) + c_i. It is
+    computed as one scaled cumulative sum instead of re-running the
+    future value of the whole prefix for every month.
+    """
+    contributions = np.asarray(monthly_investment_contribution, dtype=np.float64)
+    months = np.arange(len(contributions))
+    growth = (1 + monthly_invest_rate) ** months
+    balance = growth * np.cumsum(contributions / growth)
+    return {
+        "cumulative_rent_no_buy": np.cumsum(np.asarray(monthly_rent_no_buy, dtype=np.float64)),
+        "cumulative_home_cost": np.cumsum(np.asarray(monthly_total_home_cost, dtype=np.float64)),
+        "cumulative_investment_balance": balance,
+        "monthly_equity": np.asarray(monthly_equity, dtype=np.float64),
+    }
+
+
+def decimate_series(x, y, max_points):
+    """Reduce a series to at most max_points points, keeping each bucket's min and max.
+
+    Series shorter than max_points are returned unchanged. Keeping the
+    extremes of every bucket means spikes survive even though most
+    points are dropped.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(y)
+    if n <= max_points or max_points < 4:
+        return x, y
+
+    num_buckets = max_points // 2
+    edges = np.linspace(0, n, num_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(num_buckets), np.diff(edges))
+    # Sorting by (bucket, y) puts each bucket's min first and max last.
+    order = np.lexsort((y, bucket))
+    keep = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+    return x[keep], y[keep]
+
+
+def _get_figure(width, height, dpi):
+    """Return this thread's reusable figure, creating it on first use."""
+    key = (width, height, dpi)
+    cached = getattr(_local, "figure", None)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2], cached[3]
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    lines = {}
+    for name, label, color in SERIES_STYLES:
+        (lines[name],) = ax.plot([], [], label=label, color=color)
+    ax.set_xlabel("Month")
+    ax.set_ylabel("USD")
+    ax.legend(loc="upper left")
+    ax.grid(True)
+    _local.figure = (key, fig, ax, lines)
+    return fig, ax, lines
+
+
+def render_comparison_plot(
+    path, monthly_rent_no_buy, monthly_total_home_cost,
+    monthly_investment_contribution, monthly_equity, monthly_invest_rate,
+    title="Cumulative Comparison Over Time", width=10, height=6, dpi=100
+):
+    """Render the cumulative comparison chart straight to a PNG/SVG file.
+
+    The output format follows the file extension. The figure is reused
+    between calls on the same thread; only line data, limits and title
+    change, so rendering many charts in a loop keeps memory flat.
+    """
+    fig, ax, lines = _get_figure(width, height, dpi)
+    series = comparison_series(
+        monthly_rent_no_buy, monthly_total_home_cost,
+        monthly_investment_contribution, monthly_equity, monthly_invest_rate)
+
+    max_points = int(width * dpi)
+    months = np.arange(1, len(series["monthly_equity"]) + 1)
+    for name, line in lines.items():
+        x, y = decimate_series(months, series[name], max_points)
+        line.set_data(x, y)
+
+    ax.relim()
+    ax.autoscale_view()
+    ax.set_title(title)
+    fig.savefig(path)
+    return path
+
+
+def _render_job(job):
+    """Pool worker: render one job dict and return its output path."""
+    job = dict(job)
+    path = job.pop("path")
+    return render_comparison_plot(path, **job)
+
+
+def render_comparison_plots(jobs, output_dir, fmt="png", processes=None,
+                            chunksize=16, maxtasksperchild=500):
+    """Render many comparison charts to files using a pool of worker processes.
+
+    Each job is a dict holding the keyword arguments of
+    render_comparison_plot plus a "name" used for the file name. Workers
+    are recycled every maxtasksperchild jobs so long overnight runs
+    cannot slowly grow their memory. Returns the written paths in
+    completion order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    def with_paths():
+        for job in jobs:
+            job = dict(job)
+            name = job.pop("name")
+            job["path"] = os.path.join(output_dir, f"{name}.{fmt}")
+            yield job
+
+    if processes == 1:
+        return [_render_job(job) for job in with_paths()]
+
+    with Pool(processes=processes, maxtasksperchild=maxtasksperchild) as pool:
+        return list(pool.imap_unordered(_render_job, with_paths(), chunksize=chunksize))
+
+
+def render_amortization_chart(path, monthly_principal_paid, monthly_interest_paid, period=12,
+                              title="Amortization by Year", width=10, height=6, dpi=100):
+    """Render principal and interest paid per period (12 months = years) as stacked bars."""
+    principal = period_sums(monthly_principal_paid, period)
+    interest = period_sums(monthly_interest_paid, period)
+    periods = np.arange(1, len(principal) + 1)
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.bar(periods, principal, label="Principal Paid", color="blue")
+    ax.bar(periods, interest, bottom=principal, label="Interest Paid", color="orange")
+    ax.set_xlabel("Year" if period == 12 else f"Period ({period} months)")
+    ax.set_ylabel("USD")
+    ax.set_title(title)
+    ax.legend(loc="upper right")
+    ax.grid(True, axis="y")
+    fig.savefig(path)
+    return path
+
+
+def _is_uniform(values):
+    steps = np.diff(values)
+    return len(values) < 3 or np.allclose(steps, steps[0], rtol=1e-6, atol=0)
+
+
+def _outer_edges(values):
+    """Edges of the cells centered on the first and last of `values`."""
+    if len(values) < 2:
+        return values[0] - 0.5, values[0] + 0.5
+    return values[0] - (values[1] - values[0]) / 2, values[-1] + (values[-1] - values[-2]) / 2
+
+
+def render_sweep_heatmap(path, grid, y_name, y_values, x_name, x_values,
+                         title="Buy Advantage (USD)", width=8, height=6, dpi=100,
+                         cmap="RdYlGn"):
+    """Render a 2-D sweep as a heatmap with its break-even contour.
+
+    `grid` is (len(y_values), len(x_values)), e.g. from
+    batch_simulation.sweep_grid with the y axis first. The grid is drawn
+    as a single image (NonUniformImage when an axis is unevenly spaced),
+    so a 1000 x 1000 sweep costs about as much as a small one. Colors are
+    centered on zero and the zero level, where buying and renting break
+    even, is drawn as a black contour line.
+    """
+    grid = np.asarray(grid, dtype=np.float64)
+    x_values = np.asarray(x_values, dtype=np.float64)
+    y_values = np.asarray(y_values, dtype=np.float64)
+
+    fig = Figure(figsize=(width, height), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+
+    low, high = np.nanmin(grid), np.nanmax(grid)
+    norm = TwoSlopeNorm(0.0, low, high) if low < 0 < high else None
+    # Cells are centered on the sweep values, where the contour is drawn.
+    extent = _outer_edges(x_values) + _outer_edges(y_values)
+    if _is_uniform(x_values) and _is_uniform(y_values):
+        image = ax.imshow(grid, origin="lower", extent=extent, aspect="auto",
+                          interpolation="nearest", cmap=cmap, norm=norm)
+    else:
+        image = NonUniformImage(ax, interpolation="nearest", extent=extent, cmap=cmap, norm=norm)
+        image.set_data(x_values, y_values, grid)
+        ax.add_image(image)
+        ax.set_xlim(extent[:2])
+        ax.set_ylim(extent[2:])
+    colorbar = fig.colorbar(image, ax=ax, label="USD")
+    if norm is not None:
+        colorbar.set_ticks(np.concatenate([np.linspace(low, 0, 4), np.linspace(0, high, 4)[1:]]))
+
+    if low < 0 < high and len(x_values) > 1 and len(y_values) > 1:
+        contour = ax.contour(x_values, y_values, grid, levels=[0.0], colors="black", linewidths=1.5)
+        ax.clabel(contour, fmt={0.0: "break-even"}, fontsize=8)
+
+    ax.set_xlabel(x_name)
+    ax.set_ylabel(y_name)
+    ax.set_title(title)
+    fig.savefig(path)
+    return path
+
@@ -0,0 +1,161 @@
+from financial_utils import (future_value, calculate_future_monthly_investments)
+from property_analysis import PropertyCosts
+from rental_analysis import RentalScenario
+
+# Frozen copy of the month-by-month loop in simulation.simulate_scenario,
+# without the printing and plotting. Faster engines are checked against
+# this implementation (see fuzz_harness.py) and simulate_scenario runs
+# it through scenario_engine.compute_scenario, so its semantics must not
+# change: the monthly pro-rated property_tax_deduction_cap applied to
+# interest + property tax, the max(0, ...) clamp on the investment
+# contribution, amortization continuing past the end of the term, and the
+# months_rent_out == 0 handling of the rent-out inputs.
+
+
+def reference_scenario(
+    home_price,
+    down_payment_pct,
+    mortgage_rate_annual,
+    mortgage_term_years,
+    property_tax_rate_annual,
+    maintenance_annual,
+    insurance_annual,
+    hoa_monthly,
+    closing_costs_buy_pct,
+    closing_costs_sell_pct,
+    rent_current,
+    rent_growth_annual,
+    alt_invest_growth_annual,
+    monthly_invest_growth_annual,
+    home_appreciation_annual,
+    tax_rate,
+    property_tax_deduction_cap,
+    months_live_in,
+    months_rent_out,
+    rent_while_out,
+    rent_collected_home
+):
+    """Run one scenario with the reference loop and return every result and ledger.
+
+    Also returns the "property_costs" and "rental_scenario" objects,
+    "total_months" and "monthly_invest_monthly_rate" for the displays.
+    """
+    property_costs = PropertyCosts(
+        home_price, down_payment_pct, mortgage_rate_annual, mortgage_term_years,
+        property_tax_rate_annual, maintenance_annual, insurance_annual, hoa_monthly
+    )
+    property_costs.mortgage_rate_annual = mortgage_rate_annual
+
+    rental_scenario = RentalScenario(
+        property_costs,
+        months_live_in,
+        months_rent_out,
+        rent_while_out if months_rent_out > 0 else 0,
+        rent_collected_home if months_rent_out > 0 else 0,
+        rent_growth_annual,
+        rent_current
+    )
+
+    total_months = months_live_in + months_rent_out
+    closing_costs_buy = closing_costs_buy_pct * home_price
+
+    monthly_interest_paid = []
+    monthly_principal_paid = []
+    monthly_total_home_cost = []
+    monthly_tax_savings = []
+    monthly_investment_contribution = []
+    monthly_home_value = []
+    monthly_equity = []
+
+    remaining_principal = property_costs.loan_amount
+    alt_invest_monthly_rate = (1 + alt_invest_growth_annual)**(1/12) - 1
+    monthly_invest_monthly_rate = (1 + monthly_invest_growth_annual)**(1/12) - 1
+
+    for m in range(1, total_months + 1):
+        principal_paid, interest_paid = property_costs.calculate_monthly_mortgage_split(
+            remaining_principal, mortgage_rate_annual)
+        remaining_principal -= principal_paid
+
+        month_home_cost = property_costs.get_monthly_costs()
+
+        monthly_deductible = min(interest_paid + property_costs.property_tax_annual/12,
+                               property_tax_deduction_cap/12)
+        tax_saving_this_month = monthly_deductible * tax_rate
+
+        monthly_total_cost = (principal_paid + interest_paid +
+                             property_costs.property_tax_annual/12 +
+                             property_costs.maintenance_annual/12 +
+                             property_costs.insurance_annual/12 +
+                             property_costs.hoa_monthly -
+                             tax_saving_this_month)
+        invest_contribution = max(0, monthly_total_cost - rental_scenario.monthly_rent_if_no_buy[m-1])
+
+        month_fraction_years = m/12
+        home_value_now = home_price * ((1 + home_appreciation_annual)**month_fraction_years)
+        current_equity = home_value_now - remaining_principal
+
+        monthly_interest_paid.append(interest_paid)
+        monthly_principal_paid.append(principal_paid)
+        monthly_total_home_cost.append(month_home_cost)
+        monthly_tax_savings.append(tax_saving_this_month)
+        monthly_investment_contribution.append(invest_contribution)
+        monthly_home_value.append(home_value_now)
+        monthly_equity.append(current_equity)
+
+    home_value_after = monthly_home_value[-1]
+    selling_costs = home_value_after * closing_costs_sell_pct
+    final_equity = home_value_after - selling_costs - remaining_principal
+
+    total_monthly_paid = sum(monthly_total_home_cost)
+    total_tax_savings = sum(monthly_tax_savings)
+    total_rent_no_buy = sum(rental_scenario.monthly_rent_if_no_buy[:months_live_in])
+    if months_rent_out > 0:
+        total_rent_no_buy += sum(rental_scenario.monthly_rent_if_no_buy[months_live_in:])
+
+    fv_monthly_invest = calculate_future_monthly_investments(
+        monthly_investment_contribution, monthly_invest_monthly_rate, total_months)
+    fv_down_payment = future_value(property_costs.down_payment,
+                                 alt_invest_growth_annual, total_months/12)
+    fv_principal_opportunity = calculate_future_monthly_investments(
+        monthly_principal_paid, alt_invest_monthly_rate, total_months)
+
+    total_buying_cost = (property_costs.down_payment + closing_costs_buy +
+                        total_monthly_paid - total_tax_savings)
+    net_cost_after_selling = total_buying_cost - final_equity
+    fv_invest_if_rent = fv_down_payment + fv_principal_opportunity
+
+    owning_effective_net = fv_monthly_invest - net_cost_after_selling
+    renting_effective_net = fv_invest_if_rent - total_rent_no_buy
+
+    return {
+        "monthly_payment": property_costs.calculate_monthly_payment(mortgage_rate_annual),
+        "home_value_after": home_value_after,
+        "remaining_principal": remaining_principal,
+        "selling_costs": selling_costs,
+        "final_equity": final_equity,
+        "down_payment": property_costs.down_payment,
+        "closing_costs_buy": closing_costs_buy,
+        "total_monthly_paid": total_monthly_paid,
+        "total_tax_savings": total_tax_savings,
+        "net_cost_after_selling": net_cost_after_selling,
+        "total_rent_no_buy": total_rent_no_buy,
+        "fv_monthly_invest": fv_monthly_invest,
+        "fv_down_payment": fv_down_payment,
+        "fv_principal_opportunity": fv_principal_opportunity,
+        "fv_invest_if_rent": fv_invest_if_rent,
+        "owning_effective_net": owning_effective_net,
+        "renting_effective_net": renting_effective_net,
+        "buy_advantage": owning_effective_net - renting_effective_net,
+        "monthly_interest_paid": monthly_interest_paid,
+        "monthly_principal_paid": monthly_principal_paid,
+        "monthly_total_home_cost": monthly_total_home_cost,
+        "monthly_tax_savings": monthly_tax_savings,
+        "monthly_investment_contribution": monthly_investment_contribution,
+        "monthly_home_value": monthly_home_value,
+        "monthly_equity": monthly_equity,
+        "monthly_rent_if_no_buy": rental_scenario.monthly_rent_if_no_buy[:total_months],
+        "property_costs": property_costs,
+        "rental_scenario": rental_scenario,
+        "total_months": total_months,
+        "monthly_invest_monthly_rate": monthly_invest_monthly_rate,
+    }
@@ -0,0 +1,276 @@
+import argparse
+import sys
+
+import numpy as np
+
+from annual_screening import geometric_sum
+from batch_simulation import broadcast_params, default_chunk_size
+from stochastic_economy import chunk_rng
+
+# Stochastic operating model for the months a home is rented out.
+# RentalScenario.calculate_monthly_cashflow assumes a tenant pays
+# rent_collected_home every month with no costs; here each row (a
+# scenario or one path of it) gets a random sequence of tenancies:
+#
+#   - the home is first leased up, then every lease runs lease_months
+#     and is renewed with renewal_probability, so tenancies last a
+#     geometric number of leases;
+#   - between tenants the home stands empty for a geometric number of
+#     months with mean vacancy_months;
+#   - every move-out costs turnover_cost and every new lease a leasing
+#     fee of leasing_fee_pct of a month's rent;
+#   - the manager takes management_fee_pct of the rent collected;
+#   - repairs hit each rented-out month with repair_probability, with
+#     lognormal costs of mean repair_cost.
+#
+# Tenancy and vacancy lengths and repair arrivals are drawn for a whole
+# chunk at once as (rows x cycles) arrays. Totals come straight from
+# them (closed-form rent sums per tenancy); monthly ledgers, when asked
+# for, turn them into a (rows x months) occupied mask with one
+# cumulative sum.
+
+OPERATION_FIELDS = (
+    "monthly_rent_collected",
+    "monthly_vacancy_loss",
+    "monthly_management_fees",
+    "monthly_turnover_costs",
+    "monthly_repair_costs",
+    "monthly_net_operating_income",
+    "monthly_landlord_cash_flow",
+)
+
+
+class RentalOperations:
+    def __init__(self, vacancy_months=1.0, lease_months=12, renewal_probability=0.5,
+                 turnover_cost=2500.0, leasing_fee_pct=0.5, management_fee_pct=0.08,
+                 repair_probability=0.03, repair_cost=2000.0, repair_cost_sigma=1.0):
+        """Operating assumptions for renting the home out.
+
+        vacancy_months is the mean number of empty months before each new
+        tenant (including the first); leases of lease_months are renewed
+        with renewal_probability. turnover_cost is paid when a tenant
+        moves out during the rental period, leasing_fee_pct (of one
+        month's rent) on every new lease. repair_probability is the
+        monthly chance of a repair, whose cost is lognormal with mean
+        repair_cost and log-space sigma repair_cost_sigma.
+        """
+        self.vacancy_months = vacancy_months
+        self.lease_months = lease_months
+        self.renewal_probability = renewal_probability
+        self.turnover_cost = turnover_cost
+        self.leasing_fee_pct = leasing_fee_pct
+        self.management_fee_pct = management_fee_pct
+        self.repair_probability = repair_probability
+        self.repair_cost = repair_cost
+        self.repair_cost_sigma = repair_cost_sigma
+
+    def mean_cycle_months(self):
+        """Expected months of one vacancy plus tenancy."""
+        return self.vacancy_months + self.lease_months / (1 - self.renewal_probability)
+
+
+def _draw(rent_out_months, operations, rng):
+    """Random tenancies and repairs for each row's rental period.
+
+    Returns (rows, cycles) move-in and end months and (rows, repairs)
+    repair months and costs, all counted from the start of the period
+    (0-based). Entries at or past a row's rent_out_months fall outside
+    its period.
+    """
+    rows = len(rent_out_months)
+    longest = int(rent_out_months.max())
+    cycles = int(np.ceil(longest / operations.mean_cycle_months())) * 2 + 2
+    while True:
+        vacancies = rng.geometric(1 / (1 + operations.vacancy_months), (rows, cycles)) - 1
+        tenancies = operations.lease_months * rng.geometric(1 - operations.renewal_probability, (rows, cycles))
+        ends = np.cumsum(vacancies + tenancies, axis=1)
+        if np.all(ends[:, -1] >= rent_out_months):
+            break
+        cycles *= 2
+
+    # Repairs arrive after geometric gaps of months.
+    repairs = 0
+    if operations.repair_probability > 0:
+        repairs = int(np.ceil(longest * operations.repair_probability * 2)) + 4
+        while True:
+            repair_months = np.cumsum(rng.geometric(operations.repair_probability, (rows, repairs)), axis=1) - 1
+            if np.all(repair_months[:, -1] >= rent_out_months):
+                break
+            repairs *= 2
+    else:
+        repair_months = np.full((rows, 1), longest)
+    sigma = operations.repair_cost_sigma
+    repair_costs = rng.lognormal(np.log(operations.repair_cost) - sigma ** 2 / 2, sigma, repair_months.shape)
+    return ends - tenancies, ends, repair_months, repair_costs
+
+
+def _totals(cols, operations, draws):
+    """(n,) totals of every operating flow from the draws, via closed-form rent sums."""
+    move_in, ends, repair_months, repair_costs = draws
+    first = cols["months_live_in"][:, None]
+    period = cols["months_rent_out"][:, None]
+    log_rent = np.log1p(cols["rent_growth_annual"])[:, None] / 12
+
+    # Rent in 0-based horizon month j is rent_collected_home * exp(j * log_rent).
+    start = np.minimum(move_in, period)
+    count = np.minimum(ends, period) - start
+    collected = (cols["rent_collected_home"][:, None] * np.exp((first + start) * log_rent) *
+                 geometric_sum(log_rent, count)).sum(axis=1)
+    period_rent = np.exp(first * log_rent) * geometric_sum(log_rent, period)
+    new_leases = np.where(move_in < period, np.exp((first + move_in) * log_rent), 0.0).sum(axis=1)
+    turnovers = (ends < period).sum(axis=1)
+
+    totals = {
+        "total_rent_collected": collected,
+        "total_vacancy_loss": cols["rent_collected_home"] * period_rent[:, 0] - collected,
+        "total_management_fees": collected * operations.management_fee_pct,
+        "total_turnover_costs": (turnovers * operations.turnover_cost +
+                                 operations.leasing_fee_pct * cols["rent_collected_home"] * new_leases),
+        "total_repair_costs": np.where(repair_months < period, repair_costs, 0.0).sum(axis=1),
+    }
+    totals["total_net_operating_income"] = (totals["total_rent_collected"] - totals["total_management_fees"] -
+                                            totals["total_turnover_costs"] - totals["total_repair_costs"])
+    totals["total_landlord_cash_flow"] = (totals["total_net_operating_income"] -
+                                          cols["rent_while_out"] * period_rent[:, 0])
+    totals["vacant_months"] = (period[:, 0] - np.maximum(count, 0).sum(axis=1)).astype(np.float64)
+    totals["turnovers"] = turnovers.astype(np.float64)
+    return totals
+
+
+def _ledgers(cols, operations, draws, num_months, fields=OPERATION_FIELDS):
+    """(n, num_months) OPERATION_FIELDS (those in `fields`) over the horizon from the draws."""
+    move_in, ends, repair_months, repair_costs = draws
+    first = cols["months_live_in"].astype(np.int64)[:, None]
+    period = cols["months_rent_out"].astype(np.int64)[:, None]
+    rows = np.arange(len(first))[:, None]
+    months = np.arange(num_months)
+    log_rent = np.log1p(cols["rent_growth_annual"])[:, None] / 12
+    renting_out = (months >= first) & (months < first + period)
+
+    def horizon(relative):
+        """Horizon columns of period-relative months; those past the period go to the spare last column."""
+        return np.where(relative < period, first + relative, num_months)
+
+    def events(relative, values):
+        """Grid with `values` at the given months; months increase within a row, so only
+        the spare column sees repeated positions."""
+        grid = np.zeros((len(first), num_months + 1))
+        grid[rows, horizon(relative)] = values
+        return grid[:, :num_months]
+
+    # +1 where a tenancy starts, -1 where it ends; the running sum is 1
+    # while occupied.
+    steps = np.zeros((len(first), num_months + 1), dtype=np.int8)
+    steps[rows, horizon(move_in)] += 1
+    steps[rows, np.minimum(first + ends, num_months)] -= 1
+    occupied = (np.cumsum(steps[:, :num_months], axis=1, dtype=np.int8) > 0) & renting_out
+
+    growth = np.exp(months * log_rent)
+    rent = cols["rent_collected_home"][:, None] * growth
+    collected = np.where(occupied, rent, 0.0)
+    # Move-outs are charged in the first month after the tenancy; one
+    # ending with the rental period is the sale, not a turnover.
+    leasing_fees = (operations.leasing_fee_pct * cols["rent_collected_home"][:, None] *
+                    np.exp((first + move_in) * log_rent))
+    turnover_costs = events(ends, operations.turnover_cost) + events(move_in, leasing_fees)
+    repairs = events(repair_months, repair_costs)
+    net_operating_income = collected * (1 - operations.management_fee_pct) - turnover_costs - repairs
+
+    result = {}
+    for name in fields:
+        if name == "monthly_rent_collected":
+            result[name] = collected
+        elif name == "monthly_vacancy_loss":
+            result[name] = np.where(renting_out & ~occupied, rent, 0.0)
+        elif name == "monthly_management_fees":
+            result[name] = collected * operations.management_fee_pct
+        elif name == "monthly_turnover_costs":
+            result[name] = turnover_costs
+        elif name == "monthly_repair_costs":
+            result[name] = repairs
+        elif name == "monthly_net_operating_income":
+            result[name] = net_operating_income
+        elif name == "monthly_landlord_cash_flow":
+            rent_while_out = cols["rent_while_out"][:, None] * growth
+            result[name] = np.where(renting_out, net_operating_income - rent_while_out, 0.0)
+        else:
+            raise ValueError(f"Unknown operation field: {name}")
+    return result
+
+
+def simulate_operations(cols, operations, rng, num_months=None, ledgers=False):
+    """Rental cash flows for one block of broadcast scenarios.
+
+    Returns (n,) totals "total_rent_collected", "total_vacancy_loss",
+    "total_management_fees", "total_turnover_costs",
+    "total_repair_costs", "total_net_operating_income" and
+    "total_landlord_cash_flow", plus "vacant_months" and "turnovers".
+    With ledgers=True it also returns OPERATION_FIELDS as
+    (n, num_months) arrays over the whole horizon, zero outside the
+    rent-out months; a list of field names builds only those. The
+    totals are the same either way.
+
+    Rent collected and rent paid elsewhere grow with rent_growth_annual
+    from the start of the horizon, as in RentalScenario. Landlord cash
+    flow is net operating income minus rent paid elsewhere, the
+    stochastic counterpart of calculate_monthly_cashflow. Totals come
+    from closed-form rent sums per tenancy, so without ledgers the cost
+    grows with the number of tenancies, not months.
+    """
+    draws = _draw(cols["months_rent_out"].astype(np.int64), operations, rng)
+    result = _totals(cols, operations, draws)
+    if ledgers:
+        num_months = num_months or int((cols["months_live_in"] + cols["months_rent_out"]).max())
+        fields = OPERATION_FIELDS if ledgers is True else ledgers
+        result.update(_ledgers(cols, operations, draws, num_months, fields))
+    return result
+
+
+def simulate_rental_operations(params, operations=None, seed=0, chunk_size=None, ledgers=False):
+    """Stochastic rental cash flows for many scenarios (or paths of one).
+
+    Every row is an independent draw; repeat a scenario's parameters to
+    get several paths of it. Chunk i draws from chunk_rng(seed, i), so
+    results do not depend on anything but the seed and chunk size (pass
+    chunk_size to reproduce them under another autotune profile).
+    Returns the (n,) totals and, with ledgers=True, the (n, max months)
+    OPERATION_FIELDS.
+    """
+    operations = operations or RentalOperations()
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    num_months = int((cols["months_live_in"] + cols["months_rent_out"]).max())
+    chunk_size = chunk_size or default_chunk_size(num_months, ledgers)
+    results = None
+    for chunk_index, start in enumerate(range(0, n, chunk_size)):
+        stop = min(start + chunk_size, n)
+        chunk = {name: col[start:stop] for name, col in cols.items()}
+        flows = simulate_operations(chunk, operations, chunk_rng(seed, chunk_index), num_months, ledgers)
+        if results is None:
+            results = {name: np.empty((n,) + values.shape[1:]) for name, values in flows.items()}
+        for name, values in flows.items():
+            results[name][start:stop] = values
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate landlord cash flow for the default scenario")
+    parser.add_argument("--paths", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--vacancy-months", type=float, default=1.0)
+    parser.add_argument("--management-fee", type=float, default=0.08)
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    from display_utils import display_rental_operations
+    from fuzz_harness import BASE_SCENARIO
+    operations = RentalOperations(vacancy_months=args.vacancy_months, management_fee_pct=args.management_fee)
+    params = dict(BASE_SCENARIO, home_price=np.full(args.paths, float(BASE_SCENARIO["home_price"])))
+    display_rental_operations(simulate_rental_operations(params, operations, seed=args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+import argparse
+import json
+import sys
+from bisect import bisect_right
+
+import numpy as np
+
+from batch_simulation import broadcast_params, grid_params, grid_size, simulate_batch, simulate_chunk, \
+    default_chunk_size, sweep_months, PARAMETER_NAMES
+
+# Precomputed response surfaces for interactive use. buy_advantage
+# (owning_effective_net - renting_effective_net) is evaluated by the batch
+# engine on a grid over a few inputs, with every other input fixed, and
+# stored as a float32 .npy file next to a small JSON description. Queries
+# memory-map the grid and interpolate multilinearly between the 2^d
+# surrounding nodes; the interpolation error is estimated from second
+# differences along each axis, and queries whose estimate exceeds the
+# tolerance (or that leave the grid) are answered by the engine instead.
+
+SURFACE_VERSION = 1
+
+
+def default_axes(base, points=25):
+    """Slider ranges for the inputs that move buy_advantage the most."""
+    return {
+        "home_price": np.linspace(0.5, 1.5, points) * base["home_price"],
+        "mortgage_rate_annual": np.linspace(0.02, 0.10, points),
+        "home_appreciation_annual": np.linspace(-0.02, 0.10, points),
+        "months_live_in": np.round(np.linspace(12, 240, points)),
+    }
+
+
+def _paths(path):
+    return f"{path}.npy", f"{path}.json"
+
+
+def build_surface(base, axes, path, chunk_size=None):
+    """Evaluate buy_advantage over the grid `axes` and store it at `path`.
+
+    `axes` maps parameter names to increasing node values (at least 3 per
+    axis, needed for the error estimate); every other input comes from
+    `base`. Writes path.npy and path.json and returns the loaded surface.
+    """
+    for name, values in axes.items():
+        if name not in PARAMETER_NAMES:
+            raise ValueError(f"Unknown parameter: {name}")
+        if len(values) < 3 or np.any(np.diff(values) <= 0):
+            raise ValueError(f"Axis {name} needs at least 3 strictly increasing values")
+    broadcast_params(grid_params(base, axes, 0, 1))
+
+    values_path, meta_path = _paths(path)
+    shape = tuple(len(values) for values in axes.values())
+    values = np.lib.format.open_memmap(values_path, mode="w+", dtype=np.float32, shape=shape)
+    flat = values.reshape(-1)
+    chunk_size = chunk_size or default_chunk_size(sweep_months(base, axes))
+    total = grid_size(axes)
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        summary, _ = simulate_chunk(broadcast_params(grid_params(base, axes, start, stop)))
+        flat[start:stop] = summary["buy_advantage"]
+    values.flush()
+    del flat, values
+
+    with open(meta_path, "w") as f:
+        json.dump({
+            "version": SURFACE_VERSION,
+            "field": "buy_advantage",
+            "base": {name: float(value) for name, value in base.items()},
+            "axes": {name: [float(v) for v in values] for name, values in axes.items()},
+        }, f, indent=1)
+    return ResponseSurface.load(path)
+
+
+class ResponseSurface:
+    """A stored buy_advantage grid answering point queries by interpolation."""
+
+    def __init__(self, base, axes, values):
+        self.base = base
+        self.axes = axes
+        self.values = values
+        self._grids = [list(values_) for values_ in axes.values()]
+
+    @classmethod
+    def load(cls, path):
+        values_path, meta_path = _paths(path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != SURFACE_VERSION:
+            raise ValueError(f"Unsupported surface version in {meta_path}")
+        return cls(meta["base"], meta["axes"], np.load(values_path, mmap_mode="r"))
+
+    def covers(self, point):
+        """True if the surface can interpolate `point` (a dict of inputs)."""
+        for name, value in point.items():
+            if name in self.axes:
+                grid = self.axes[name]
+                if not grid[0] <= value <= grid[-1]:
+                    return False
+            elif name not in self.base or value != self.base[name]:
+                return False
+        return all(name in point for name in self.axes)
+
+    def query(self, point):
+        """Interpolated buy_advantage at `point` and an estimate of its error."""
+        offsets, weights, window = [], [], []
+        for name, grid in zip(self.axes, self._grids):
+            x = point[name]
+            j = min(max(bisect_right(grid, x) - 1, 0), len(grid) - 2)
+            # The cell's nodes plus one more on each side where the grid has them.
+            window.append(slice(max(j - 1, 0), min(j + 3, len(grid))))
+            offsets.append(j - window[-1].start)
+            weights.append((x - grid[j]) / (grid[j + 1] - grid[j]))
+        block = np.asarray(self.values[tuple(window)], dtype=np.float64)
+
+        value = block
+        for o, t in zip(offsets, weights):
+            value = (1 - t) * value[o] + t * value[o + 1]
+        value = float(value)
+
+        # Linear interpolation along an axis is off by t(1 - t)/2 * h^2 * f''
+        # at a fraction t through a cell of width h, with f'' taken somewhere
+        # in the cell. The three-node stencils that overlap the cell (one or
+        # two per axis) give f'' averaged over two cells; the largest of them
+        # over the cell's corners on the other axes is doubled, since f'' can
+        # peak inside the cell above that average (mortgage rates near the
+        # bottom of their range do). float32 storage adds one rounding of
+        # the largest node.
+        cell = [slice(o, o + 2) for o in offsets]
+        error = float(np.abs(block[tuple(cell)]).max()) * float(np.finfo(np.float32).eps)
+        for i, (grid, rows, o, t) in enumerate(zip(self._grids, window, offsets, weights)):
+            nodes = grid[rows]
+            f = np.moveaxis(block[tuple(cell[:i] + [slice(None)] + cell[i + 1:])], i, 0)
+            second = 0.0
+            for a in range(len(nodes) - 2):
+                x0, x1, x2 = nodes[a:a + 3]
+                stencil = 2 * (f[a] / ((x0 - x1) * (x0 - x2)) + f[a + 1] / ((x1 - x0) * (x1 - x2)) +
+                               f[a + 2] / ((x2 - x0) * (x2 - x1)))
+                second = max(second, float(np.abs(stencil).max()))
+            h = nodes[o + 1] - nodes[o]
+            error += t * (1 - t) * h * h * second
+        return value, error
+
+    def exact(self, point):
+        """buy_advantage at `point` from the engine."""
+        params = dict(self.base, **point)
+        return float(simulate_batch(params)["buy_advantage"][0])
+
+    def answer(self, point, tolerance=100.0):
+        """buy_advantage at `point`, from the surface when it is accurate enough.
+
+        Returns a dict with "value", "error_estimate" (0 for engine answers)
+        and "source" ("surface" or "engine"). The engine is used when the
+        point is off the grid or changes an input the surface holds fixed,
+        or when the estimated error exceeds `tolerance` dollars.
+        """
+        if self.covers(point):
+            value, error = self.query(point)
+            if error <= tolerance:
+                return {"value": value, "error_estimate": error, "source": "surface"}
+        return {"value": self.exact(point), "error_estimate": 0.0, "source": "engine"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a buy_advantage response surface")
+    parser.add_argument("base", help="JSON file with every scenario input")
+    parser.add_argument("path", help="output path (writes PATH.npy and PATH.json)")
+    parser.add_argument("--points", type=int, default=25, help="nodes per default axis")
+    parser.add_argument("--axes", help="JSON file mapping parameter names to node values")
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    if args.axes:
+        with open(args.axes) as f:
+            axes = json.load(f)
+    else:
+        axes = default_axes(base, args.points)
+    surface = build_surface(base, axes, args.path)
+    print(f"Stored {surface.values.size:,} grid points over {', '.join(surface.axes)} at {args.path}.npy")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import argparse
+import json
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+from batch_simulation import (broadcast_params, grid_params, grid_size, iter_batch_chunks, simulate_chunk,
+                              PARAMETER_NAMES, SUMMARY_FIELDS, LEDGER_FIELDS, default_chunk_size, sweep_months)
+from scenario import row_hashes
+
+# SQLite sink for batch results. Every scenario becomes one row of the
+# `results` table holding its inputs, its summary outputs and its
+# canonical scenario hash (see scenario.row_hashes), so sweeps can be
+# filtered with plain SQL, e.g. buying wins by more than $50k with a rate
+# under 6%. Monthly ledgers are optional and stored as one float64 BLOB
+# per scenario (LEDGER_FIELDS x months) in `ledgers`.
+#
+# Rows go in through executemany over whole chunks inside transactions
+# of ~1M rows (fewer with ledgers, see BYTES_PER_TRANSACTION), on a WAL
+# database with synchronous=NORMAL; secondary indexes are built once
+# after a bulk load (and kept up to date after that), which is much
+# faster than maintaining them row by row.
+
+RESULT_COLUMNS = PARAMETER_NAMES + SUMMARY_FIELDS
+
+# Columns indexed for range queries; ANALYZE lets SQLite pick the most
+# selective one per query.
+INDEXED_COLUMNS = ("buy_advantage", "mortgage_rate_annual", "home_price", "months_live_in", "scenario_hash")
+
+ROWS_PER_TRANSACTION = 1_000_000
+
+# With ledgers every row also carries a LEDGER_FIELDS x months float64
+# blob; transactions are then cut at about this many bytes so the WAL
+# stays bounded.
+BYTES_PER_TRANSACTION = 256 * 2**20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT,
+    spec TEXT,
+    created REAL NOT NULL,
+    num_rows INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    scenario_hash INTEGER NOT NULL,
+    {columns}
+);
+CREATE TABLE IF NOT EXISTS ledgers (
+    run_id INTEGER NOT NULL,
+    row INTEGER NOT NULL,
+    months INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, row)
+);
+""".format(columns=",\n    ".join(f"{name} REAL NOT NULL" for name in RESULT_COLUMNS))
+
+
+class ResultsStore:
+    """A results database; use as `with ResultsStore(path) as store:`."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-262144")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def start_run(self, label=None, spec=None):
+        """Register a run and return its id."""
+        cursor = self.conn.execute("INSERT INTO runs (label, spec, created) VALUES (?, ?, ?)",
+                                   (label, json.dumps(spec) if spec is not None else None, time.time()))
+        return cursor.lastrowid
+
+    def add_rows(self, run_id, start, cols, summary, ledgers=None):
+        """Insert one chunk of scenarios as rows start..start+n of a run.
+
+        `cols` and `summary` hold (n,) input and summary columns and
+        `ledgers` the (n, months) dict of simulate_chunk(ledgers=True).
+        Call inside a transaction for bulk loads (ingest does).
+        """
+        n = len(cols["home_price"])
+        columns = ([[run_id] * n, range(start, start + n), row_hashes(cols).view(np.int64).tolist()] +
+                   [np.asarray(cols[name], dtype=np.float64).tolist() for name in PARAMETER_NAMES] +
+                   [np.asarray(summary[name], dtype=np.float64).tolist() for name in SUMMARY_FIELDS])
+        placeholders = ", ".join("?" * len(columns))
+        self.conn.executemany(f"INSERT INTO results VALUES ({placeholders})", zip(*columns))
+        if ledgers is not None:
+            months = (cols["months_live_in"] + cols["months_rent_out"]).astype(np.int64).tolist()
+            stacked = np.stack([np.asarray(ledgers[name], dtype=np.float64) for name in LEDGER_FIELDS], axis=1)
+            self.conn.executemany(
+                "INSERT INTO ledgers (run_id, row, months, data) VALUES (?, ?, ?, ?)",
+                ((run_id, start + i, m, stacked[i, :, :m].tobytes()) for i, m in enumerate(months)))
+        self.conn.execute("UPDATE runs SET num_rows = num_rows + ? WHERE id = ?", (n, run_id))
+
+    def _ingest(self, chunks, label, spec, rows_per_transaction, bytes_per_transaction):
+        """Store (start, cols, summary, ledgers) chunks as a new run.
+
+        Commits every ~rows_per_transaction rows, or sooner once the
+        stored ledgers reach ~bytes_per_transaction.
+        """
+        run_id = self.start_run(label, spec)
+        pending_rows = pending_bytes = 0
+        self.conn.execute("BEGIN")
+        try:
+            for start, cols, summary, monthly in chunks:
+                self.add_rows(run_id, start, cols, summary, monthly)
+                pending_rows += len(cols["home_price"])
+                if monthly is not None:
+                    months = (cols["months_live_in"] + cols["months_rent_out"]).sum()
+                    pending_bytes += int(months) * len(LEDGER_FIELDS) * 8
+                if pending_rows >= rows_per_transaction or pending_bytes >= bytes_per_transaction:
+                    self.conn.execute("COMMIT")
+                    self.conn.execute("BEGIN")
+                    pending_rows = pending_bytes = 0
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.create_indexes()
+        return run_id
+
+    def ingest(self, params, label=None, spec=None, ledgers=False, chunk_size=None,
+               rows_per_transaction=ROWS_PER_TRANSACTION, tax_rules=None,
+               bytes_per_transaction=BYTES_PER_TRANSACTION):
+        """Simulate `params` with the batch engine and store every scenario; returns the run id.
+
+        Rows are committed every rows_per_transaction rows (or every
+        ~bytes_per_transaction of ledgers) and the indexes are built (or
+        brought up to date) at the end.
+        """
+        cols = broadcast_params(params)
+        chunks = ((start, {name: col[start:stop] for name, col in cols.items()}, summary, monthly)
+                  for start, stop, summary, monthly in iter_batch_chunks(cols, ledgers=ledgers,
+                                                                         chunk_size=chunk_size,
+                                                                         tax_rules=tax_rules))
+        return self._ingest(chunks, label, spec, rows_per_transaction, bytes_per_transaction)
+
+    def ingest_sweep(self, base, axes, label=None, ledgers=False, chunk_size=None,
+                     rows_per_transaction=ROWS_PER_TRANSACTION, tax_rules=None,
+                     bytes_per_transaction=BYTES_PER_TRANSACTION):
+        """Like ingest for the grid `axes` over `base`, generated chunk by chunk."""
+        chunk_size = chunk_size or default_chunk_size(sweep_months(base, axes), ledgers)
+        total = grid_size(axes)
+
+        def chunks():
+            for start in range(0, total, chunk_size):
+                cols = broadcast_params(grid_params(base, axes, start, min(start + chunk_size, total)))
+                summary, monthly = simulate_chunk(cols, ledgers=ledgers, tax_rules=tax_rules)
+                yield start, cols, summary, monthly
+
+        spec = {"kind": "sweep", "base": {name: float(value) for name, value in base.items()},
+                "sweep": {name: [float(v) for v in values] for name, values in axes.items()}}
+        return self._ingest(chunks(), label, spec, rows_per_transaction, bytes_per_transaction)
+
+    def create_indexes(self):
+        """Create the query indexes if missing and refresh the planner statistics."""
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_by_run ON results (run_id, row)")
+        for name in INDEXED_COLUMNS:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS results_by_{name} ON results ({name})")
+        self.conn.execute("ANALYZE")
+
+    def query(self, where=None, args=(), columns=None, run_id=None, order_by=None, limit=None):
+        """Matching rows as a dict of numpy arrays (one per column).
+
+        `where` is an SQL condition over the result columns with `?`
+        placeholders filled from `args`, e.g.
+        query("buy_advantage > ? AND mortgage_rate_annual < ?", (50000, 0.06)).
+        It is pasted into the statement as is, neither escaped nor
+        checked: never build it from untrusted input, and pass values
+        through `args`. `columns` and order_by are checked against the
+        result columns. `columns` defaults to every column; "run_id",
+        "row" and "scenario_hash" are always included. order_by may end
+        in " DESC".
+        """
+        known = ("run_id", "row", "scenario_hash") + RESULT_COLUMNS
+        columns = list(RESULT_COLUMNS if columns is None else columns)
+        order_name = order_by.split()[0] if order_by else None
+        for name in columns + ([order_name] if order_name else []):
+            if name not in known:
+                raise ValueError(f"Unknown result column: {name}")
+        selected = ["run_id", "row", "scenario_hash"] + [name for name in columns if name in RESULT_COLUMNS]
+
+        conditions, values = [], list(args)
+        if where:
+            conditions.append(f"({where})")
+        if run_id is not None:
+            conditions.append("run_id = ?")
+            values.append(run_id)
+        sql = f"SELECT {', '.join(selected)} FROM results"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            sql += " ORDER BY " + order_name + (" DESC" if order_by.upper().endswith(" DESC") else "")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        rows = self.conn.execute(sql, values).fetchall()
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), len(selected))
+        result = {name: table[:, i] for i, name in enumerate(selected)}
+        for name in ("run_id", "row"):
+            result[name] = result[name].astype(np.int64)
+        # Hashes above 2^53 do not survive float64; read them exactly.
+        result["scenario_hash"] = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+        return result
+
+    def count(self, where=None, args=(), run_id=None):
+        """Number of rows matching `where` (raw SQL, see query)."""
+        sql, values = "SELECT COUNT(*) FROM results", list(args)
+        conditions = [f"({where})"] if where else []
+        if run_id is not None:
+            conditions.append("run_id = ?")
+            values.append(run_id)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return self.conn.execute(sql, values).fetchone()[0]
+
+    def ledgers(self, run_id, row):
+        """The stored monthly ledgers of one scenario as a dict of (months,) arrays, or None."""
+        found = self.conn.execute("SELECT months, data FROM ledgers WHERE run_id = ? AND row = ?",
+                                  (run_id, row)).fetchone()
+        if found is None:
+            return None
+        months, data = found
+        values = np.frombuffer(data, dtype=np.float64).reshape(len(LEDGER_FIELDS), months)
+        return dict(zip(LEDGER_FIELDS, values))
+
+    def runs(self):
+        """(id, label, created, num_rows) of every stored run."""
+        return self.conn.execute("SELECT id, label, created, num_rows FROM runs ORDER BY id").fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store batch results in SQLite and query them")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="run a sweep spec (job_queue format) into the store")
+    ingest.add_argument("spec")
+    ingest.add_argument("db")
+    ingest.add_argument("--label")
+    ingest.add_argument("--ledgers", action="store_true", help="also store monthly ledgers")
+    query = commands.add_parser("query", help="print rows matching an SQL condition")
+    query.add_argument("db")
+    query.add_argument("where", help='e.g. "buy_advantage > 50000 AND mortgage_rate_annual < 0.06"')
+    query.add_argument("--columns", default="home_price,mortgage_rate_annual,months_live_in,buy_advantage")
+    query.add_argument("--order-by", default="buy_advantage DESC")
+    query.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    with ResultsStore(args.db) as store:
+        if args.command == "ingest":
+            with open(args.spec) as f:
+                spec = json.load(f)
+            if spec.get("kind", "sweep") != "sweep":
+                raise SystemExit("Only sweep specs can be ingested")
+            began = time.perf_counter()
+            run_id = store.ingest_sweep(spec["base"], spec["sweep"], args.label, args.ledgers,
+                                        spec.get("chunk_size"))
+            print(f"Run {run_id}: stored {grid_size(spec['sweep']):,} scenarios "
+                  f"in {time.perf_counter() - began:,.1f}s")
+        else:
+            from display_utils import display_query_results
+            columns = args.columns.split(",")
+            print(f"{store.count(args.where):,} matching scenarios")
+            display_query_results(store.query(args.where, columns=columns, order_by=args.order_by,
+                                              limit=args.limit), columns)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Period rollups of monthly ledger series. A series is a (months,) array
+# or a (scenarios, months) batch, zero-padded past each scenario's
+# horizon as simulate_batch returns it. Consecutive periods of any length
+# (12 for years, 3 for quarters) are rolled up by padding the month axis
+# to whole periods and reshaping it to (periods, period), so a yearly
+# table of a whole batch is one reduction. Arbitrary groupings of months
+# (fiscal years, irregular buckets) go through np.bincount.
+
+# How each simulate_batch ledger rolls up: flows are summed over the
+# period, levels are read at its last month.
+LEDGER_ROLLUPS = {
+    "monthly_interest_paid": "sum",
+    "monthly_principal_paid": "sum",
+    "monthly_total_home_cost": "sum",
+    "monthly_tax_savings": "sum",
+    "monthly_investment_contribution": "sum",
+    "monthly_home_value": "last",
+    "monthly_equity": "last",
+    "monthly_rent_if_no_buy": "sum",
+}
+
+
+def num_periods(num_months, period=12, offset=0):
+    """Number of periods touched by num_months months (the last may be partial)."""
+    return -(-(num_months + offset) // period)
+
+
+def _periods(series, period, offset):
+    """series reshaped to (..., periods, period), zero-padded at both ends."""
+    series = np.asarray(series)
+    num_months = series.shape[-1]
+    total = num_periods(num_months, period, offset) * period
+    pad = [(0, 0)] * (series.ndim - 1) + [(offset, total - num_months - offset)]
+    if offset or total != num_months:
+        series = np.pad(series, pad)
+    return series.reshape(series.shape[:-1] + (total // period, period))
+
+
+def period_sums(series, period=12, offset=0):
+    """Sum of each period of `period` months.
+
+    `offset` shortens the first period to period - offset months, e.g.
+    offset=3 for calendar years when month 1 is April.
+    """
+    return _periods(series, period, offset).sum(axis=-1)
+
+
+def period_firsts(series, period=12, offset=0):
+    """Value in the first month of each period (e.g. the rent at the start of each year).
+
+    Periods line up with period_sums and period_lasts: with an offset the
+    first, shortened period starts at month 1.
+    """
+    series = np.asarray(series)
+    count = num_periods(series.shape[-1], period, offset)
+    return series[..., np.maximum(np.arange(count) * period - offset, 0)]
+
+
+def period_lasts(series, period=12, offset=0, lengths=None):
+    """Value in the last month of each period.
+
+    With `lengths` ((scenarios,) horizons in months) the last period of
+    each scenario reads its final month instead of the zero padding, and
+    periods past the horizon are 0.
+    """
+    series = np.asarray(series)
+    num_months = series.shape[-1]
+    count = num_periods(num_months, period, offset)
+    ends = np.minimum(np.arange(1, count + 1) * period - offset, num_months)
+    if lengths is None:
+        return series[..., ends - 1]
+    lengths = np.asarray(lengths, dtype=np.int64)[:, None]
+    starts = np.maximum(np.arange(count) * period - offset, 0) + 1
+    last = np.minimum(ends, lengths)
+    values = np.take_along_axis(series, np.maximum(last - 1, 0), axis=-1)
+    return np.where(starts <= lengths, values, 0.0)
+
+
+def group_sums(series, groups, num_groups=None):
+    """Sum months into arbitrary groups with np.bincount.
+
+    `groups` gives the group of every month (same length as the month
+    axis); a (scenarios, months) batch is summed per scenario by offsetting
+    each row's group ids, so the whole batch is one bincount.
+    """
+    series = np.asarray(series, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    num_groups = num_groups or int(groups.max()) + 1
+    if series.ndim == 1:
+        return np.bincount(groups, weights=series, minlength=num_groups)
+    rows = series.shape[0]
+    ids = (np.arange(rows)[:, None] * num_groups + groups).ravel()
+    return np.bincount(ids, weights=series.ravel(), minlength=rows * num_groups).reshape(rows, num_groups)
+
+
+def rollup_ledgers(ledgers, period=12, offset=0, lengths=None):
+    """Roll every LEDGER_ROLLUPS series present in `ledgers` up to periods.
+
+    `ledgers` is simulate_batch output (or a simulate_scenario result);
+    returns a dict with the same keys, each (..., periods).
+    """
+    rolled = {}
+    for name, how in LEDGER_ROLLUPS.items():
+        if name in ledgers:
+            if how == "sum":
+                rolled[name] = period_sums(ledgers[name], period, offset)
+            else:
+                rolled[name] = period_lasts(ledgers[name], period, offset, lengths)
+    return rolled
@@ -0,0 +1,220 @@
+import numpy as np
+
+from batch_simulation import broadcast_params, PARAMETER_NAMES
+
+# Scenario records. A Scenario is one immutable, validated set of the 21
+# simulate_scenario inputs, built by keyword so argument order can never
+# be mixed up; simulate_scenario(**scenario.as_dict()) runs it. A
+# ScenarioBatch holds many scenarios as one float64 column per input
+# (struct of arrays), which is what the batch engines consume, and is
+# built and validated with whole-column operations.
+#
+# Both share a canonical 64-bit hash of the input values (float bit
+# patterns mixed column by column, -0.0 folded into 0.0), so identical
+# scenarios hash alike across processes and runs, e.g. for caching
+# results on disk or dropping duplicates from a sweep.
+
+_WHOLE_MONTHS = ("months_live_in", "months_rent_out")
+
+# (field, check, message). Checks take a mapping of columns (or plain
+# values) and return a boolean (or boolean array); NaN always fails.
+VALIDATION_RULES = (
+    ("home_price", lambda c: c["home_price"] > 0, "must be positive"),
+    ("down_payment_pct", lambda c: (c["down_payment_pct"] >= 0) & (c["down_payment_pct"] <= 1),
+     "must be between 0 and 1"),
+    ("mortgage_rate_annual", lambda c: c["mortgage_rate_annual"] >= 0, "must not be negative"),
+    ("mortgage_term_years", lambda c: c["mortgage_term_years"] > 0, "must be positive"),
+    ("closing_costs_buy_pct", lambda c: (c["closing_costs_buy_pct"] >= 0) & (c["closing_costs_buy_pct"] <= 1),
+     "must be between 0 and 1"),
+    ("closing_costs_sell_pct", lambda c: (c["closing_costs_sell_pct"] >= 0) & (c["closing_costs_sell_pct"] <= 1),
+     "must be between 0 and 1"),
+    ("tax_rate", lambda c: (c["tax_rate"] >= 0) & (c["tax_rate"] <= 1), "must be between 0 and 1"),
+) + tuple(
+    (name, lambda c, name=name: c[name] >= 0, "must not be negative")
+    for name in ("property_tax_rate_annual", "maintenance_annual", "insurance_annual", "hoa_monthly",
+                 "rent_current", "property_tax_deduction_cap", "rent_while_out", "rent_collected_home")
+) + tuple(
+    (name, lambda c, name=name: c[name] > -1, "must be greater than -1 (-100%)")
+    for name in ("rent_growth_annual", "alt_invest_growth_annual", "monthly_invest_growth_annual",
+                 "home_appreciation_annual")
+) + tuple(
+    (name, lambda c, name=name: (c[name] >= 0) & (c[name] == np.floor(c[name])),
+     "must be a whole number of months, at least 0")
+    for name in _WHOLE_MONTHS
+) + (
+    ("months_live_in", lambda c: c["months_live_in"] + c["months_rent_out"] >= 1,
+     "plus months_rent_out must be at least 1"),
+)
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def _mix(x):
+    """splitmix64 finalizer on uint64 arrays (wrapping arithmetic)."""
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def row_hashes(columns):
+    """Canonical uint64 hash of every row of a mapping of PARAMETER_NAMES columns."""
+    h = None
+    for name in PARAMETER_NAMES:
+        bits = (np.asarray(columns[name], dtype=np.float64) + 0.0).view(np.uint64)
+        h = _mix(bits + _GOLDEN) if h is None else _mix(h * _GOLDEN + bits)
+    return h
+
+
+class Scenario:
+    """One validated, immutable set of simulation inputs."""
+
+    __slots__ = PARAMETER_NAMES + ("_hash",)
+
+    def __init__(self, *, home_price, down_payment_pct, mortgage_rate_annual, mortgage_term_years,
+                 property_tax_rate_annual, maintenance_annual, insurance_annual, hoa_monthly,
+                 closing_costs_buy_pct, closing_costs_sell_pct, rent_current, rent_growth_annual,
+                 alt_invest_growth_annual, monthly_invest_growth_annual, home_appreciation_annual,
+                 tax_rate, property_tax_deduction_cap, months_live_in, months_rent_out,
+                 rent_while_out=0.0, rent_collected_home=0.0):
+        values = locals()
+        for name in PARAMETER_NAMES:
+            value = float(values[name])
+            if not np.isfinite(value):
+                raise ValueError(f"{name} must be a finite number (got {values[name]!r})")
+            object.__setattr__(self, name, value)
+        for field, check, message in VALIDATION_RULES:
+            if not check(self.as_dict()):
+                raise ValueError(f"{field} {message} (got {getattr(self, field)!r})")
+        for name in _WHOLE_MONTHS:
+            object.__setattr__(self, name, int(getattr(self, name)))
+        object.__setattr__(self, "_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Scenario is immutable; use replace({name}=...)")
+
+    def __delattr__(self, name):
+        raise AttributeError("Scenario is immutable")
+
+    @classmethod
+    def from_dict(cls, row):
+        """Build from a mapping holding (at least) every input name."""
+        return cls(**{name: row[name] for name in PARAMETER_NAMES})
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in PARAMETER_NAMES}
+
+    def replace(self, **changes):
+        """A copy with some inputs changed (validated again)."""
+        return Scenario(**dict(self.as_dict(), **changes))
+
+    def canonical_hash(self):
+        """Stable 64-bit hash of the inputs; equals the ScenarioBatch row hash."""
+        if self._hash is None:
+            columns = {name: np.array([getattr(self, name)], dtype=np.float64) for name in PARAMETER_NAMES}
+            object.__setattr__(self, "_hash", int(row_hashes(columns)[0]))
+        return self._hash
+
+    def key(self):
+        """canonical_hash as a 16-digit hex string, e.g. for cache file names."""
+        return f"{self.canonical_hash():016x}"
+
+    def __hash__(self):
+        return self.canonical_hash()
+
+    def __eq__(self, other):
+        if not isinstance(other, Scenario):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in PARAMETER_NAMES)
+
+    def __repr__(self):
+        return "Scenario(" + ", ".join(f"{name}={getattr(self, name)!r}" for name in PARAMETER_NAMES) + ")"
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        for name in PARAMETER_NAMES:
+            object.__setattr__(self, name, state[name])
+        object.__setattr__(self, "_hash", None)
+
+
+class ScenarioBatch:
+    """Many scenarios as equal-length float64 columns (struct of arrays).
+
+    `columns` maps every input name to a scalar or sequence, as for
+    batch_simulation.simulate_batch, and can be passed straight to the
+    batch engines. Indexing with an int gives a Scenario, with a slice,
+    mask or index array another ScenarioBatch.
+    """
+
+    def __init__(self, columns, validate=True):
+        self.columns = broadcast_params(columns)
+        if validate:
+            self.validate()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from a sequence of dicts or Scenario objects."""
+        rows = [row.as_dict() if isinstance(row, Scenario) else row for row in rows]
+        return cls({name: np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+                    for name in PARAMETER_NAMES})
+
+    def validate(self):
+        """Raise ValueError naming the first bad row of the first failing rule."""
+        cols = self.columns
+        for name, values in cols.items():
+            bad = np.flatnonzero(~np.isfinite(values))
+            if bad.size:
+                raise ValueError(f"{name} must be a finite number (row {bad[0]}: {float(values[bad[0]])!r}; "
+                                 f"{bad.size:,} rows invalid)")
+        for field, check, message in VALIDATION_RULES:
+            bad = np.flatnonzero(~check(cols))
+            if bad.size:
+                raise ValueError(f"{field} {message} (row {bad[0]}: {float(cols[field][bad[0]])!r}; "
+                                 f"{bad.size:,} rows invalid)")
+
+    def __len__(self):
+        return len(self.columns["home_price"])
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Scenario(**{name: col[index] for name, col in self.columns.items()})
+        return ScenarioBatch({name: col[index] for name, col in self.columns.items()}, validate=False)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def hashes(self):
+        """Canonical uint64 hash per row (see Scenario.canonical_hash)."""
+        return row_hashes(self.columns)
+
+    def unique(self):
+        """(batch of distinct scenarios in first-seen order, index of each row's match in it).
+
+        Rows are grouped by hash and then compared column by column, so
+        two different scenarios that happen to share a hash stay distinct.
+        """
+        n = len(self)
+        hashes = self.hashes()
+        order = np.argsort(hashes, kind="stable")
+        starts = np.ones(n, dtype=bool)
+        starts[1:] = hashes[order][1:] != hashes[order][:-1]
+        group = np.cumsum(starts) - 1
+        # Original index of the first row with each sorted row's hash.
+        match = order[np.flatnonzero(starts)][group]
+        same = np.ones(n, dtype=bool)
+        for col in self.columns.values():
+            same &= col[order] == col[match]
+        # Hash collisions (expected never) are resolved one row at a time;
+        # the stable sort keeps rows in original order within a group.
+        seen = {}
+        for position in np.flatnonzero(~same).tolist():
+            values = tuple(float(col[order[position]]) + 0.0 for col in self.columns.values())
+            match[position] = seen.setdefault((group[position], values), order[position])
+        representative = np.empty(n, dtype=np.int64)
+        representative[order] = match
+        first = np.unique(representative)
+        return self[first], np.searchsorted(first, representative)
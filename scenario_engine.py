@@ -0,0 +1,242 @@
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from batch_simulation import (broadcast_params, default_chunk_size, longest_horizon, simulate_chunk,
+                              SUMMARY_FIELDS, LEDGER_FIELDS)
+from parallel_runner import default_workers
+from reference_engine import reference_scenario
+
+# Compute path for concurrent use inside one process (e.g. web workers).
+# compute_scenario is the reference month-by-month loop of
+# simulate_scenario with no printing or plotting: it only reads its
+# arguments and builds new objects, so any number of threads can call it
+# at once. For throughput, ThreadedEngine runs the vectorized batch
+# engine on a thread pool; its work is numpy array kernels, which
+# release the GIL, so threads run them in parallel without the memory
+# cost of a process pool (benchmark_threads measures how close to linear
+# that is on a given machine). Neither
+# path touches matplotlib (plot_rendering renders off-screen with
+# per-thread figures when charts are needed).
+
+def compute_scenario(
+    home_price,
+    down_payment_pct,
+    mortgage_rate_annual,
+    mortgage_term_years,
+    property_tax_rate_annual,
+    maintenance_annual,
+    insurance_annual,
+    hoa_monthly,
+    closing_costs_buy_pct,
+    closing_costs_sell_pct,
+    rent_current,
+    rent_growth_annual,
+    alt_invest_growth_annual,
+    monthly_invest_growth_annual,
+    home_appreciation_annual,
+    tax_rate,
+    property_tax_deduction_cap,
+    months_live_in,
+    months_rent_out,
+    rent_while_out,
+    rent_collected_home
+):
+    """Run one scenario and return every result, ledger and helper object.
+
+    Returns everything reference_scenario does plus the last month's
+    "monthly_savings_buy"/"monthly_savings_rent" used by the displays.
+    """
+    r = reference_scenario(
+        home_price, down_payment_pct, mortgage_rate_annual, mortgage_term_years,
+        property_tax_rate_annual, maintenance_annual, insurance_annual, hoa_monthly,
+        closing_costs_buy_pct, closing_costs_sell_pct, rent_current, rent_growth_annual,
+        alt_invest_growth_annual, monthly_invest_growth_annual, home_appreciation_annual,
+        tax_rate, property_tax_deduction_cap, months_live_in, months_rent_out,
+        rent_while_out, rent_collected_home
+    )
+
+    # Savings of buying in the last month: rent avoided minus home costs
+    # while living in, the rental cash flow once rented out
+    total_months = r["total_months"]
+    if total_months <= months_live_in:
+        r["monthly_savings_buy"] = (r["monthly_rent_if_no_buy"][total_months - 1]
+                                    - r["property_costs"].get_monthly_costs())
+    else:
+        r["monthly_savings_buy"] = r["rental_scenario"].calculate_monthly_cashflow(total_months)
+    r["monthly_savings_rent"] = 0
+    return r
+
+
+def _evaluate_chunk(cols, ledgers):
+    summary, monthly = simulate_chunk(cols, ledgers=ledgers)
+    return summary, monthly
+
+
+class ThreadedEngine:
+    """Thread-pool front end to the batch engine for use inside one process.
+
+    One engine is meant to be shared by every request thread:
+
+        engine = ThreadedEngine(workers=8)
+        future = engine.submit(params)          # from any thread
+        results = future.result()               # dict like simulate_batch
+
+    Requests are split into chunks of chunk_size scenarios (by default
+    default_chunk_size for the request's longest horizon) that run on the
+    pool's threads, default_workers of them unless given; chunks of
+    different requests interleave. The
+    engine holds no state besides the pool, so concurrent submit/evaluate
+    calls are safe. Use as a context manager or call close().
+    """
+
+    def __init__(self, workers=None, chunk_size=None):
+        self.workers = workers or default_workers()
+        self.chunk_size = chunk_size
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scenario-engine")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _chunk_futures(self, cols, ledgers):
+        n = len(cols["home_price"])
+        chunk_size = self.chunk_size or default_chunk_size(longest_horizon(cols), bool(ledgers))
+        return [(start, self._pool.submit(_evaluate_chunk,
+                                          {name: col[start:start + chunk_size] for name, col in cols.items()},
+                                          ledgers))
+                for start in range(0, n, chunk_size)]
+
+    @staticmethod
+    def _collect(cols, ledgers, futures):
+        n = len(cols["home_price"])
+        results = {name: np.empty(n) for name in SUMMARY_FIELDS}
+        if ledgers:
+            max_months = longest_horizon(cols)
+            for name in LEDGER_FIELDS:
+                results[name] = np.zeros((n, max_months))
+        for start, future in futures:
+            summary, monthly = future.result()
+            stop = start + len(summary["buy_advantage"])
+            for name in SUMMARY_FIELDS:
+                results[name][start:stop] = summary[name]
+            if monthly is not None:
+                for name, values in monthly.items():
+                    results[name][start:stop, :values.shape[1]] = values
+        return results
+
+    def evaluate(self, params, ledgers=False):
+        """Evaluate a batch on the pool and wait for it; same output as simulate_batch."""
+        cols = broadcast_params(params)
+        return self._collect(cols, ledgers, self._chunk_futures(cols, ledgers))
+
+    def submit(self, params, ledgers=False):
+        """Start evaluating a batch; returns a Future of the simulate_batch-style dict.
+
+        The chunks are queued right away. Whichever pool thread finishes
+        the last chunk assembles the result, so no thread ever blocks
+        waiting on another.
+        """
+        cols = broadcast_params(params)
+        futures = self._chunk_futures(cols, ledgers)
+        result = Future()
+        result.set_running_or_notify_cancel()
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def chunk_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                result.set_result(self._collect(cols, ledgers, futures))
+            except BaseException as exc:
+                result.set_exception(exc)
+
+        if not futures:
+            remaining[0] = 1
+            chunk_done(None)
+        for _, future in futures:
+            future.add_done_callback(chunk_done)
+        return result
+
+    def scenario(self, scenario):
+        """Future of compute_scenario for one Scenario (or dict of inputs), run on the pool.
+
+        The month loop is plain Python, so concurrent scenarios share the
+        GIL; prefer submit() for throughput.
+        """
+        inputs = scenario.as_dict() if hasattr(scenario, "as_dict") else dict(scenario)
+        return self._pool.submit(compute_scenario, **inputs)
+
+
+def _available_cpus():
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def benchmark_threads(params, thread_counts=(1, 2, 4, 8), chunk_size=None, repeats=3):
+    """Throughput of ThreadedEngine.evaluate on `params` for each thread count.
+
+    Returns rows of (threads, best seconds, scenarios per second, speedup
+    over one thread, efficiency). Efficiency is the speedup divided by
+    the most this machine allows, min(threads, available CPUs); it stays
+    near 1.0 only if the chunks really run in parallel.
+    """
+    cols = broadcast_params(params)
+    n = len(cols["home_price"])
+    cpus = _available_cpus()
+    rows = []
+    for threads in thread_counts:
+        with ThreadedEngine(threads, chunk_size) as engine:
+            engine.evaluate({name: col[:1024] for name, col in cols.items()})
+            best = float("inf")
+            for _ in range(repeats):
+                began = time.perf_counter()
+                engine.evaluate(cols)
+                best = min(best, time.perf_counter() - began)
+        speedup = rows[0][1] / best if rows else 1.0
+        rows.append((threads, best, n / best, speedup, speedup / min(threads, cpus)))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark thread scaling of the batch engine")
+    parser.add_argument("--scenarios", type=int, default=200000)
+    parser.add_argument("--threads", default="1,2,4,8", help="comma-separated thread counts")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from autotune import apply_profile
+    apply_profile()
+
+    from fuzz_harness import BASE_SCENARIO
+    from tabulate import tabulate
+    rng = np.random.default_rng(0)
+    params = dict(BASE_SCENARIO, home_price=rng.uniform(200000, 2000000, args.scenarios),
+                  months_live_in=rng.integers(12, 361, args.scenarios))
+    thread_counts = [int(t) for t in args.threads.split(",")]
+    rows = benchmark_threads(params, thread_counts, args.chunk_size)
+    cpus = _available_cpus()
+    print(f"{args.scenarios:,} scenarios, {cpus} available CPUs")
+    print(tabulate([[t, f"{s:.2f}s", f"{rate:,.0f}", f"{speedup:.2f}x", f"{efficiency:.0%}"]
+                    for t, s, rate, speedup, efficiency in rows],
+                   headers=["Threads", "Time", "Scenarios/s", "Speedup", "Efficiency"], tablefmt="pretty"))
+    if cpus < max(thread_counts):
+        print(f"Only {cpus} CPU(s) available: speedup cannot exceed {cpus}x here, "
+              f"so this run does not measure scaling beyond {cpus} thread(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
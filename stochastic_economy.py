@@ -0,0 +1,213 @@
+import numpy as np
+
+from batch_simulation import simulate_paths
+from memory_profile import parse_memory_size, profile_stage
+from parallel_runner import map_chunks
+from streaming_stats import NetPositionAggregator
+
+# Correlated multi-factor economy for Monte Carlo runs. Monthly shocks for
+# all factors are drawn together and correlated with one Cholesky factor;
+# home prices, rents and the equity market follow lognormal growth, and
+# the mortgage rate follows an (optionally mean-reverting) level process.
+# A fixed-rate loan only sees the rate drawn at closing; with
+# rate_reset_months the loan is adjustable and resets to the simulated
+# rate along the path.
+#
+# Paths are drawn in fixed blocks of STREAM_PATHS: block b of a run always
+# draws from SeedSequence(seed, spawn_key=(b,)), so path p gets the same
+# random numbers whatever the chunk size, the number of workers or how
+# chunks are spread over them, and no two blocks share random numbers.
+
+FACTORS = ("mortgage_rate", "home_appreciation", "rent_growth", "equity_return")
+
+DEFAULT_CORRELATION = (
+    (1.0, -0.3, -0.1, -0.2),
+    (-0.3, 1.0, 0.5, 0.3),
+    (-0.1, 0.5, 1.0, 0.1),
+    (-0.2, 0.3, 0.1, 1.0),
+)
+
+
+class EconomyModel:
+    def __init__(self, initial_rate=0.06, rate_mean=0.06, rate_vol=0.01,
+                 rate_mean_reversion=None, rate_floor=0.0,
+                 home_appreciation=0.04, home_vol=0.05,
+                 rent_growth=0.03, rent_vol=0.02,
+                 equity_return=0.08, equity_vol=0.16,
+                 correlation=DEFAULT_CORRELATION, rate_reset_months=None):
+        """Annual parameters for the four factors in FACTORS.
+
+        Growth means are expected annual growth rates (0.04 for 4%) and
+        vols are annual volatilities. The mortgage rate starts at
+        initial_rate and moves by rate_vol per sqrt(year); with
+        rate_mean_reversion (kappa per year) it is pulled towards
+        rate_mean, otherwise it is a random walk. It never drops below
+        rate_floor.
+
+        Without rate_reset_months the mortgage is fixed at the rate drawn
+        for the first month (the rate at closing). With it, the mortgage
+        is adjustable: every rate_reset_months months its rate resets to
+        the simulated rate and the payment is re-amortized over the rest
+        of the term.
+        """
+        self.initial_rate = initial_rate
+        self.rate_mean = rate_mean
+        self.rate_vol = rate_vol
+        self.rate_mean_reversion = rate_mean_reversion
+        self.rate_floor = rate_floor
+        self.rate_reset_months = rate_reset_months
+        self.means = np.array([0.0, home_appreciation, rent_growth, equity_return])
+        self.vols = np.array([rate_vol, home_vol, rent_vol, equity_vol])
+
+        correlation = np.asarray(correlation, dtype=np.float64)
+        if correlation.shape != (len(FACTORS), len(FACTORS)):
+            raise ValueError(f"Correlation matrix must be {len(FACTORS)}x{len(FACTORS)}")
+        if not np.allclose(correlation, correlation.T) or not np.allclose(np.diag(correlation), 1):
+            raise ValueError("Correlation matrix must be symmetric with a unit diagonal")
+        try:
+            self.cholesky = np.linalg.cholesky(correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix must be positive definite")
+        self.correlation = correlation
+
+    def generate(self, num_paths, num_months, rng):
+        """Draw factor paths as one (num_paths, num_months, 4) array.
+
+        Column 0 is the mortgage rate charged in each month: the rate at
+        closing throughout for a fixed-rate loan, otherwise the simulated
+        rate as of the latest reset. Columns 1-3 are monthly log-returns
+        of home prices, rents and the equity market, with drift set so
+        expected annual growth equals the mean.
+        """
+        shocks = rng.standard_normal((num_paths, num_months, len(FACTORS))) @ self.cholesky.T
+        paths = np.empty_like(shocks)
+
+        monthly_vol = self.vols / np.sqrt(12)
+        drift = np.log1p(self.means[1:]) / 12 - self.vols[1:] ** 2 / 24
+        paths[:, :, 1:] = drift + monthly_vol[1:] * shocks[:, :, 1:]
+
+        # The rate level only needs simulating up to the last reset (just
+        # the first month for a fixed-rate loan).
+        reset = self.rate_reset_months or num_months
+        resets = np.arange(num_months) // reset * reset
+        kappa = (self.rate_mean_reversion or 0.0) / 12
+        rate = np.full(num_paths, float(self.initial_rate))
+        levels = np.empty((num_paths, resets[-1] + 1))
+        for month in range(resets[-1] + 1):
+            rate = rate + kappa * (self.rate_mean - rate) + monthly_vol[0] * shocks[:, month, 0]
+            rate = np.maximum(rate, self.rate_floor)
+            levels[:, month] = rate
+        paths[:, :, 0] = levels[:, resets]
+        return paths
+
+    def engine_inputs(self, paths):
+        """Turn factor paths into simulate_paths inputs.
+
+        A fixed-rate loan gets the rate at closing per path; an adjustable
+        one gets the (num_paths, num_months) rates charged. Index paths
+        start at 1.0 and cover every month.
+        """
+        def index(log_returns):
+            levels = np.exp(np.cumsum(log_returns, axis=1))
+            return np.concatenate([np.ones((len(levels), 1)), levels], axis=1)
+
+        return {
+            "mortgage_rate": paths[:, 0, 0] if self.rate_reset_months is None else paths[:, :, 0],
+            "home_index": index(paths[:, :, 1]),
+            "rent_index": index(paths[:, :, 2]),
+            "invest_index": index(paths[:, :, 3]),
+        }
+
+
+# Paths per random stream. Chunk sizes that are multiples of it (like the
+# defaults) draw no path twice.
+STREAM_PATHS = 256
+
+
+def chunk_rng(seed, chunk_index):
+    """Independent, reproducible generator for one chunk (or stream block) of a run."""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+
+def generate_paths(model, start, stop, num_months, seed):
+    """Factor paths start..stop of a run, the same however the run is chunked.
+
+    Block b's stream fills paths b * STREAM_PATHS onwards in order, so a
+    chunk draws each block it overlaps up to its last path and drops the
+    paths before its first.
+    """
+    pieces = []
+    for block in range(start // STREAM_PATHS, -(-stop // STREAM_PATHS)):
+        first = block * STREAM_PATHS
+        drawn = model.generate(min(stop, first + STREAM_PATHS) - first, num_months, chunk_rng(seed, block))
+        pieces.append(drawn[max(start - first, 0):])
+    return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+
+
+def iter_path_chunks(model, num_paths, num_months, chunk_size, seed, first_chunk=0):
+    """Yield (chunk_index, factor paths) for a run of num_paths paths."""
+    num_chunks = -(-num_paths // chunk_size)
+    for chunk_index in range(first_chunk, num_chunks):
+        start = chunk_index * chunk_size
+        yield chunk_index, generate_paths(model, start, min(start + chunk_size, num_paths), num_months, seed)
+
+
+# Peak working memory per path-month of one chunk (factor paths, index
+# paths and the engine's temporaries): a tracemalloc peak of about 154
+# bytes (170 for adjustable-rate loans) plus headroom.
+WORKING_BYTES_PER_PATH_MONTH = 176
+
+
+def monte_carlo_chunk_size(memory_budget, num_months):
+    """Largest number of paths per chunk that fits memory_budget (bytes or "1GB")."""
+    budget = parse_memory_size(memory_budget)
+    chunk_size = int(budget // (num_months * WORKING_BYTES_PER_PATH_MONTH + 1024))
+    if chunk_size < 1:
+        raise ValueError(f"A memory budget of {budget:,} bytes cannot fit one {num_months}-month path")
+    return chunk_size
+
+
+def monte_carlo_chunk(task, profiler=None):
+    """Simulate one chunk of paths and return its partial aggregate."""
+    params, model, num_paths, chunk_size, seed, chunk_index = task
+    num_months = int(params["months_live_in"] + params["months_rent_out"])
+    start = chunk_index * chunk_size
+    with profile_stage(profiler, "simulation"):
+        paths = generate_paths(model, start, min(start + chunk_size, num_paths), num_months, seed)
+        summary, _ = simulate_paths(params, **model.engine_inputs(paths))
+        del paths
+    with profile_stage(profiler, "aggregation"):
+        aggregator = NetPositionAggregator()
+        aggregator.update(summary)
+    return aggregator
+
+
+def simulate_monte_carlo(params, model, num_paths, seed=0, chunk_size=2048, workers=None,
+                         memory_budget=None, profiler=None):
+    """Run num_paths correlated economy paths for one scenario.
+
+    Chunks are simulated in worker processes and their partial
+    aggregates merged in chunk order; returns a NetPositionAggregator.
+
+    memory_budget (bytes or e.g. "1GB") is per worker process and caps
+    the chunk size. The paths drawn do not depend on the chunk size or
+    the number of workers (see generate_paths), so neither do the
+    quantiles and the probability that buying wins; the mean and
+    standard deviation can differ in the last digits between chunk
+    sizes. With a MemoryProfiler the run is computed in this process so
+    every stage can be traced.
+    """
+    if memory_budget is not None:
+        num_months = int(params["months_live_in"] + params["months_rent_out"])
+        chunk_size = min(chunk_size, monte_carlo_chunk_size(memory_budget, num_months))
+    num_chunks = -(-num_paths // chunk_size)
+    tasks = [(params, model, num_paths, chunk_size, seed, i) for i in range(num_chunks)]
+    aggregator = NetPositionAggregator()
+    if profiler is not None:
+        partials = (monte_carlo_chunk(task, profiler) for task in tasks)
+    else:
+        partials = map_chunks(monte_carlo_chunk, tasks, workers)
+    for partial in partials:
+        with profile_stage(profiler, "merge"):
+            aggregator.merge(partial)
+    return aggregator
@@ -0,0 +1,284 @@
+import math
+
+import numpy as np
+
+from batch_simulation import iter_batch_chunks
+from memory_profile import profile_stage
+
+# Fixed-memory summaries of large stochastic runs. Chunks of simulation
+# output are folded into running moments and a log-bucketed quantile
+# sketch and then discarded. Both structures merge by adding their
+# counters, so partial aggregates from parallel workers combine into
+# exactly the aggregate a single worker would have built. NaNs are
+# skipped by both, so moments and quantiles describe the same values.
+
+
+class OnlineMoments:
+    """Running count, mean and variance (Chan et al. parallel update)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _combine(self, count, mean, m2):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        """Fold a chunk of values into the running moments (NaNs are skipped)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        mean = float(values.mean())
+        self._combine(values.size, mean, float(((values - mean) ** 2).sum()))
+
+    def merge(self, other):
+        """Fold another OnlineMoments into this one."""
+        self._combine(other.count, other.mean, other.m2)
+
+    def to_state(self):
+        """JSON-serializable state; floats round-trip exactly."""
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls()
+        moments.count = state["count"]
+        moments.mean = state["mean"]
+        moments.m2 = state["m2"]
+        return moments
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count else math.nan
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (DDSketch-style).
+
+    Values are counted in logarithmic buckets, separately for positive
+    and negative values. Values smaller in magnitude than min_value count
+    as zero. Memory depends only on the dynamic range of the values, never
+    on how many were added, and is capped at max_buckets per sign by
+    collapsing the buckets closest to zero.
+
+    quantile(q) returns the value of rank floor(q * (count - 1)) (numpy's
+    "lower" method) to within `relative_accuracy` of it, or within
+    min_value of it for values counted as zero. That holds while no
+    bucket has been collapsed. After a collapse, values whose magnitude
+    lies at or below collapse_limits() for their sign share one bucket
+    and are reported as its value: a quantile that falls there is only
+    known to lie between min_value and that limit in magnitude. Values
+    above the limit keep the relative guarantee. The collapsed state
+    depends only on the values added (the max_buckets - 1 largest keys
+    ever seen stay exact), so merged sketches still equal a single pass.
+    """
+
+    def __init__(self, relative_accuracy=0.005, min_value=1e-2, max_buckets=4096):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _add_keys(self, store, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        unique, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(unique.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+        self._collapse(store)
+
+    def _collapse(self, store):
+        """Fold the buckets closest to zero into one so at most max_buckets remain."""
+        if len(store) <= self.max_buckets:
+            return
+        keys = sorted(store)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        target = excess[-1]
+        store[target] = sum(store.pop(key) for key in excess[:-1]) + store[target]
+
+    def update(self, values):
+        """Fold a chunk of values into the sketch (NaNs are skipped)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        small = np.abs(values) < self.min_value
+        self.zero_count += int(small.sum())
+        if np.any(values >= self.min_value):
+            self._add_keys(self.positive, values[values >= self.min_value])
+        if np.any(values <= -self.min_value):
+            self._add_keys(self.negative, -values[values <= -self.min_value])
+        self.count += values.size
+
+    def merge(self, other):
+        """Fold another sketch (built with the same parameters) into this one."""
+        if other.gamma != self.gamma or other.min_value != self.min_value:
+            raise ValueError("Cannot merge sketches with different accuracy settings")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+            self._collapse(store)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def to_state(self):
+        """JSON-serializable state (bucket keys become strings)."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_buckets": self.max_buckets,
+            "positive": {str(key): count for key, count in self.positive.items()},
+            "negative": {str(key): count for key, count in self.negative.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state["relative_accuracy"], state["min_value"], state["max_buckets"])
+        sketch.positive = {int(key): count for key, count in state["positive"].items()}
+        sketch.negative = {int(key): count for key, count in state["negative"].items()}
+        sketch.zero_count = state["zero_count"]
+        sketch.count = state["count"]
+        return sketch
+
+    def collapse_limits(self):
+        """(negative, positive) magnitude up to which buckets were collapsed.
+
+        None for a sign using fewer than max_buckets buckets, which can
+        never have collapsed (one using exactly max_buckets is reported,
+        conservatively). Quantiles that fall at or below a limit lose the
+        relative accuracy guarantee.
+        """
+        return tuple(self.gamma ** min(store) if len(store) >= self.max_buckets else None
+                     for store in (self.negative, self.positive))
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (1 + self.gamma)
+
+    def buckets(self):
+        """(representative value, count) pairs in ascending value order."""
+        result = [(-self._bucket_value(key), self.negative[key])
+                  for key in sorted(self.negative, reverse=True)]
+        if self.zero_count:
+            result.append((0.0, self.zero_count))
+        result.extend((self._bucket_value(key), self.positive[key]) for key in sorted(self.positive))
+        return result
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1)."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for value, count in self.buckets():
+            seen += count
+            if seen > rank:
+                return value
+        return value
+
+    def lower_tail_mean(self, fraction):
+        """Approximate mean of the lowest `fraction` of values."""
+        if self.count == 0:
+            return math.nan
+        wanted = max(fraction * self.count, 1.0)
+        taken = 0.0
+        total = 0.0
+        for value, count in self.buckets():
+            use = min(count, wanted - taken)
+            total += use * value
+            taken += use
+            if taken >= wanted:
+                break
+        return total / taken
+
+
+class NetPositionAggregator:
+    """Streaming summary of buy_advantage (owning minus renting net position).
+
+    Reports mean, standard deviation, P5/P50/P95, the probability that
+    buying wins and the expected shortfall (mean of the worst
+    `shortfall_level` share of outcomes), in memory that does not grow
+    with the number of paths.
+    """
+
+    def __init__(self, relative_accuracy=0.005, shortfall_level=0.05):
+        self.shortfall_level = shortfall_level
+        self.moments = OnlineMoments()
+        self.sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+        self.buy_wins = 0
+
+    def update(self, chunk):
+        """Consume a chunk: a summary dict from the engine or an array of advantages."""
+        advantage = chunk["buy_advantage"] if isinstance(chunk, dict) else chunk
+        advantage = np.asarray(advantage, dtype=np.float64)
+        self.moments.update(advantage)
+        self.sketch.update(advantage)
+        self.buy_wins += int((advantage > 0).sum())
+
+    def merge(self, other):
+        """Fold a partial aggregate from another worker into this one."""
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.buy_wins += other.buy_wins
+
+    def to_state(self):
+        """JSON-serializable state, e.g. for checkpoints or a result store."""
+        return {
+            "shortfall_level": self.shortfall_level,
+            "moments": self.moments.to_state(),
+            "sketch": self.sketch.to_state(),
+            "buy_wins": self.buy_wins,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls(shortfall_level=state["shortfall_level"])
+        aggregator.moments = OnlineMoments.from_state(state["moments"])
+        aggregator.sketch = QuantileSketch.from_state(state["sketch"])
+        aggregator.buy_wins = state["buy_wins"]
+        return aggregator
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    def summary(self):
+        return {
+            "paths": self.count,
+            "mean": self.moments.mean,
+            "std": self.moments.std,
+            "p5": self.sketch.quantile(0.05),
+            "p50": self.sketch.quantile(0.50),
+            "p95": self.sketch.quantile(0.95),
+            "prob_buy_wins": self.buy_wins / self.count if self.count else math.nan,
+            "expected_shortfall": self.sketch.lower_tail_mean(self.shortfall_level),
+        }
+
+
+def aggregate_batch(params, chunk_size=None, aggregator=None, memory_budget=None, profiler=None):
+    """Stream a batch through the engine into a NetPositionAggregator.
+
+    memory_budget and profiler are as for iter_batch_chunks; folding
+    chunks into the aggregate is recorded as the "aggregation" stage.
+    """
+    aggregator = aggregator or NetPositionAggregator()
+    for _, _, summary, _ in iter_batch_chunks(params, chunk_size=chunk_size, memory_budget=memory_budget,
+                                              profiler=profiler):
+        with profile_stage(profiler, "aggregation"):
+            aggregator.update(summary)
+    return aggregator
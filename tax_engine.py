@@ -0,0 +1,173 @@
+import numpy as np
+
+from annual_screening import geometric_sum
+from batch_simulation import broadcast_params, monthly_payment, remaining_balance
+
+# Annual tax model for the batch engine. simulate_scenario takes
+# min(interest + property tax, cap) * tax_rate every month; here taxes
+# are worked out per tax year, as the return is filed:
+#
+#   - while living in the home, mortgage interest (limited to the share
+#     of the balance under the debt limit) and property tax (under the
+#     SALT cap, shared with other state and local taxes) are itemized,
+#     and only the excess over the standard deduction saves tax, compared
+#     with what a renter with the same other deductions would claim;
+#   - while renting the home out, rent collected minus interest, property
+#     tax, upkeep and depreciation is rental income; losses are deductible
+#     up to the passive loss allowance each year, the rest is carried
+#     forward and released when the home is sold;
+#   - on the sale, gain up to the depreciation taken is taxed as
+#     recapture, and the rest is capital gain after the primary-residence
+#     exclusion when the use test is met.
+#
+# Every quantity is a (scenarios x years) array built from closed forms
+# (month sums of interest come from balance differences, rent from a
+# geometric sum), so the cost grows with the number of years, not months.
+
+
+class TaxRules:
+    def __init__(self, standard_deduction=29200.0, salt_cap=10000.0, other_salt=0.0, other_itemized=0.0,
+                 mortgage_debt_limit=750000.0, passive_loss_allowance=25000.0,
+                 building_share=0.8, depreciation_years=27.5, recapture_rate=0.25,
+                 capital_gains_rate=0.15, residence_exclusion=500000.0,
+                 use_test_months=24, lookback_months=60):
+        """Annual tax parameters (defaults: US, married filing jointly).
+
+        other_salt is state/local income tax paid anyway, which shares
+        the SALT cap with property tax; other_itemized is every other
+        itemized deduction (charity, ...). building_share of the purchase
+        price plus buying costs is depreciable over depreciation_years.
+        Recapture is taxed at the marginal rate capped at recapture_rate.
+        The exclusion applies when the home was lived in for at least
+        use_test_months of the lookback_months before the sale.
+        """
+        self.standard_deduction = standard_deduction
+        self.salt_cap = salt_cap
+        self.other_salt = other_salt
+        self.other_itemized = other_itemized
+        self.mortgage_debt_limit = mortgage_debt_limit
+        self.passive_loss_allowance = passive_loss_allowance
+        self.building_share = building_share
+        self.depreciation_years = depreciation_years
+        self.recapture_rate = recapture_rate
+        self.capital_gains_rate = capital_gains_rate
+        self.residence_exclusion = residence_exclusion
+        self.use_test_months = use_test_months
+        self.lookback_months = lookback_months
+
+
+def annual_taxes(params, rules=None):
+    """Tax effects of owning for every scenario, per tax year and in total.
+
+    Year y covers months 12y+1..12y+12 of the horizon. Returns (n, years)
+    arrays "deduction_savings" (tax saved by itemizing, over the renter's
+    return) and "rental_tax" (tax on rental income; negative when losses
+    save tax), and (n,) arrays "total_deduction_savings",
+    "total_rental_tax", "depreciation", "loss_release_savings",
+    "recapture_tax", "capital_gains_tax" and "sale_taxes" (recapture plus
+    capital gains minus the released losses).
+    """
+    rules = rules or TaxRules()
+    cols = broadcast_params(params)
+    col = lambda values: values[:, None]
+    home_price = cols["home_price"]
+    tax_rate = col(cols["tax_rate"])
+    loan_amount = home_price * (1 - cols["down_payment_pct"])
+    rate = cols["mortgage_rate_annual"]
+    payment = monthly_payment(loan_amount, rate, cols["mortgage_term_years"])
+    property_tax_monthly = col(home_price * cols["property_tax_rate_annual"] / 12)
+    upkeep_monthly = col(cols["maintenance_annual"] / 12 + cols["insurance_annual"] / 12 + cols["hoa_monthly"])
+    live_in = col(cols["months_live_in"])
+    total_months = cols["months_live_in"] + cols["months_rent_out"]
+
+    num_years = int(np.ceil(total_months.max() / 12))
+    first = 12 * np.arange(num_years, dtype=np.float64)[None, :] + 1
+    last = np.minimum(first + 11, col(total_months))
+
+    def balance(months):
+        return remaining_balance(col(loan_amount), col(rate), col(payment), months)
+
+    def interest(a, b, count):
+        """Interest paid in months a..b (count of them): payments minus principal repaid."""
+        return np.where(count > 0, col(payment) * count - (balance(a - 1) - balance(b)), 0.0)
+
+    # Living in: itemized deductions against the renter's return.
+    own_last = np.minimum(last, live_in)
+    own_months = np.maximum(own_last - first + 1, 0)
+    own_last = np.maximum(own_last, first)
+    average_balance = (balance(first - 1) + balance(own_last)) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qualified = np.where(average_balance > rules.mortgage_debt_limit,
+                             rules.mortgage_debt_limit / average_balance, 1.0)
+    itemized = (interest(first, own_last, own_months) * qualified +
+                np.minimum(property_tax_monthly * own_months + rules.other_salt, rules.salt_cap) +
+                rules.other_itemized)
+    renter_itemized = min(rules.other_salt, rules.salt_cap) + rules.other_itemized
+    deduction_savings = tax_rate * (np.maximum(itemized, rules.standard_deduction) -
+                                    max(renter_itemized, rules.standard_deduction))
+
+    # Renting out: rental income, depreciation and passive losses.
+    rent_first = np.maximum(first, live_in + 1)
+    rent_months = np.maximum(last - rent_first + 1, 0)
+    rent_first = np.minimum(rent_first, np.maximum(last, first))
+    log_rent = col(np.log1p(cols["rent_growth_annual"]) / 12)
+    rent_collected = (col(cols["rent_collected_home"]) * np.exp((rent_first - 1) * log_rent) *
+                      geometric_sum(log_rent, rent_months))
+
+    basis = home_price * (1 + cols["closing_costs_buy_pct"])
+    monthly_depreciation = col(basis * rules.building_share / (12 * rules.depreciation_years))
+    # Mid-month convention: the first rental month counts half.
+    depreciation_months = rent_months - 0.5 * ((rent_first == live_in + 1) & (rent_months > 0))
+    depreciation = np.diff(np.minimum(np.cumsum(monthly_depreciation * depreciation_months, axis=1),
+                                      col(basis * rules.building_share)), axis=1, prepend=0.0)
+    net_rental = (rent_collected - interest(rent_first, last, rent_months) -
+                  (property_tax_monthly + upkeep_monthly) * rent_months - depreciation)
+
+    # Suspended losses follow carry_y = max(0, carry_{y-1} - net_y - allowance),
+    # i.e. running max minus current value of the cumulative sum of
+    # net + allowance; the allowance only counts in rental years.
+    allowance = rules.passive_loss_allowance * (rent_months > 0)
+    cumulative = np.cumsum(net_rental + allowance, axis=1)
+    running_max = np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=1)
+    carry = running_max - cumulative
+    carry_before = np.concatenate([np.zeros((len(home_price), 1)), carry[:, :-1]], axis=1)
+    rental_tax = np.where(rent_months > 0, tax_rate * np.maximum(net_rental - carry_before,
+                                                                  -rules.passive_loss_allowance), 0.0)
+
+    # Sale at the end of the horizon.
+    home_value_after = home_price * (1 + cols["home_appreciation_annual"]) ** (total_months / 12)
+    amount_realized = home_value_after * (1 - cols["closing_costs_sell_pct"])
+    total_depreciation = depreciation.sum(axis=1)
+    gain = amount_realized - (basis - total_depreciation)
+    recaptured = np.clip(gain, 0.0, total_depreciation)
+    eligible = ((cols["months_live_in"] >= rules.use_test_months) &
+                (cols["months_rent_out"] <= rules.lookback_months - rules.use_test_months))
+    taxable_gain = np.maximum(gain - total_depreciation - np.where(eligible, rules.residence_exclusion, 0.0), 0.0)
+    recapture_tax = recaptured * np.minimum(cols["tax_rate"], rules.recapture_rate)
+    capital_gains_tax = taxable_gain * rules.capital_gains_rate
+    loss_release_savings = cols["tax_rate"] * carry[:, -1]
+
+    return {
+        "deduction_savings": deduction_savings,
+        "rental_tax": rental_tax,
+        "total_deduction_savings": deduction_savings.sum(axis=1),
+        "total_rental_tax": rental_tax.sum(axis=1),
+        "depreciation": total_depreciation,
+        "loss_release_savings": loss_release_savings,
+        "recapture_tax": recapture_tax,
+        "capital_gains_tax": capital_gains_tax,
+        "sale_taxes": recapture_tax + capital_gains_tax - loss_release_savings,
+    }
+
+
+def monthly_tax_savings(taxes, total_months, num_months):
+    """Spread each year's net tax saving evenly over the year's months.
+
+    Returns an (n, num_months) array for batch_simulation.buy_side, zero
+    past each scenario's horizon.
+    """
+    yearly = taxes["deduction_savings"] - taxes["rental_tax"]
+    num_years = yearly.shape[1]
+    months_in_year = np.clip(total_months[:, None] - 12 * np.arange(num_years), 1, 12)
+    monthly = np.repeat(yearly / months_in_year, 12, axis=1)[:, :num_months]
+    return np.where(np.arange(1, num_months + 1) <= total_months[:, None], monthly, 0.0)
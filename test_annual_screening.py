@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from annual_screening import screen_batch, simulate_annual
+from batch_simulation import PARAMETER_NAMES, SUMMARY_FIELDS, simulate_batch
+from fuzz_harness import BASE_SCENARIO, edge_case_scenarios, generate_scenarios
+
+# The annual approximation must stay within its reported error bound of
+# the monthly engine on every scenario, including the ones where the
+# deduction cap or the investing cut-off switches mid-year, and screening
+# must never get the sign of a scenario wrong.
+
+
+def _columns(scenarios):
+    return {name: np.array([s[name] for _, s in scenarios], dtype=np.float64) for name in PARAMETER_NAMES}
+
+
+def _switching_scenarios(n=400, seed=9):
+    """Scenarios whose deduction cap or investing cut-off binds in some years only."""
+    rng = np.random.default_rng(seed)
+    return [(f"switching {i}", dict(
+        BASE_SCENARIO,
+        rent_current=float(rng.uniform(3000, 7000)),
+        rent_growth_annual=float(rng.uniform(0.0, 0.08)),
+        property_tax_deduction_cap=float(rng.uniform(0, 60000)),
+        home_appreciation_annual=float(rng.uniform(-0.05, 0.1)),
+        months_live_in=int(rng.integers(1, 240)),
+        months_rent_out=int(rng.integers(0, 120)),
+    )) for i in range(n)]
+
+
+@pytest.mark.parametrize("scenarios", [
+    generate_scenarios(1500, seed=42),
+    edge_case_scenarios(),
+    _switching_scenarios(),
+], ids=["random", "edge cases", "switching"])
+def test_bound_holds_against_the_monthly_engine(scenarios):
+    cols = _columns(scenarios)
+    approx = simulate_annual(cols, chunk_size=256)
+    exact = simulate_batch(cols)
+    bound = approx["approximation_error_bound"]
+    error = np.abs(approx["buy_advantage"] - exact["buy_advantage"])
+    assert np.all(bound >= 0)
+    outside = np.flatnonzero(error > bound)
+    assert outside.size == 0, [scenarios[i][0] for i in outside[:5]]
+
+
+def test_screening_keeps_every_sign_and_refines_near_break_even():
+    cols = _columns(generate_scenarios(1500, seed=43) + _switching_scenarios(seed=10))
+    exact = simulate_batch(cols)
+    screened = screen_batch(cols, band=5000.0)
+
+    refined = screened["full_resolution"]
+    assert 0 < refined.sum() < len(refined)
+    np.testing.assert_array_equal(np.sign(screened["buy_advantage"]), np.sign(exact["buy_advantage"]))
+    for name in SUMMARY_FIELDS:
+        np.testing.assert_allclose(screened[name][refined], exact[name][refined], rtol=1e-12, atol=1e-6)
+    assert np.all(screened["approximation_error_bound"][refined] == 0)
+    assert np.all(np.abs(screened["buy_advantage"][~refined]) > 5000.0)
+
+
+def test_max_error_forces_refinement():
+    cols = _columns(generate_scenarios(300, seed=44))
+    screened = screen_batch(cols, band=0.0, max_error=0.0)
+    assert screened["full_resolution"].all()
+    np.testing.assert_allclose(screened["buy_advantage"], simulate_batch(cols)["buy_advantage"], rtol=1e-12,
+                               atol=1e-6)
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+import autotune
+from batch_simulation import default_chunk_size, DEFAULT_CHUNK_SIZE
+from parallel_runner import default_workers
+
+# Profiles only feed chunk sizes and worker counts to library calls: a
+# corrupt file must fall back to the defaults, and the process-wide
+# allocator setting is applied only through apply_profile.
+
+PROFILE = {
+    "version": autotune.PROFILE_VERSION,
+    "chunk_sizes": {"36": 8192, "120": 2048, "360": 512},
+    "memory_block_bytes": 64 << 20,
+    "allocator": True,
+    "workers": 3,
+}
+
+
+@pytest.fixture
+def profile_file(tmp_path, monkeypatch):
+    path = tmp_path / "tuning.json"
+    monkeypatch.setenv("HOMECALC_TUNING_PROFILE", str(path))
+    calls = []
+    monkeypatch.setattr(autotune, "configure_allocator", lambda block_bytes: calls.append(block_bytes) or True)
+    return path, calls
+
+
+def test_profile_sets_defaults_without_touching_the_allocator(profile_file):
+    path, calls = profile_file
+    path.write_text(json.dumps({autotune.machine_fingerprint(): PROFILE}))
+    assert default_chunk_size(120) == 2048
+    assert default_workers() == 3
+    assert calls == []
+    assert autotune.apply_profile()
+    assert calls == [PROFILE["memory_block_bytes"]]
+
+
+def test_corrupt_profile_falls_back_to_defaults(profile_file):
+    path, calls = profile_file
+    path.write_text('{"truncated": ')
+    with pytest.warns(UserWarning, match="Ignoring tuning profile"):
+        assert default_chunk_size(120) == DEFAULT_CHUNK_SIZE
+    assert not autotune.apply_profile()
+    assert calls == []
+
+
+def test_fingerprint_leaves_out_the_host_name():
+    import platform
+    assert platform.node() not in autotune.machine_fingerprint().split("/")
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from backtest import load_history, parse_month, run_backtest
+from fuzz_harness import BASE_SCENARIO
+
+# load_history on small synthetic CSV files: months are aligned by year
+# and month whatever their spelling, and gaps or duplicated months are
+# refused rather than silently shifting every later window.
+
+
+def _months(start_year, count):
+    return [f"{start_year + i // 12}-{i % 12 + 1:02d}" for i in range(count)]
+
+
+def _write(path, dates, values):
+    path.write_text("date,value\n" + "".join(f"{d},{v}\n" for d, v in zip(dates, values)))
+    return str(path)
+
+
+def _history_files(tmp_path, count=30, **dates):
+    default = _months(2000, count)
+    return [
+        _write(tmp_path / "rates.csv", dates.get("rates", default), [6.0] * count),
+        _write(tmp_path / "homes.csv", dates.get("homes", default), [100 + i for i in range(count)]),
+        _write(tmp_path / "rents.csv", dates.get("rents", default), [50 + i for i in range(count)]),
+        _write(tmp_path / "market.csv", dates.get("market", default), [0.01] * count),
+    ]
+
+
+@pytest.mark.parametrize("text, month", [
+    ("2005-01", "2005-01"), ("2005-1", "2005-01"), ("2005/12", "2005-12"), ("2005-01-31", "2005-01"),
+    (" 1999-07 ", "1999-07"),
+])
+def test_parse_month(text, month):
+    assert parse_month(text) == month
+
+
+@pytest.mark.parametrize("text", ["2005-13", "2005-00", "Jan 2005", "05-01", "2005"])
+def test_parse_month_rejects_other_text(text):
+    with pytest.raises(ValueError, match="year and month"):
+        parse_month(text)
+
+
+def test_series_are_aligned_on_common_months(tmp_path):
+    months = _months(2000, 30)
+    # Different spellings and a longer home price series still line up by month.
+    homes = _months(1999, 42)
+    files = _history_files(tmp_path, rates=[m + "-01" for m in months], market=[m.replace("-", "/") for m in months])
+    files[1] = _write(tmp_path / "homes.csv", homes, range(42))
+    history = load_history(*files, rates_in_percent=True)
+
+    assert history["dates"] == months
+    np.testing.assert_array_equal(history["home_index"], np.arange(12, 42))
+    np.testing.assert_array_equal(history["rent_index"], 50 + np.arange(30))
+    np.testing.assert_allclose(history["mortgage_rate"], 0.06)
+    np.testing.assert_allclose(history["market_index"], 1.01 ** np.arange(31))
+
+
+def test_gaps_are_rejected(tmp_path):
+    months = _months(2000, 30)
+    files = _history_files(tmp_path, rents=months[:10] + months[11:] + ["2002-07"])
+    with pytest.raises(ValueError, match="gap between 2000-10 and 2000-12"):
+        load_history(*files)
+
+
+def test_duplicate_months_are_rejected(tmp_path):
+    months = _months(2000, 30)
+    files = _history_files(tmp_path, market=months[:5] + ["2000-05-15"] + months[6:])
+    with pytest.raises(ValueError, match="month 2000-05 appears twice"):
+        load_history(*files)
+
+
+def test_no_common_months(tmp_path):
+    files = _history_files(tmp_path, rents=_months(2010, 30))
+    with pytest.raises(ValueError, match="no dates in common"):
+        load_history(*files)
+
+
+def test_flat_history_gives_the_same_outcome_for_every_start(tmp_path):
+    count = 30
+    files = [
+        _write(tmp_path / "rates.csv", _months(2000, count), [0.06] * count),
+        _write(tmp_path / "homes.csv", _months(2000, count), [100.0] * count),
+        _write(tmp_path / "rents.csv", _months(2000, count), [100.0] * count),
+        _write(tmp_path / "market.csv", _months(2000, count), [0.0] * count),
+    ]
+    params = dict(BASE_SCENARIO, months_live_in=12, months_rent_out=6)
+    results = run_backtest(load_history(*files), params)
+    assert results["dates"] == _months(2000, count - 18)
+    np.testing.assert_allclose(results["buy_advantage"], results["buy_advantage"][0], rtol=1e-12)
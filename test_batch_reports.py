@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+from batch_reports import compile_template, escape_markdown, write_reports
+from fuzz_harness import BASE_SCENARIO
+
+# Report rendering must match str.format, names must not inject markup
+# into Markdown or HTML reports, and every scenario must get its own file
+# even when names sanitize to the same file name.
+
+
+def test_compiled_template_matches_str_format():
+    template = "{title}: {price:,.2f} ({name!r:>8}) {{literal}}"
+    row = {"title": "Report", "price": 1234567.891, "name": "a"}
+    assert compile_template(template)(row) == template.format(**row)
+
+
+def test_colliding_names_get_their_own_files(tmp_path):
+    params = dict(BASE_SCENARIO, home_price=np.full(5, float(BASE_SCENARIO["home_price"])))
+    names = ["a b", "a/b", "A_b", "x", "x"]
+    stats = write_reports(params, tmp_path, names=names, workers=2, chunk_size=2)
+    assert stats["reports"] == 5
+    assert sorted(os.listdir(tmp_path)) == ["A_b_3.txt", "a_b.txt", "a_b_2.txt", "x.txt", "x_2.txt"]
+
+
+def test_markdown_names_are_escaped():
+    assert escape_markdown("Unit *4* [lot](x) <b>|#_~`!&\\") == \
+        r"Unit \*4\* \[lot\]\(x\) \<b\>\|\#\_\~\`\!\&\\"
+    assert escape_markdown("two\n# lines") == r"two \# lines"
+    assert escape_markdown("12 Oak St. - 3.5% down") == "12 Oak St. - 3.5% down"
+
+
+def test_names_in_titles_are_escaped_per_format(tmp_path):
+    params = dict(BASE_SCENARIO, home_price=np.full(1, float(BASE_SCENARIO["home_price"])))
+    name = "*Loft* <i>|\n## 2"
+    for fmt, title in (("markdown", r"# Buy vs Rent: \*Loft\* \<i\>\| \#\# 2"),
+                       ("html", "Buy vs Rent: *Loft* &lt;i&gt;|\n## 2"),
+                       ("text", "Buy vs Rent: *Loft* <i>|\n## 2")):
+        write_reports(params, tmp_path / fmt, fmt=fmt, names=[name], workers=1)
+        [report] = os.listdir(tmp_path / fmt)
+        assert title in (tmp_path / fmt / report).read_text(encoding="utf-8"), fmt
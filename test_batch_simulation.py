@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from batch_simulation import PARAMETER_NAMES, rental_cash_flow, simulate_batch
+from fuzz_harness import edge_case_scenarios, generate_scenarios
+
+# Checks of the batch engine beyond the reference comparison in
+# fuzz_harness: the float32 engine must stay within its reported error
+# bound of the float64 engine on every scenario, random or at a branch
+# boundary, and rental cash flow must follow RentalScenario and only be
+# credited when asked for.
+
+
+def _columns(scenarios):
+    return {name: np.array([s[name] for _, s in scenarios], dtype=np.float64) for name in PARAMETER_NAMES}
+
+
+def _check_float32_bound(scenarios, chunk_size=None):
+    cols = _columns(scenarios)
+    exact = simulate_batch(cols, chunk_size=chunk_size)
+    compact = simulate_batch(cols, chunk_size=chunk_size, dtype=np.float32)
+    bound = compact["float32_error_bound"]
+    assert np.all(np.isfinite(bound)) and np.all(bound >= 0)
+    error = np.abs(compact["buy_advantage"] - exact["buy_advantage"])
+    bad = np.flatnonzero(~(error <= bound))
+    assert bad.size == 0, "\n".join(f"{scenarios[i][0]}: error {error[i]:.6g} > bound {bound[i]:.6g}"
+                                    for i in bad[:10])
+
+
+def test_float32_bound_on_edge_cases():
+    _check_float32_bound(edge_case_scenarios())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_float32_bound_on_random_scenarios(seed):
+    _check_float32_bound(generate_scenarios(400, seed=seed))
+
+
+def test_float32_bound_with_small_chunks():
+    _check_float32_bound(generate_scenarios(100, seed=42), chunk_size=7)
+
+
+def test_float32_bound_is_not_vacuous():
+    # The bound should stay a small fraction of the home price (it grows
+    # with the horizon's compounding, to ~0.5% at 40 years), or the
+    # float32 mode would be useless for ranking scenarios.
+    scenarios = edge_case_scenarios()
+    compact = simulate_batch(_columns(scenarios), dtype=np.float32)
+    assert np.all(compact["float32_error_bound"] < 1e-2 * _columns(scenarios)["home_price"])
+
+
+def test_rental_cash_flow_matches_rental_scenario():
+    from property_analysis import PropertyCosts
+    from rental_analysis import RentalScenario
+    scenarios = generate_scenarios(20, seed=7)
+    cols = _columns(scenarios)
+    num_months = int((cols["months_live_in"] + cols["months_rent_out"]).max())
+    cash_flow = rental_cash_flow(cols, num_months)
+    for i, (_, s) in enumerate(scenarios):
+        costs = PropertyCosts(s["home_price"], s["down_payment_pct"], s["mortgage_rate_annual"],
+                              s["mortgage_term_years"], s["property_tax_rate_annual"], s["maintenance_annual"],
+                              s["insurance_annual"], s["hoa_monthly"])
+        rental = RentalScenario(costs, s["months_live_in"], s["months_rent_out"], s["rent_while_out"],
+                                s["rent_collected_home"], s["rent_growth_annual"], s["rent_current"])
+        total_months = int(s["months_live_in"] + s["months_rent_out"])
+        expected = [rental.calculate_monthly_cashflow(m) if m > s["months_live_in"] else 0.0
+                    for m in range(1, total_months + 1)]
+        np.testing.assert_allclose(cash_flow[i, :total_months], expected, rtol=1e-12, atol=1e-9)
+        assert not np.any(cash_flow[i, total_months:])
+
+
+def test_rental_income_credits_the_landlord_cash_flow():
+    from tax_engine import TaxRules
+    scenarios = edge_case_scenarios()
+    cols = _columns(scenarios)
+    taxed = simulate_batch(cols, tax_rules=TaxRules(), rental_income=True)
+    num_months = int((cols["months_live_in"] + cols["months_rent_out"]).max())
+    np.testing.assert_allclose(taxed["total_rental_cash_flow"], rental_cash_flow(cols, num_months).sum(axis=1))
+    np.testing.assert_allclose(taxed["owning_effective_net"],
+                               taxed["fv_monthly_invest"] - taxed["net_cost_after_selling"])
+    never_rented = cols["months_rent_out"] == 0
+    assert np.all(taxed["total_rental_cash_flow"][never_rented] == 0)
+
+
+def test_rental_income_is_separate_from_tax_rules():
+    from tax_engine import TaxRules
+    cols = _columns(generate_scenarios(50, seed=11))
+    plain = simulate_batch(cols)
+    credited = simulate_batch(cols, rental_income=True)
+    taxed = simulate_batch(cols, tax_rules=TaxRules())
+    taxed_credited = simulate_batch(cols, tax_rules=TaxRules(), rental_income=True)
+    assert "total_rental_cash_flow" not in taxed
+    # The credit moves both modes by the same amount.
+    np.testing.assert_allclose(credited["buy_advantage"] - plain["buy_advantage"],
+                               taxed_credited["buy_advantage"] - taxed["buy_advantage"],
+                               rtol=1e-9, atol=1e-6 * cols["home_price"].max())
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+import cash_flows
+from cash_flows import annualize, irr, npv
+
+# IRR and NPV on streams with closed-form answers, on both the Newton
+# path and the bisection fallback, and on streams that have no IRR.
+
+
+def _annuity(rate, months, price=100000.0):
+    """-price now, then the level payment that earns `rate` per month."""
+    payment = price * rate / (1 - (1 + rate) ** -months)
+    return np.concatenate([[-price], np.full(months, payment)])
+
+
+def _zero_coupon(rate, months, price=100.0):
+    flows = np.zeros(months + 1)
+    flows[0], flows[-1] = -price, price * (1 + rate) ** months
+    return flows
+
+
+@pytest.mark.parametrize("rate", [-0.02, 0.0001, 0.005, 0.03, 0.2])
+def test_irr_of_closed_form_streams(rate):
+    streams = np.stack([_annuity(rate, 120), _zero_coupon(rate, 120)])
+    np.testing.assert_allclose(irr(streams), rate, rtol=1e-8, atol=1e-12)
+
+
+def test_npv_of_an_annuity():
+    flows = _annuity(0.01, 60)
+    annual = 0.07
+    v = (1 + annual) ** (-1 / 12)
+    expected = -100000 + flows[1] * v * (1 - v ** 60) / (1 - v)
+    assert npv(flows[None], annual)[0] == pytest.approx(expected, rel=1e-12)
+    # At the annualized IRR the NPV is zero.
+    assert npv(flows[None], annualize(0.01))[0] == pytest.approx(0, abs=1e-6)
+
+    values = npv(np.stack([flows, 2 * flows]), [0.0, annual])
+    assert values.shape == (2, 2)
+    np.testing.assert_allclose(values[0], [flows.sum(), 2 * flows.sum()])
+    np.testing.assert_allclose(values[1], [expected, 2 * expected])
+
+
+def test_trailing_zero_months_change_nothing():
+    flows = _annuity(0.01, 36)
+    padded = np.concatenate([flows, np.zeros(24)])
+    assert irr(padded)[0] == pytest.approx(irr(flows)[0], rel=1e-10)
+    assert npv(padded[None], 0.05)[0] == pytest.approx(npv(flows[None], 0.05)[0], rel=1e-12)
+
+
+def test_bisection_takes_over_when_newton_fails(monkeypatch):
+    calls = []
+    bisect = cash_flows._bisect
+
+    def recording(flows, k, tol):
+        calls.append(len(flows))
+        return bisect(flows, k, tol)
+
+    monkeypatch.setattr(cash_flows, "_bisect", recording)
+    streams = np.stack([_annuity(0.01, 240), _zero_coupon(0.004, 240)])
+    np.testing.assert_allclose(irr(streams), [0.01, 0.004], rtol=1e-8)
+    assert calls == []
+
+    # A guess far off makes Newton overshoot below -100%; no iterations at all also falls back.
+    for kwargs in ({"guess": 50.0}, {"max_iter": 0}):
+        np.testing.assert_allclose(irr(streams, **kwargs), [0.01, 0.004], rtol=1e-8)
+    assert calls == [2, 2]
+
+
+def test_bisection_widens_past_the_initial_bracket():
+    # 400% in one month lies beyond the initial (-50%, 100%] bracket.
+    flows = np.array([[-100.0, 500.0]])
+    assert irr(flows, max_iter=0)[0] == pytest.approx(4.0, rel=1e-8)
+    assert cash_flows._bisect(flows, np.arange(2.0), 1e-12)[0] == pytest.approx(4.0, rel=1e-10)
+
+
+def test_streams_without_a_sign_change_have_no_irr():
+    streams = np.array([
+        [-100.0, -10.0, -10.0],
+        [100.0, 10.0, 0.0],
+        [0.0, 0.0, 0.0],
+        [-100.0, 60.0, 60.0],
+    ])
+    rates = irr(streams)
+    assert np.isnan(rates[:3]).all()
+    assert (1 + rates[3]) ** -1 * 60 + (1 + rates[3]) ** -2 * 60 == pytest.approx(100)
+    assert np.isnan(cash_flows._bisect(streams[:3], np.arange(3.0), 1e-10)).all()
+
+
+def test_annualize():
+    assert annualize(0.01) == pytest.approx(1.01 ** 12 - 1)
+    np.testing.assert_allclose(annualize([0.0, -0.5]), [0.0, 0.5 ** 12 - 1])
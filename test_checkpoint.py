@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import checkpoint
+import job_queue
+from fuzz_harness import BASE_SCENARIO
+
+# An interrupted and resumed run must give exactly the aggregate of an
+# uninterrupted one, chunked the way the run started.
+
+SWEEP_SPEC = {"kind": "sweep", "base": dict(BASE_SCENARIO),
+              "sweep": {"home_price": [400000.0 + 50000.0 * i for i in range(10)],
+                        "mortgage_rate_annual": [0.03, 0.045, 0.06, 0.075]}}
+MONTE_CARLO_SPEC = {"kind": "monte_carlo", "params": dict(BASE_SCENARIO), "num_paths": 500,
+                    "chunk_size": 64, "seed": 9}
+
+
+def _interrupt_after(monkeypatch, chunks):
+    # One worker computes windows of 4 chunks, checkpointing after each.
+    compute = checkpoint._chunk_aggregate
+    calls = []
+
+    def flaky(task, profiler=None):
+        calls.append(task[1])
+        if len(calls) > chunks:
+            raise KeyboardInterrupt
+        return compute(task, profiler)
+
+    monkeypatch.setattr(checkpoint, "_chunk_aggregate", flaky)
+
+
+@pytest.mark.parametrize("spec", [SWEEP_SPEC, MONTE_CARLO_SPEC], ids=["sweep", "monte_carlo"])
+def test_resumed_run_matches_uninterrupted_run(spec, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "default_chunk_size", lambda num_months: 6)
+    expected = checkpoint.run_checkpointed(spec, str(tmp_path / "full.ckpt"), workers=1).to_state()
+
+    path = str(tmp_path / "run.ckpt")
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 5)
+        with pytest.raises(KeyboardInterrupt):
+            checkpoint.run_checkpointed(spec, path, workers=1, checkpoint_every=0)
+    with open(path) as f:
+        state = json.load(f)
+    assert 0 < state["completed_chunks"][1] < state["total_chunks"]
+
+    resumed = checkpoint.run_checkpointed(spec, path, workers=1)
+    assert resumed.to_state() == expected
+
+
+def test_resume_keeps_the_stored_chunk_size(tmp_path, monkeypatch):
+    path = str(tmp_path / "run.ckpt")
+    monkeypatch.setattr(job_queue, "default_chunk_size", lambda num_months: 6)
+    expected = checkpoint.run_checkpointed(SWEEP_SPEC, str(tmp_path / "full.ckpt"), workers=1).to_state()
+    with monkeypatch.context() as m:
+        _interrupt_after(m, 5)
+        with pytest.raises(KeyboardInterrupt):
+            checkpoint.run_checkpointed(SWEEP_SPEC, path, workers=1, checkpoint_every=0)
+
+    # A re-tuned profile must not change the chunking of the resumed run.
+    monkeypatch.setattr(job_queue, "default_chunk_size", lambda num_months: 16)
+    resumed = checkpoint.run_checkpointed(SWEEP_SPEC, path, workers=1)
+    with open(path) as f:
+        assert json.load(f)["spec"]["chunk_size"] == 6
+    assert resumed.to_state() == expected
+
+
+def test_checkpoint_of_another_spec_is_refused(tmp_path):
+    path = str(tmp_path / "run.ckpt")
+    checkpoint.run_checkpointed(MONTE_CARLO_SPEC, path, workers=1)
+    with pytest.raises(ValueError, match="different run"):
+        checkpoint.run_checkpointed(dict(MONTE_CARLO_SPEC, seed=10), path, workers=1)
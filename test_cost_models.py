@@ -0,0 +1,44 @@
+import numpy as np
+
+from batch_simulation import PARAMETER_NAMES
+from cost_models import simulate_models
+from fuzz_harness import BASE_SCENARIO, generate_scenarios
+from rental_operations import RentalOperations
+
+# Rental operations must be a strict generalization of constant rent:
+# without vacancies, fees or repairs they give the constant-rent result,
+# and worse operating conditions can only make owning look worse.
+
+FRICTIONLESS = RentalOperations(vacancy_months=0, turnover_cost=0, leasing_fee_pct=0,
+                                management_fee_pct=0, repair_probability=0)
+
+
+def _columns(scenarios):
+    return {name: np.array([s[name] for _, s in scenarios], dtype=np.float64) for name in PARAMETER_NAMES}
+
+
+def test_frictionless_operations_reproduce_constant_rent():
+    cols = _columns(generate_scenarios(300, seed=3))
+    assert np.any(cols["rent_growth_annual"] > 0) and np.any(cols["months_rent_out"] > 0)
+    constant = simulate_models(cols, ["moving_out_3"])["moving_out_3"]
+    simulated = simulate_models(cols, ["moving_out_3"], operations=FRICTIONLESS, chunk_size=64)["moving_out_3"]
+    scale = np.maximum(cols["home_price"], 1.0)
+    for name, values in constant.items():
+        np.testing.assert_allclose(simulated[name], values, rtol=1e-12, atol=1e-9 * scale.max(), err_msg=name)
+
+
+def test_worse_operations_lower_buy_advantage():
+    params = dict(BASE_SCENARIO, home_price=np.full(2000, float(BASE_SCENARIO["home_price"])))
+    means = [simulate_models(params, ["moving_out_3"], operations=operations)["moving_out_3"]["buy_advantage"].mean()
+             for operations in (None, RentalOperations(),
+                                RentalOperations(vacancy_months=6, management_fee_pct=0.2))]
+    assert means[0] > means[1] > means[2]
+
+
+def test_models_without_rent_out_cash_flow_ignore_operations():
+    cols = _columns(generate_scenarios(50, seed=5))
+    models = ["current", "user_input_2", "taxes_1"]
+    constant = simulate_models(cols, models)
+    simulated = simulate_models(cols, models, operations=RentalOperations())
+    for model in models:
+        np.testing.assert_array_equal(simulated[model]["buy_advantage"], constant[model]["buy_advantage"])
@@ -0,0 +1,14 @@
+from fuzz_harness import check_engines, run_differential
+
+# Differential check on every test run: each fast engine (batch, small
+# chunks, float32, parallel, threaded) must agree with the reference loop.
+
+
+def test_engines_agree_with_the_reference():
+    timings = check_engines(num_random=150, seed=1234, workers=2)
+    assert {"reference", "batch", "batch float32", "parallel", "threaded"} <= set(timings)
+
+
+def test_differential_run_reports_no_mismatches():
+    problems, _ = run_differential(num_random=60, seed=7, workers=1)
+    assert problems == []
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+
+import job_queue
+from batch_simulation import grid_params, simulate_batch
+from fuzz_harness import BASE_SCENARIO
+
+# The queue against a temporary SQLite file: workers run in-process, and
+# leases are aged by editing the chunks table directly.
+
+SWEEP = {"home_price": [500000.0, 700000.0, 900000.0], "mortgage_rate_annual": [0.04, 0.06]}
+
+
+def _sweep_spec(chunk_size=4):
+    return {"kind": "sweep", "base": dict(BASE_SCENARIO), "sweep": SWEEP, "chunk_size": chunk_size}
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+def _age_lease(db, job_id, chunk_index, seconds):
+    conn = job_queue.connect(db)
+    try:
+        conn.execute("UPDATE chunks SET claimed = claimed - ? WHERE job_id = ? AND chunk_index = ?",
+                     (seconds, job_id, chunk_index))
+    finally:
+        conn.close()
+
+
+def test_submit_work_status_and_results(db):
+    job_id = job_queue.submit_job(_sweep_spec(), db)
+    info = job_queue.job_status(job_id, db)
+    assert (info["status"], info["chunks_total"], info["items_total"]) == ("queued", 2, 6)
+
+    job_queue.run_worker(db, exit_when_idle=True)
+    info = job_queue.job_status(job_id, db)
+    assert info["status"] == "done" and info["progress"] == 1.0 and info["chunks_done"] == 2
+
+    results = job_queue.job_results(job_id, db)
+    expected = simulate_batch(grid_params(BASE_SCENARIO, SWEEP))
+    np.testing.assert_array_equal(results["index"], np.arange(6))
+    np.testing.assert_array_equal(results["buy_advantage"], expected["buy_advantage"])
+
+
+def test_sweeps_without_chunk_size_get_the_default(db):
+    spec = _sweep_spec()
+    del spec["chunk_size"]
+    job_id = job_queue.submit_job(spec, db)
+    assert job_queue.job_status(job_id, db)["chunks_total"] == 1
+
+
+def test_monte_carlo_job(db):
+    spec = {"kind": "monte_carlo", "params": dict(BASE_SCENARIO), "num_paths": 300, "chunk_size": 128, "seed": 3}
+    job_id = job_queue.submit_job(spec, db)
+    job_queue.run_worker(db, exit_when_idle=True)
+    assert job_queue.job_status(job_id, db)["status"] == "done"
+    assert job_queue.job_results(job_id, db).count == 300
+
+
+def test_cancelled_jobs_are_not_worked_on(db):
+    job_id = job_queue.submit_job(_sweep_spec(), db)
+    job_queue.cancel_job(job_id, db)
+    job_queue.run_worker(db, exit_when_idle=True)
+    info = job_queue.job_status(job_id, db)
+    assert info["status"] == "cancelled" and info["chunks_done"] == 0
+    assert len(job_queue.job_results(job_id, db)["index"]) == 0
+
+
+def test_expired_lease_is_handed_to_another_worker(db):
+    job_id = job_queue.submit_job(_sweep_spec(chunk_size=6), db)
+    conn = job_queue.connect(db)
+    try:
+        claimed = job_queue._claim_chunk(conn, "dead")
+        assert claimed[:2] == (job_id, 0)
+        assert job_queue._claim_chunk(conn, "alive") is None
+
+        _age_lease(db, job_id, 0, job_queue.LEASE_SECONDS + 1)
+        assert job_queue._claim_chunk(conn, "alive")[:2] == (job_id, 0)
+        payload = job_queue.compute_chunk(claimed[2], 0)
+        # The first worker lost the chunk, so its late result is dropped.
+        job_queue._store_result(conn, job_id, 0, "dead", payload)
+        assert job_queue.job_status(job_id, db)["chunks_done"] == 0
+        job_queue._store_result(conn, job_id, 0, "alive", payload)
+        assert job_queue.job_status(job_id, db)["status"] == "done"
+    finally:
+        conn.close()
+
+
+def test_heartbeat_keeps_a_slow_chunk_leased(db):
+    job_id = job_queue.submit_job(_sweep_spec(chunk_size=6), db)
+    conn = job_queue.connect(db)
+    try:
+        job_queue._claim_chunk(conn, "slow")
+        _age_lease(db, job_id, 0, job_queue.LEASE_SECONDS + 1)
+        with job_queue.LeaseHeartbeat(db, job_id, 0, "slow", interval=0.01):
+            time.sleep(0.2)
+        assert job_queue._claim_chunk(conn, "other") is None
+
+        # Once another worker holds the chunk, the old heartbeat stops renewing it.
+        _age_lease(db, job_id, 0, job_queue.LEASE_SECONDS + 1)
+        assert job_queue._claim_chunk(conn, "other")[:2] == (job_id, 0)
+        assert not job_queue.LeaseHeartbeat(db, job_id, 0, "slow").renew(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from batch_simulation import simulate_batch
+from fuzz_harness import BASE_SCENARIO
+from listing_comparison import LISTING_FIELDS, RentBaseline, compare_listings
+
+# Listings compared against one shared baseline must rank and break even
+# exactly as the full batch engine does on the combined scenarios.
+
+BASELINE_FIELDS = ("rent_current", "rent_growth_annual", "alt_invest_growth_annual",
+                   "monthly_invest_growth_annual", "months_live_in", "months_rent_out",
+                   "rent_while_out", "rent_collected_home")
+
+LISTINGS = [
+    dict(listing="condo", home_price=650000, down_payment_pct=0.20, mortgage_rate_annual=0.055, hoa_monthly=650),
+    dict(listing="house", home_price=900000, down_payment_pct=0.20, mortgage_rate_annual=0.06),
+    dict(listing="fixer", home_price=720000, down_payment_pct=0.10, mortgage_rate_annual=0.065,
+         maintenance_annual=15000),
+    dict(listing="townhome", home_price=780000, down_payment_pct=0.25, mortgage_rate_annual=0.058, hoa_monthly=250,
+         home_appreciation_annual=0.05),
+]
+
+
+def _listing(row):
+    return dict({name: BASE_SCENARIO[name] for name in LISTING_FIELDS}, **row)
+
+
+def _baseline(**overrides):
+    return RentBaseline(**dict({name: BASE_SCENARIO[name] for name in BASELINE_FIELDS}, **overrides))
+
+
+def _batch(listings, rental_income=False, **overrides):
+    scenarios = [dict(BASE_SCENARIO, **overrides, **{k: v for k, v in row.items() if k != "listing"})
+                 for row in listings]
+    cols = {name: np.array([s[name] for s in scenarios], dtype=np.float64) for name in BASE_SCENARIO}
+    return simulate_batch(cols, rental_income=rental_income)
+
+
+@pytest.mark.parametrize("rental_income", [False, True])
+def test_ranking_matches_simulate_batch(rental_income):
+    listings = [_listing(row) for row in LISTINGS]
+    rows = compare_listings(_baseline(), listings, rental_income=rental_income)
+    expected = _batch(listings, rental_income)
+
+    order = np.argsort(-expected["buy_advantage"], kind="stable")
+    assert [row["listing"] for row in rows] == [LISTINGS[i]["listing"] for i in order]
+    assert [row["rank"] for row in rows] == [1, 2, 3, 4]
+    for row, i in zip(rows, order):
+        for name in ("buy_advantage", "owning_effective_net", "renting_effective_net", "monthly_payment"):
+            assert row[name] == pytest.approx(expected[name][i], rel=1e-12, abs=1e-6)
+        if rental_income:
+            assert row["total_rental_cash_flow"] == pytest.approx(expected["total_rental_cash_flow"][i])
+
+
+def test_rent_out_terms_only_count_with_rental_income():
+    listings = [_listing(row) for row in LISTINGS]
+    plain = compare_listings(_baseline(rent_collected_home=5000), listings)
+    assert plain == compare_listings(_baseline(), listings)
+
+    credited = {row["listing"]: row for row in compare_listings(_baseline(), listings, rental_income=True)}
+    higher = {row["listing"]: row for row in compare_listings(_baseline(rent_collected_home=5000), listings,
+                                                               rental_income=True)}
+    # 1,500 more rent a month for 36 months, growing with rents.
+    extra = 1500 * ((1.04 ** (1 / 12)) ** np.arange(36, 72)).sum()
+    for name, row in higher.items():
+        assert row["buy_advantage"] - credited[name]["buy_advantage"] == pytest.approx(extra)
+
+
+def test_no_rent_out_months_means_no_rental_cash_flow():
+    baseline = _baseline(months_rent_out=0)
+    assert baseline.rent_collected_home == baseline.rent_while_out == 0
+    assert not baseline.rental_cash_flow.any()
+
+
+def test_break_even_price_matches_simulate_batch():
+    prices = np.linspace(300000, 1500000, 241)
+    listings = {name: BASE_SCENARIO[name] for name in LISTING_FIELDS}
+    listings.update(home_price=prices, listing=[f"{p:.0f}" for p in prices])
+    rows = compare_listings(_baseline(), listings)
+    advantage = {float(row["listing"]): row["buy_advantage"] for row in rows}
+    ours = np.array([advantage[p] for p in np.round(prices)])
+
+    expected = _batch([{"home_price": p} for p in prices])["buy_advantage"]
+    np.testing.assert_allclose(ours, expected, rtol=1e-12, atol=1e-6)
+    crossings = np.flatnonzero(np.diff(np.sign(ours)))
+    assert len(crossings) == 1
+    np.testing.assert_array_equal(crossings, np.flatnonzero(np.diff(np.sign(expected))))
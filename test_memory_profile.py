@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from batch_simulation import chunk_size_for_budget, iter_batch_chunks, simulate_batch
+from fuzz_harness import BASE_SCENARIO
+from memory_profile import MemoryProfiler, parse_memory_size
+
+# Chunks sized from a memory budget must really stay under it, as
+# measured by tracemalloc, and so must a whole budgeted batch.
+
+
+def _batch(n, months=360, seed=0):
+    rng = np.random.default_rng(seed)
+    params = dict(BASE_SCENARIO, months_live_in=months, months_rent_out=0)
+    params["home_price"] = rng.uniform(400000, 1500000, n)
+    params["rent_current"] = rng.uniform(2000, 6000, n)
+    return params
+
+
+@pytest.mark.parametrize("ledgers, dtype", [(False, np.float64), (True, np.float64), (True, np.float32)])
+def test_budgeted_chunks_stay_under_the_budget(ledgers, dtype):
+    budget = 8 * 2 ** 20
+    chunk_size = chunk_size_for_budget(budget, 360, ledgers, dtype)
+    params = _batch(3 * chunk_size + 7)
+
+    with MemoryProfiler() as profiler:
+        chunks = [(start, stop) for start, stop, _, _ in
+                  iter_batch_chunks(params, ledgers, 10 ** 6, dtype, memory_budget=budget, profiler=profiler)]
+    assert [stop - start for start, stop in chunks] == [chunk_size] * 3 + [7]
+    [simulation] = profiler.report()["stages"]
+    assert simulation["calls"] == 4
+    # The budget is not wildly loose either.
+    assert budget / 4 < simulation["peak_bytes"] <= budget
+
+
+def test_budgeted_batch_stays_under_the_budget():
+    budget = 64 * 2 ** 20
+    params = _batch(2000)
+    with MemoryProfiler() as profiler:
+        results = simulate_batch(params, ledgers=True, dtype=np.float32, memory_budget=budget, profiler=profiler)
+    assert profiler.report()["stages"][0]["calls"] > 1
+    assert profiler.peak_bytes <= budget
+    error = np.abs(results["buy_advantage"] - simulate_batch(params)["buy_advantage"])
+    assert np.all(error <= results["float32_error_bound"])
+
+    with pytest.raises(ValueError, match="use iter_batch_chunks"):
+        simulate_batch(params, ledgers=True, memory_budget="1MB")
+    with pytest.raises(ValueError, match="cannot fit one 360-month scenario"):
+        chunk_size_for_budget(1000, 360)
+
+
+@pytest.mark.parametrize("text, size", [
+    (4096, 4096), ("4096", 4096), ("512MB", 512 * 2 ** 20), ("2.5 GB", int(2.5 * 2 ** 30)),
+    (" 64k ", 64 * 2 ** 10), ("1T", 2 ** 40), ("10B", 10),
+])
+def test_parse_memory_size(text, size):
+    assert parse_memory_size(text) == size
+
+
+@pytest.mark.parametrize("text", ["", "MB", "12 PB", "1.2.3GB", "-5MB"])
+def test_unreadable_memory_sizes_are_rejected(text):
+    with pytest.raises(ValueError, match="Cannot parse memory size"):
+        parse_memory_size(text)
@@ -0,0 +1,85 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import parallel_runner
+from batch_simulation import PARAMETER_NAMES, simulate_batch
+from fuzz_harness import generate_scenarios
+from parallel_runner import map_chunks, simulate_batch_parallel
+
+# The shared-memory runner must return simulate_batch's arrays bit for
+# bit (same chunking), and must never leave shared blocks behind, even
+# when a chunk fails.
+
+
+def _columns(n, seed):
+    scenarios = generate_scenarios(n, seed=seed)
+    return {name: np.array([s[name] for _, s in scenarios], dtype=np.float64) for name in PARAMETER_NAMES}
+
+
+def _square(x):
+    return x * x
+
+
+def test_map_chunks_keeps_task_order():
+    assert map_chunks(_square, range(10), workers=3) == [x * x for x in range(10)]
+    assert map_chunks(_square, [], workers=3) == []
+
+
+@pytest.mark.parametrize("ledgers, dtype", [(False, np.float64), (True, np.float64), (True, np.float32)])
+def test_parallel_matches_simulate_batch_exactly(ledgers, dtype):
+    cols = _columns(60, seed=11)
+    status = []
+    result = simulate_batch_parallel(cols, workers=2, chunk_size=7, ledgers=ledgers, dtype=dtype, status=status)
+    expected = simulate_batch(cols, chunk_size=7, ledgers=ledgers, dtype=dtype)
+    assert set(result) == set(expected)
+    for name in expected:
+        assert result[name].dtype == expected[name].dtype, name
+        np.testing.assert_array_equal(result[name], expected[name], err_msg=name)
+    n = len(cols["home_price"])
+    assert [(start, stop) for start, stop, _, _ in status] == [(s, min(s + 7, n)) for s in range(0, n, 7)]
+
+
+def _record_blocks(monkeypatch):
+    names = []
+    shared_array = parallel_runner._shared_array
+
+    def recording(shape, dtype):
+        array, block = shared_array(shape, dtype)
+        names.append(block.name)
+        return array, block
+
+    monkeypatch.setattr(parallel_runner, "_shared_array", recording)
+    return names
+
+
+def _assert_unlinked(names):
+    assert names
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_blocks_are_unlinked_after_a_successful_run(monkeypatch):
+    names = _record_blocks(monkeypatch)
+    result = simulate_batch_parallel(_columns(20, seed=1), workers=2, chunk_size=5, ledgers=True)
+    _assert_unlinked(names)
+    # The returned arrays stay readable after the blocks are unlinked.
+    assert np.isfinite(result["buy_advantage"]).all()
+
+
+@pytest.mark.parametrize("chunk_size", [5, 100])
+def test_blocks_are_unlinked_after_a_failed_chunk(monkeypatch, chunk_size):
+    names = _record_blocks(monkeypatch)
+
+    def fail(cols, **kwargs):
+        raise RuntimeError("chunk failed")
+
+    # Worker processes are forked after the patch, so they fail too; one
+    # chunk runs in this process.
+    monkeypatch.setattr(parallel_runner, "simulate_chunk", fail)
+    with pytest.raises(RuntimeError, match="chunk failed"):
+        simulate_batch_parallel(_columns(20, seed=1), workers=2, chunk_size=chunk_size, ledgers=True)
+    _assert_unlinked(names)
+    assert parallel_runner._attached == {}
@@ -0,0 +1,136 @@
+import os
+
+import numpy as np
+import pytest
+from matplotlib.colors import TwoSlopeNorm
+from matplotlib.image import AxesImage, NonUniformImage, imread
+
+import plot_rendering
+from plot_rendering import decimate_series, render_comparison_plot, render_comparison_plots, render_sweep_heatmap
+
+# Decimation must keep every bucket's extremes within the point budget,
+# a reused figure must write exactly the file a fresh one would, and
+# heatmaps must draw uneven axes and center their colors on break-even.
+
+
+def _spiky(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.cumsum(rng.normal(0, 1, n))
+    y[n // 3] += 500
+    y[2 * n // 3] -= 500
+    return np.arange(n), y
+
+
+def test_short_series_are_unchanged():
+    x, y = _spiky(100)
+    for max_points in (100, 1000, 3):
+        kept_x, kept_y = decimate_series(x, y, max_points)
+        assert kept_x is x or np.array_equal(kept_x, x)
+        np.testing.assert_array_equal(kept_y, y)
+
+
+@pytest.mark.parametrize("n, max_points", [(10000, 1000), (1001, 1000), (360, 50), (12345, 7)])
+def test_decimation_keeps_bucket_extremes_within_budget(n, max_points):
+    x, y = _spiky(n)
+    kept_x, kept_y = decimate_series(x, y, max_points)
+    assert len(kept_x) <= max_points
+    assert np.all(np.diff(kept_x) > 0)
+    np.testing.assert_array_equal(kept_y, y[kept_x])
+
+    edges = np.linspace(0, n, max_points // 2 + 1).astype(np.int64)
+    for start, stop in zip(edges[:-1], edges[1:]):
+        inside = kept_y[(kept_x >= start) & (kept_x < stop)]
+        assert inside.min() == y[start:stop].min() and inside.max() == y[start:stop].max()
+    assert kept_y.max() == y.max() and kept_y.min() == y.min()
+
+
+def _series(months, seed):
+    rng = np.random.default_rng(seed)
+    return dict(monthly_rent_no_buy=rng.uniform(2000, 3000, months),
+                monthly_total_home_cost=rng.uniform(3000, 5000, months),
+                monthly_investment_contribution=rng.uniform(0, 1000, months),
+                monthly_equity=np.cumsum(rng.uniform(0, 2000, months)),
+                monthly_invest_rate=0.005)
+
+
+def _fresh_render(path, **kwargs):
+    plot_rendering._local.__dict__.pop("figure", None)
+    return render_comparison_plot(path, **kwargs)
+
+
+def test_reused_figure_writes_the_same_files_as_a_fresh_one(tmp_path):
+    first, second = _series(72, seed=1), _series(2000, seed=2)
+    render_comparison_plot(str(tmp_path / "a.png"), title="A", width=4, height=3, **first)
+    figure = plot_rendering._local.figure[1]
+    render_comparison_plot(str(tmp_path / "b.png"), title="B", width=4, height=3, **second)
+    assert plot_rendering._local.figure[1] is figure
+
+    _fresh_render(str(tmp_path / "b_fresh.png"), title="B", width=4, height=3, **second)
+    _fresh_render(str(tmp_path / "a_fresh.png"), title="A", width=4, height=3, **first)
+    np.testing.assert_array_equal(imread(tmp_path / "a.png"), imread(tmp_path / "a_fresh.png"))
+    np.testing.assert_array_equal(imread(tmp_path / "b.png"), imread(tmp_path / "b_fresh.png"))
+    assert not np.array_equal(imread(tmp_path / "a.png"), imread(tmp_path / "b.png"))
+
+
+def test_reused_figure_holds_only_the_latest_data(tmp_path):
+    render_comparison_plot(str(tmp_path / "long.png"), width=4, height=3, dpi=50, **_series(5000, seed=3))
+    render_comparison_plot(str(tmp_path / "short.png"), width=4, height=3, dpi=50, **_series(24, seed=4))
+    _, _, ax, lines = plot_rendering._local.figure
+    assert all(len(line.get_xdata()) == 24 for line in lines.values())
+    assert ax.get_xlim()[1] < 30
+    # The long series was decimated to the figure's width in pixels.
+    render_comparison_plot(str(tmp_path / "long.png"), width=4, height=3, dpi=50, **_series(5000, seed=3))
+    assert all(len(line.get_xdata()) <= 200 for line in lines.values())
+
+    # A different size gets its own figure.
+    render_comparison_plot(str(tmp_path / "wide.png"), width=6, height=3, dpi=50, **_series(24, seed=4))
+    assert plot_rendering._local.figure[2] is not ax
+
+
+def test_batch_rendering_writes_one_file_per_job(tmp_path):
+    jobs = [dict(_series(36, seed=i), name=f"chart_{i}", width=3, height=2, dpi=40) for i in range(3)]
+    paths = render_comparison_plots(jobs, str(tmp_path), fmt="png", processes=1)
+    assert sorted(os.listdir(tmp_path)) == ["chart_0.png", "chart_1.png", "chart_2.png"]
+    assert sorted(paths) == [str(tmp_path / f"chart_{i}.png") for i in range(3)]
+
+
+def _heatmap_figure(monkeypatch, tmp_path, y_values, x_values, grid):
+    figures = []
+
+    class RecordingFigure(plot_rendering.Figure):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            figures.append(self)
+
+    monkeypatch.setattr(plot_rendering, "Figure", RecordingFigure)
+    path = str(tmp_path / "heatmap.png")
+    assert render_sweep_heatmap(path, grid, "rate", y_values, "price", x_values, width=4, height=3, dpi=50) == path
+    assert imread(path).shape[:2] == (150, 200)
+    return figures[0].axes[0]
+
+
+def test_heatmap_with_an_uneven_axis_is_centered_on_zero(monkeypatch, tmp_path):
+    x_values = np.array([100000.0, 200000.0, 400000.0, 800000.0])
+    y_values = np.linspace(0.02, 0.08, 5)
+    grid = 50000.0 - x_values[None, :] * y_values[:, None] * 3
+    ax = _heatmap_figure(monkeypatch, tmp_path, y_values, x_values, grid)
+
+    [image] = ax.images
+    assert isinstance(image, NonUniformImage)
+    assert isinstance(image.norm, TwoSlopeNorm)
+    assert (image.norm.vmin, image.norm.vcenter, image.norm.vmax) == (grid.min(), 0.0, grid.max())
+    # Cells are centered on the sweep values.
+    assert ax.get_xlim() == (50000.0, 1000000.0)
+    assert len(ax.collections) == 1    # the break-even contour
+
+
+def test_heatmap_without_a_break_even_uses_a_plain_image(monkeypatch, tmp_path):
+    x_values = np.linspace(100000, 500000, 5)
+    y_values = np.linspace(0.02, 0.08, 4)
+    grid = 1000.0 + x_values[None, :] * y_values[:, None]
+    ax = _heatmap_figure(monkeypatch, tmp_path, y_values, x_values, grid)
+
+    [image] = ax.images
+    assert isinstance(image, AxesImage) and not isinstance(image, NonUniformImage)
+    assert not isinstance(image.norm, TwoSlopeNorm)
+    assert len(ax.collections) == 0
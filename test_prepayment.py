@@ -0,0 +1,102 @@
+import pytest
+
+from prepayment import PrepaymentStrategy, evaluate_prepayment_strategies
+from property_analysis import PropertyCosts
+
+# Prepayment strategies against a plain month-by-month amortization loop
+# and the closed-form total interest of the scheduled loan.
+
+LOAN = 400000.0
+RATE = 0.06
+
+
+def _costs(term_years=30):
+    return PropertyCosts(500000, 0.20, RATE, term_years, 0.0, 0.0, 0.0, 0.0)
+
+
+def _payment(balance, months):
+    r = RATE / 12
+    return balance * r / (1 - (1 + r) ** -months)
+
+
+def _loop(extra_monthly=0.0, lump_sums=None, biweekly=False, recast_months=(), months=360):
+    """Total interest, payoff month and final balance of one strategy."""
+    lump_sums = lump_sums or {}
+    balance, payment, total_interest, payoff = LOAN, _payment(LOAN, 360), 0.0, None
+    for month in range(1, months + 1):
+        interest = balance * RATE / 12
+        due = min(payment, balance + interest)
+        balance -= due - interest
+        wanted = extra_monthly + lump_sums.get(month, 0.0) + (payment / 12 if biweekly else 0.0)
+        balance -= min(max(wanted, 0.0), balance)
+        total_interest += interest
+        if balance <= 1e-6:
+            balance = 0.0
+            payoff = payoff or month
+        if month in recast_months and 360 - month > 0 and balance > 0:
+            payment = _payment(balance, 360 - month)
+    return total_interest, payoff, balance
+
+
+def _evaluate(*strategies, horizon_months=None):
+    rows = evaluate_prepayment_strategies(_costs(), list(strategies), 0.05, horizon_months)
+    return {row["strategy"]: row for row in rows}
+
+
+def test_no_prepayment_pays_the_scheduled_interest():
+    row = _evaluate(PrepaymentStrategy("none"))["none"]
+    assert row["total_interest"] == pytest.approx(360 * _payment(LOAN, 360) - LOAN)
+    assert row["interest_saved"] == 0 and row["total_prepaid"] == 0
+    assert row["payoff_month"] == 360 and row["remaining_balance"] == 0
+
+
+@pytest.mark.parametrize("strategy, loop_args", [
+    (PrepaymentStrategy("extra", extra_monthly=300), dict(extra_monthly=300)),
+    (PrepaymentStrategy("lump", lump_sums={12: 50000, 60: 25000}), dict(lump_sums={12: 50000, 60: 25000})),
+    (PrepaymentStrategy("biweekly", biweekly=True), dict(biweekly=True)),
+])
+def test_strategies_match_the_amortization_loop(strategy, loop_args):
+    baseline_interest, _, _ = _loop()
+    total_interest, payoff, balance = _loop(**loop_args)
+    row = _evaluate(strategy)[strategy.name]
+    assert row["total_interest"] == pytest.approx(total_interest, rel=1e-9)
+    assert row["interest_saved"] == pytest.approx(baseline_interest - total_interest, rel=1e-9)
+    assert row["payoff_month"] == payoff < 360
+    assert row["remaining_balance"] == balance == 0
+
+
+def test_lump_sums_are_counted_once():
+    row = _evaluate(PrepaymentStrategy("lump", lump_sums={1: 10000, 400: 10000}))["lump"]
+    assert row["total_prepaid"] == pytest.approx(10000)
+
+
+def test_recast_keeps_the_term_and_lowers_the_payment():
+    strategy = PrepaymentStrategy("recast", lump_sums={12: 100000}, recast_months=(12,))
+    total_interest, payoff, _ = _loop(lump_sums={12: 100000}, recast_months=(12,))
+    row = _evaluate(strategy)["recast"]
+    assert row["payoff_month"] == payoff == 360
+    assert row["total_interest"] == pytest.approx(total_interest, rel=1e-9)
+    assert row["interest_saved"] > 0
+
+
+def test_biweekly_extra_follows_the_recast_payment():
+    strategy = PrepaymentStrategy("biweekly recast", lump_sums={24: 150000}, biweekly=True, recast_months=(24,))
+    loop_args = dict(lump_sums={24: 150000}, biweekly=True, recast_months=(24,))
+    total_interest, payoff, _ = _loop(**loop_args)
+    row = _evaluate(strategy)["biweekly recast"]
+    assert row["total_interest"] == pytest.approx(total_interest, rel=1e-9)
+    assert row["payoff_month"] == payoff
+
+
+def test_zero_horizon_is_not_the_full_term():
+    row = _evaluate(PrepaymentStrategy("extra", extra_monthly=300), horizon_months=0)["extra"]
+    assert row["total_interest"] == row["total_prepaid"] == row["benefit_vs_investing"] == 0
+    assert row["remaining_balance"] == LOAN and row["payoff_month"] is None
+
+
+def test_short_horizon_leaves_a_balance():
+    total_interest, _, balance = _loop(extra_monthly=300, months=60)
+    row = _evaluate(PrepaymentStrategy("extra", extra_monthly=300), horizon_months=60)["extra"]
+    assert row["total_interest"] == pytest.approx(total_interest, rel=1e-9)
+    assert row["remaining_balance"] == pytest.approx(balance, rel=1e-9)
+    assert row["total_prepaid"] == pytest.approx(60 * 300)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from fuzz_harness import BASE_SCENARIO
+from response_surface import ResponseSurface, build_surface
+
+# A small stored surface: inside the grid its answers must be within
+# their error estimate of the engine, and any query it cannot answer
+# (off the grid, a changed fixed input, too large an error) must come
+# from the engine.
+
+AXES = {"home_price": np.linspace(600000, 1200000, 9), "mortgage_rate_annual": np.linspace(0.04, 0.08, 9)}
+
+
+@pytest.fixture(scope="module")
+def surface(tmp_path_factory):
+    return build_surface(BASE_SCENARIO, AXES, str(tmp_path_factory.mktemp("surface") / "surface"), chunk_size=10)
+
+
+def _points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"home_price": float(price), "mortgage_rate_annual": float(rate)}
+            for price, rate in zip(rng.uniform(600000, 1200000, n), rng.uniform(0.04, 0.08, n))]
+
+
+def test_nodes_hold_the_engine_values(surface):
+    point = {"home_price": float(AXES["home_price"][3]), "mortgage_rate_annual": float(AXES["mortgage_rate_annual"][5])}
+    value, error = surface.query(point)
+    assert value == float(np.float32(surface.exact(point)))
+    # Only the float32 rounding is left at a node.
+    assert 0 < error < 1e-6 * abs(value)
+
+
+def test_in_grid_answers_are_within_their_error_estimate(surface):
+    for point in _points(200):
+        answer = surface.answer(point, tolerance=np.inf)
+        assert answer["source"] == "surface"
+        assert abs(answer["value"] - surface.exact(point)) <= answer["error_estimate"], point
+
+
+def test_loaded_surface_answers_the_same(surface, tmp_path):
+    build_surface(BASE_SCENARIO, AXES, str(tmp_path / "again"))
+    loaded = ResponseSurface.load(str(tmp_path / "again"))
+    for point in _points(10, seed=1):
+        assert loaded.query(point) == surface.query(point)
+
+
+@pytest.mark.parametrize("point", [
+    {"home_price": 500000.0, "mortgage_rate_annual": 0.05},      # below the price axis
+    {"home_price": 800000.0, "mortgage_rate_annual": 0.09},      # above the rate axis
+    {"home_price": 800000.0},                                      # an axis left out
+    {"home_price": 800000.0, "mortgage_rate_annual": 0.05, "hoa_monthly": 400.0},   # changes a fixed input
+    {"home_price": 800000.0, "mortgage_rate_annual": 0.05, "not_an_input": 1.0},
+])
+def test_queries_the_surface_cannot_answer_use_the_engine(surface, point):
+    assert not surface.covers(point)
+    if "not_an_input" in point:
+        return
+    answer = surface.answer(point)
+    assert answer == {"value": surface.exact(point), "error_estimate": 0.0, "source": "engine"}
+
+
+def test_fixed_inputs_at_their_stored_value_still_use_the_surface(surface):
+    point = {"home_price": 800000.0, "mortgage_rate_annual": 0.05, "hoa_monthly": BASE_SCENARIO["hoa_monthly"]}
+    assert surface.answer(point, tolerance=np.inf)["source"] == "surface"
+
+
+def test_large_error_estimates_fall_back_to_the_engine(surface):
+    point = _points(1, seed=2)[0]
+    _, error = surface.query(point)
+    assert surface.answer(point, tolerance=error * 1.01)["source"] == "surface"
+    answer = surface.answer(point, tolerance=error * 0.99)
+    assert answer["source"] == "engine" and answer["value"] == surface.exact(point)
+
+
+def test_axes_are_checked():
+    with pytest.raises(ValueError, match="at least 3 strictly increasing"):
+        build_surface(BASE_SCENARIO, {"home_price": [1e5, 2e5]}, "unused")
+    with pytest.raises(ValueError, match="Unknown parameter"):
+        build_surface(BASE_SCENARIO, {"price": [1e5, 2e5, 3e5]}, "unused")
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from batch_simulation import LEDGER_FIELDS, PARAMETER_NAMES, SUMMARY_FIELDS, grid_params, simulate_batch
+from fuzz_harness import BASE_SCENARIO
+from results_store import INDEXED_COLUMNS, ResultsStore
+from scenario import row_hashes
+
+# A results database in a temporary directory: bulk loads store every
+# scenario exactly, indexes appear only once the load is done, queries
+# filter and order in SQL, and only known column names reach the SQL.
+
+SWEEP = {"home_price": [500000.0, 700000.0, 900000.0], "mortgage_rate_annual": [0.04, 0.05, 0.06, 0.07],
+         "months_live_in": [12.0, 36.0]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / "results.sqlite3")) as store:
+        yield store
+
+
+def _indexes(store):
+    return {name for (name,) in store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' "
+                                                     "AND name LIKE 'results_by_%'")}
+
+
+def test_ingest_stores_every_scenario(store):
+    cols = grid_params(BASE_SCENARIO, SWEEP)
+    # Small transactions so the load commits several times.
+    run_id = store.ingest(cols, label="grid", chunk_size=5, rows_per_transaction=7)
+    expected = simulate_batch(cols, chunk_size=5)
+
+    assert store.runs()[0][0::3] == (run_id, 24) and store.runs()[0][1] == "grid"
+    rows = store.query(run_id=run_id, order_by="row")
+    np.testing.assert_array_equal(rows["row"], np.arange(24))
+    for name in PARAMETER_NAMES:
+        np.testing.assert_array_equal(rows[name], np.broadcast_to(cols[name], (24,)), err_msg=name)
+    for name in SUMMARY_FIELDS:
+        np.testing.assert_array_equal(rows[name], expected[name], err_msg=name)
+    np.testing.assert_array_equal(rows["scenario_hash"], row_hashes(cols))
+
+
+def test_ingest_sweep_matches_ingest(store):
+    first = store.ingest(grid_params(BASE_SCENARIO, SWEEP), chunk_size=4)
+    second = store.ingest_sweep(BASE_SCENARIO, SWEEP, chunk_size=4)
+    a, b = store.query(run_id=first, order_by="row"), store.query(run_id=second, order_by="row")
+    for name in ("scenario_hash", "buy_advantage"):
+        np.testing.assert_array_equal(a[name], b[name])
+
+
+def test_indexes_are_built_after_the_load(store, monkeypatch):
+    seen = []
+    add_rows = ResultsStore.add_rows
+
+    def recording_add_rows(self, *args, **kwargs):
+        seen.append(_indexes(self))
+        return add_rows(self, *args, **kwargs)
+
+    monkeypatch.setattr(ResultsStore, "add_rows", recording_add_rows)
+    store.ingest(grid_params(BASE_SCENARIO, SWEEP), chunk_size=6)
+    assert len(seen) == 4 and all(not indexes for indexes in seen)
+    assert _indexes(store) == {"results_by_run"} | {f"results_by_{name}" for name in INDEXED_COLUMNS}
+
+    # A second run reuses the existing indexes.
+    store.ingest(grid_params(BASE_SCENARIO, SWEEP), chunk_size=6)
+    assert seen[-1] == _indexes(store)
+
+
+def test_queries_filter_order_and_count(store):
+    run_id = store.ingest(grid_params(BASE_SCENARIO, SWEEP))
+    everything = store.query()
+    wanted = (everything["buy_advantage"] > 0) & (everything["mortgage_rate_annual"] < 0.06)
+
+    rows = store.query("buy_advantage > ? AND mortgage_rate_annual < ?", (0, 0.06),
+                       columns=["buy_advantage"], order_by="buy_advantage DESC")
+    assert set(rows) == {"run_id", "row", "scenario_hash", "buy_advantage"}
+    np.testing.assert_array_equal(rows["buy_advantage"], np.sort(everything["buy_advantage"][wanted])[::-1])
+    assert store.count("buy_advantage > ? AND mortgage_rate_annual < ?", (0, 0.06)) == wanted.sum()
+    assert store.count(run_id=run_id) == 24 and store.count(run_id=run_id + 1) == 0
+
+    top = store.query(columns=["home_price"], order_by="buy_advantage DESC", limit=3)
+    best = np.argsort(-everything["buy_advantage"], kind="stable")[:3]
+    assert top["row"].tolist() == everything["row"][best].tolist()
+    np.testing.assert_array_equal(top["home_price"], everything["home_price"][best])
+    assert len(store.query("home_price < 0")["row"]) == 0
+
+
+@pytest.mark.parametrize("columns, order_by", [
+    (["buy_advantage", "home_price; DROP TABLE results"], None),
+    (["not_a_column"], None),
+    (None, "buy_advantage; DROP TABLE results"),
+    (None, "(SELECT 1)"),
+])
+def test_unknown_column_names_are_rejected(store, columns, order_by):
+    store.ingest(grid_params(BASE_SCENARIO, SWEEP))
+    with pytest.raises(ValueError, match="Unknown result column"):
+        store.query(columns=columns, order_by=order_by)
+    assert store.count() == 24
+
+
+def test_ledgers_are_stored_per_scenario(store):
+    cols = grid_params(BASE_SCENARIO, SWEEP)
+    run_id = store.ingest(cols, ledgers=True, chunk_size=5, bytes_per_transaction=10000)
+    expected = simulate_batch(cols, ledgers=True, chunk_size=5)
+    for row in (0, 1, 23):
+        ledgers = store.ledgers(run_id, row)
+        months = int(cols["months_live_in"][row] + BASE_SCENARIO["months_rent_out"])
+        assert set(ledgers) == set(LEDGER_FIELDS)
+        for name in LEDGER_FIELDS:
+            np.testing.assert_array_equal(ledgers[name], expected[name][row, :months], err_msg=name)
+    assert store.ledgers(run_id, 24) is None
+    assert store.ledgers(store.ingest(cols), 0) is None
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from rollups import period_firsts, period_lasts, period_sums
+
+# period_sums, period_firsts and period_lasts must describe the same
+# periods for any offset: the first value of each period is its first
+# month, the last value its last month.
+
+
+@pytest.mark.parametrize("offset", range(12))
+@pytest.mark.parametrize("num_months", [1, 11, 12, 13, 24, 37])
+def test_period_rollups_line_up(num_months, offset):
+    series = np.arange(1, num_months + 1, dtype=np.float64)
+    sums = period_sums(series, offset=offset)
+    firsts = period_firsts(series, offset=offset)
+    lasts = period_lasts(series, offset=offset)
+    assert len(sums) == len(firsts) == len(lasts)
+    # Months are consecutive integers, so each period sums to
+    # (first + last) * count / 2.
+    np.testing.assert_array_equal(sums, (firsts + lasts) * (lasts - firsts + 1) / 2)
+
+
+def test_period_firsts_keeps_the_partial_first_period():
+    series = np.arange(1, 25)
+    np.testing.assert_array_equal(period_firsts(series, offset=3), [1, 10, 22])
+    np.testing.assert_array_equal(period_firsts(series[None, :], offset=3), [[1, 10, 22]])
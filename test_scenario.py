@@ -0,0 +1,105 @@
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from batch_simulation import PARAMETER_NAMES, broadcast_params
+from fuzz_harness import BASE_SCENARIO, generate_scenarios
+from scenario import Scenario, ScenarioBatch
+
+# Scenario records: hashes that never change between runs, duplicates
+# dropped only when every input matches, lossless conversion between
+# rows, columns and pickles, and whole-column validation at scale.
+
+# BASE_SCENARIO's canonical hash. Cached results on disk are keyed by it,
+# so it must only ever change together with a cache format version.
+BASE_HASH = 3264403203181915676
+
+
+def _batch(**columns):
+    return ScenarioBatch(dict(BASE_SCENARIO, **columns))
+
+
+def test_hash_is_stable_across_runs_and_processes():
+    assert Scenario(**BASE_SCENARIO).canonical_hash() == BASE_HASH
+    assert Scenario(**BASE_SCENARIO).key() == f"{BASE_HASH:016x}"
+    code = ("from fuzz_harness import BASE_SCENARIO; from scenario import Scenario; "
+            "print(Scenario(**BASE_SCENARIO).canonical_hash())")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert int(output) == BASE_HASH
+
+
+def test_row_hashes_match_scenario_hashes():
+    batch = ScenarioBatch.from_rows([scenario for _, scenario in generate_scenarios(50, seed=3)])
+    assert [int(h) for h in batch.hashes()] == [scenario.canonical_hash() for scenario in batch]
+    # -0.0 and 0.0 are the same input.
+    assert _batch(hoa_monthly=-0.0).hashes()[0] == _batch(hoa_monthly=0.0).hashes()[0]
+    assert _batch(hoa_monthly=1e-300).hashes()[0] != _batch(hoa_monthly=0.0).hashes()[0]
+
+
+def test_unique_keeps_first_seen_order():
+    batch = _batch(home_price=np.array([3, 1, 3, 2, 1, 3]) * 1e5)
+    distinct, inverse = batch.unique()
+    np.testing.assert_array_equal(distinct.columns["home_price"], [3e5, 1e5, 2e5])
+    np.testing.assert_array_equal(inverse, [0, 1, 0, 2, 1, 0])
+    np.testing.assert_array_equal(distinct.columns["home_price"][inverse], batch.columns["home_price"])
+
+
+def test_unique_does_not_merge_scenarios_on_a_hash_collision(monkeypatch):
+    batch = _batch(home_price=np.array([3, 1, 3, 2, 1, 3]) * 1e5, hoa_monthly=np.array([0, 0, 0, 0, 0, -0.0]))
+    monkeypatch.setattr(ScenarioBatch, "hashes", lambda self: np.zeros(len(self), dtype=np.uint64))
+    distinct, inverse = batch.unique()
+    np.testing.assert_array_equal(distinct.columns["home_price"], [3e5, 1e5, 2e5])
+    np.testing.assert_array_equal(inverse, [0, 1, 0, 2, 1, 0])
+
+
+def test_unique_of_an_empty_batch():
+    distinct, inverse = _batch()[np.arange(0)].unique()
+    assert len(distinct) == 0 and len(inverse) == 0
+
+
+def test_round_trips():
+    rows = [scenario for _, scenario in generate_scenarios(40, seed=5)]
+    batch = ScenarioBatch.from_rows(rows)
+    columns = broadcast_params(batch.columns)
+    assert ScenarioBatch(columns).columns.keys() == set(PARAMETER_NAMES)
+    for name in PARAMETER_NAMES:
+        np.testing.assert_array_equal(ScenarioBatch(columns).columns[name], batch.columns[name])
+
+    scenarios = list(batch)
+    assert scenarios == [Scenario.from_dict(row) for row in rows]
+    assert ScenarioBatch.from_rows(scenarios).hashes().tolist() == batch.hashes().tolist()
+    assert pickle.loads(pickle.dumps(scenarios)) == scenarios
+    restored = pickle.loads(pickle.dumps(scenarios[0]))
+    assert restored.canonical_hash() == scenarios[0].canonical_hash()
+
+    # Scalars broadcast to the batch length, and a slice keeps its rows.
+    batch = _batch(home_price=[4e5, 5e5, 6e5])
+    assert batch.columns["tax_rate"].shape == (3,)
+    assert batch[1:].columns["home_price"].tolist() == [5e5, 6e5]
+    assert batch[2] == Scenario(**dict(BASE_SCENARIO, home_price=6e5))
+
+
+def test_scenarios_are_immutable_and_validated():
+    scenario = Scenario(**BASE_SCENARIO)
+    with pytest.raises(AttributeError):
+        scenario.home_price = 1.0
+    assert scenario.replace(home_price=1e6).home_price == 1e6
+    with pytest.raises(ValueError, match="months_live_in must be a whole number"):
+        scenario.replace(months_live_in=1.5)
+
+
+def test_construction_at_scale():
+    n = 300000
+    prices = np.linspace(1e5, 2e6, n)
+    batch = _batch(home_price=prices, months_live_in=np.arange(n) % 120)
+    assert len(batch) == n
+    distinct, inverse = batch.unique()
+    assert len(distinct) == n and np.array_equal(inverse, np.arange(n))
+
+    rates = np.full(n, 0.05)
+    rates[[n - 1, 7]] = -0.01
+    with pytest.raises(ValueError, match=r"mortgage_rate_annual must not be negative \(row 7: -0.01; 2 rows invalid\)"):
+        _batch(home_price=prices, mortgage_rate_annual=rates)
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import scenario_engine
+from batch_simulation import PARAMETER_NAMES, simulate_batch, LEDGER_FIELDS, SUMMARY_FIELDS
+from fuzz_harness import BASE_SCENARIO, generate_scenarios
+from reference_engine import reference_scenario
+from scenario_engine import ThreadedEngine, compute_scenario
+
+# The threaded engine must give simulate_batch's results (bit for bit
+# with the same chunking) for any batch, including an empty one, and any
+# number of concurrent requests, and compute_scenario must be the reference loop plus the display values.
+
+
+def _columns(scenarios):
+    return {name: np.array([s[name] for _, s in scenarios], dtype=np.float64) for name in PARAMETER_NAMES}
+
+
+def test_evaluate_and_submit_match_simulate_batch():
+    cols = _columns(generate_scenarios(100, seed=2))
+    expected = simulate_batch(cols, ledgers=True, chunk_size=7)
+    with ThreadedEngine(workers=3, chunk_size=7) as engine:
+        for result in (engine.evaluate(cols, ledgers=True), engine.submit(cols, ledgers=True).result()):
+            for name in SUMMARY_FIELDS + LEDGER_FIELDS:
+                np.testing.assert_array_equal(result[name], expected[name], err_msg=name)
+
+
+def test_concurrent_requests_share_one_engine():
+    batches = [_columns(generate_scenarios(30, seed=seed)) for seed in range(8)]
+    with ThreadedEngine(workers=2, chunk_size=5) as engine, ThreadPoolExecutor(4) as clients:
+        results = list(clients.map(lambda cols: engine.submit(cols).result(), batches))
+    for cols, result in zip(batches, results):
+        np.testing.assert_array_equal(result["buy_advantage"], simulate_batch(cols, chunk_size=5)["buy_advantage"])
+
+
+@pytest.mark.parametrize("ledgers", [False, True])
+def test_empty_batch(ledgers):
+    params = dict(BASE_SCENARIO, home_price=np.empty(0))
+    with ThreadedEngine(workers=2) as engine:
+        for result in (engine.evaluate(params, ledgers), engine.submit(params, ledgers).result()):
+            assert all(result[name].shape == (0,) for name in SUMMARY_FIELDS)
+            if ledgers:
+                assert all(result[name].shape == (0, 0) for name in LEDGER_FIELDS)
+
+
+def test_chunk_errors_reach_the_future(monkeypatch):
+    def fail(cols, ledgers):
+        raise RuntimeError("chunk failed")
+
+    monkeypatch.setattr(scenario_engine, "_evaluate_chunk", fail)
+    with ThreadedEngine(workers=2, chunk_size=2) as engine:
+        future = engine.submit(dict(BASE_SCENARIO, home_price=np.full(5, 400000.0)))
+        with pytest.raises(RuntimeError, match="chunk failed"):
+            future.result(timeout=10)
+
+
+def test_compute_scenario_is_the_reference_plus_display_values():
+    for _, scenario in generate_scenarios(20, seed=4):
+        result = compute_scenario(**scenario)
+        reference = reference_scenario(**scenario)
+        for name in SUMMARY_FIELDS:
+            assert result[name] == reference[name]
+        assert result["monthly_savings_rent"] == 0
+    with ThreadedEngine(workers=1) as engine:
+        result = engine.scenario(BASE_SCENARIO).result()
+    # Living in to the end: rent avoided minus the month's home cost.
+    live_in_only = compute_scenario(**dict(BASE_SCENARIO, months_rent_out=0))
+    assert live_in_only["monthly_savings_buy"] == pytest.approx(
+        live_in_only["monthly_rent_if_no_buy"][-1] - live_in_only["property_costs"].get_monthly_costs())
+    assert result["buy_advantage"] == compute_scenario(**BASE_SCENARIO)["buy_advantage"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from fuzz_harness import BASE_SCENARIO
+from stochastic_economy import (EconomyModel, STREAM_PATHS, chunk_rng, generate_paths, iter_path_chunks,
+                                simulate_monte_carlo)
+
+# Monte Carlo draws must not depend on how a run is chunked or spread over
+# workers, and the factor shocks must carry the requested correlation.
+
+PARAMS = dict(BASE_SCENARIO, months_live_in=24, months_rent_out=12)
+
+
+def test_paths_do_not_depend_on_the_chunk_size():
+    model = EconomyModel(rate_reset_months=12)
+    whole = generate_paths(model, 0, 1000, 36, seed=5)
+    assert whole.shape == (1000, 36, 4)
+    for chunk_size in (1, 100, STREAM_PATHS, 300, 1000, 4096):
+        chunks = [paths for _, paths in iter_path_chunks(model, 1000, 36, chunk_size, seed=5)]
+        np.testing.assert_array_equal(np.concatenate(chunks), whole, err_msg=str(chunk_size))
+    np.testing.assert_array_equal(generate_paths(model, 250, 530, 36, seed=5), whole[250:530])
+
+
+def test_blocks_draw_from_their_own_spawn_keys():
+    model = EconomyModel()
+    paths = generate_paths(model, 0, 2 * STREAM_PATHS, 12, seed=7)
+    for block in range(2):
+        expected = model.generate(STREAM_PATHS, 12, chunk_rng(7, block))
+        np.testing.assert_array_equal(paths[block * STREAM_PATHS:(block + 1) * STREAM_PATHS], expected)
+    # Different blocks and different seeds share no draws.
+    assert not np.array_equal(paths[:STREAM_PATHS], paths[STREAM_PATHS:])
+    assert not np.array_equal(generate_paths(model, 0, 10, 12, seed=8), paths[:10])
+
+
+def test_summary_does_not_depend_on_chunk_size_or_workers():
+    model = EconomyModel()
+    reference = simulate_monte_carlo(PARAMS, model, 1500, seed=3, chunk_size=512, workers=1)
+    for chunk_size, workers in ((512, 2), (100, 1), (100, 3), (2048, 1)):
+        result = simulate_monte_carlo(PARAMS, model, 1500, seed=3, chunk_size=chunk_size, workers=workers)
+        assert result.sketch.to_state() == reference.sketch.to_state()
+        assert result.buy_wins == reference.buy_wins and result.count == 1500
+        assert result.moments.mean == pytest.approx(reference.moments.mean, rel=1e-12)
+        assert result.moments.std == pytest.approx(reference.moments.std, rel=1e-9)
+    # With the same chunking the worker count changes nothing at all.
+    assert simulate_monte_carlo(PARAMS, model, 1500, seed=3, chunk_size=512, workers=2).to_state() == \
+        reference.to_state()
+    assert simulate_monte_carlo(PARAMS, model, 1500, seed=4, chunk_size=512, workers=1).summary() != \
+        reference.summary()
+
+
+def test_shocks_have_the_requested_correlation():
+    correlation = np.array([
+        [1.0, -0.6, 0.2, -0.3],
+        [-0.6, 1.0, 0.4, 0.5],
+        [0.2, 0.4, 1.0, 0.0],
+        [-0.3, 0.5, 0.0, 1.0],
+    ])
+    # Monthly resets without mean reversion or a floor make the rate
+    # column a random walk, so its increments are the rate shocks.
+    model = EconomyModel(correlation=correlation, rate_reset_months=1, rate_floor=-np.inf)
+    paths = generate_paths(model, 0, 4000, 61, seed=11)
+    shocks = np.stack([np.diff(paths[:, :, 0], axis=1)] +
+                      [paths[:, 1:, i] for i in range(1, 4)], axis=-1).reshape(-1, 4)
+    np.testing.assert_allclose(np.corrcoef(shocks, rowvar=False), correlation, atol=0.01)
+
+    annual_vols = shocks.std(axis=0) * np.sqrt(12)
+    np.testing.assert_allclose(annual_vols, model.vols, rtol=0.01)
+
+
+def test_invalid_correlations_are_rejected():
+    with pytest.raises(ValueError, match="positive definite"):
+        EconomyModel(correlation=[[1, 0.9, 0.9, 0], [0.9, 1, -0.9, 0], [0.9, -0.9, 1, 0], [0, 0, 0, 1]])
+    with pytest.raises(ValueError, match="symmetric"):
+        EconomyModel(correlation=np.eye(4) + np.triu(np.full((4, 4), 0.1), 1))
+    with pytest.raises(ValueError, match="4x4"):
+        EconomyModel(correlation=np.eye(3))
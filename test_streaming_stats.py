@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pytest
+
+from streaming_stats import NetPositionAggregator, OnlineMoments, QuantileSketch
+
+# The streaming summaries against numpy on the full data: quantiles within
+# the sketch's documented error, merged partials equal to a single pass,
+# NaNs ignored, and state that survives a JSON round trip.
+
+QUANTILES = (0.0, 0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99, 1.0)
+
+
+def _values(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Both signs, a few exact zeros and a wide dynamic range.
+    values = rng.normal(20000, 150000, n) * rng.lognormal(0, 1, n)
+    values[::997] = 0.0
+    return values
+
+
+def _chunks(values, sizes):
+    start = 0
+    for size in sizes:
+        yield values[start:start + size]
+        start += size
+
+
+def _assert_quantiles_within(sketch, values):
+    for q in QUANTILES:
+        true = np.quantile(values, q, method="lower")
+        allowed = sketch.relative_accuracy * abs(true) + sketch.min_value
+        assert abs(sketch.quantile(q) - true) <= allowed * (1 + 1e-12), q
+
+
+def test_quantiles_are_within_the_relative_accuracy():
+    values = _values()
+    for accuracy in (0.01, 0.005, 0.001):
+        sketch = QuantileSketch(relative_accuracy=accuracy)
+        sketch.update(values)
+        assert sketch.collapse_limits() == (None, None)
+        _assert_quantiles_within(sketch, values)
+
+
+def test_collapsed_buckets_keep_the_guarantee_above_the_limit():
+    values = np.abs(_values()) + 1.0
+    sketch = QuantileSketch(relative_accuracy=0.01, max_buckets=200)
+    sketch.update(values)
+    _, limit = sketch.collapse_limits()
+    assert limit is not None and len(sketch.positive) == 200
+    for q in QUANTILES:
+        true = np.quantile(values, q, method="lower")
+        estimate = sketch.quantile(q)
+        if true > limit:
+            assert abs(estimate - true) <= 0.01 * true * (1 + 1e-12)
+        else:
+            assert sketch.min_value <= estimate <= limit
+
+
+@pytest.mark.parametrize("max_buckets", [4096, 150])
+def test_merged_partials_equal_a_single_pass(max_buckets):
+    values = _values()
+    single = QuantileSketch(max_buckets=max_buckets)
+    single.update(values)
+
+    merged = QuantileSketch(max_buckets=max_buckets)
+    for chunk in _chunks(values, [7000, 1, 3999, 9000]):
+        partial = QuantileSketch(max_buckets=max_buckets)
+        partial.update(chunk)
+        merged.merge(partial)
+    assert merged.to_state() == single.to_state()
+
+
+def test_moments_merge_matches_numpy():
+    values = _values()
+    moments = OnlineMoments()
+    for chunk in _chunks(values, [5000, 5000, 10000]):
+        partial = OnlineMoments()
+        partial.update(chunk)
+        moments.merge(partial)
+    assert moments.count == len(values)
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert moments.std == pytest.approx(values.std(), rel=1e-12)
+
+
+def test_nans_are_skipped_everywhere():
+    values = _values(2000)
+    with_nans = np.insert(values, [0, 500, 2000], np.nan)
+    clean, dirty = NetPositionAggregator(), NetPositionAggregator()
+    clean.update(values)
+    dirty.update(with_nans)
+    assert dirty.summary() == clean.summary()
+    assert dirty.count == 2000
+
+    empty = NetPositionAggregator()
+    empty.update(np.full(3, np.nan))
+    assert empty.count == 0 and np.isnan(empty.summary()["p50"])
+
+
+def test_state_round_trips_through_json():
+    aggregator = NetPositionAggregator(shortfall_level=0.10)
+    aggregator.update({"buy_advantage": _values(5000)})
+    restored = NetPositionAggregator.from_state(json.loads(json.dumps(aggregator.to_state())))
+    assert restored.summary() == aggregator.summary()
+    assert restored.to_state() == aggregator.to_state()
+
+    # A restored aggregate keeps accumulating like the original.
+    more = _values(3000, seed=1)
+    aggregator.update(more)
+    restored.update(more)
+    assert restored.to_state() == aggregator.to_state()
+
+
+def test_summary_matches_numpy():
+    values = _values()
+    aggregator = NetPositionAggregator()
+    aggregator.update(values)
+    summary = aggregator.summary()
+    assert summary["paths"] == len(values)
+    assert summary["prob_buy_wins"] == pytest.approx((values > 0).mean())
+    worst = np.sort(values)[:int(0.05 * len(values))]
+    assert summary["expected_shortfall"] == pytest.approx(worst.mean(), rel=0.005)
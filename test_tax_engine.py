@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from fuzz_harness import BASE_SCENARIO
+from tax_engine import TaxRules, annual_taxes
+
+# Each rule of the annual tax model checked on scenarios small enough to
+# work out by hand (or with a plain month loop).
+
+
+def _scenario(**overrides):
+    return dict(BASE_SCENARIO, **overrides)
+
+
+def _taxes(rules, **overrides):
+    return {name: values[0] for name, values in annual_taxes(_scenario(**overrides), rules).items()}
+
+
+def _owner_only(**overrides):
+    # No mortgage, lived in for one year: property tax is the only deduction.
+    return dict(dict(down_payment_pct=1.0, months_live_in=12, months_rent_out=0), **overrides)
+
+
+def test_salt_cap_limits_property_tax_and_is_shared_with_other_salt():
+    rules = TaxRules(standard_deduction=0.0, salt_cap=10000.0)
+    taxes = _taxes(rules, **_owner_only(home_price=1e6, property_tax_rate_annual=0.02))
+    assert taxes["deduction_savings"][0] == pytest.approx(0.30 * 10000)
+
+    rules = TaxRules(standard_deduction=0.0, salt_cap=10000.0, other_salt=4000.0)
+    taxes = _taxes(rules, **_owner_only(home_price=1e6, property_tax_rate_annual=0.02))
+    # The renter deducts the 4,000 of other SALT too; owning adds 6,000 under the cap.
+    assert taxes["deduction_savings"][0] == pytest.approx(0.30 * 6000)
+
+
+def test_only_itemizing_above_the_standard_deduction_saves_tax():
+    scenario = _owner_only(home_price=800000, property_tax_rate_annual=0.01)
+    assert _taxes(TaxRules(standard_deduction=29200.0), **scenario)["deduction_savings"][0] == 0
+
+    rules = TaxRules(standard_deduction=29200.0, other_itemized=25000.0)
+    taxes = _taxes(rules, **scenario)
+    # Owner itemizes 25,000 + 8,000; the renter takes the standard deduction.
+    assert taxes["deduction_savings"][0] == pytest.approx(0.30 * (33000 - 29200))
+
+
+def _first_year_interest(loan, rate, term_years):
+    payment = loan * (rate / 12) / (1 - (1 + rate / 12) ** (-12 * term_years))
+    balance, interest = loan, 0.0
+    for _ in range(12):
+        interest += balance * rate / 12
+        balance -= payment - balance * rate / 12
+    return interest, (loan + balance) / 2
+
+
+@pytest.mark.parametrize("limit", [750000.0, 1e12])
+def test_mortgage_interest_is_limited_to_the_debt_limit_share(limit):
+    rules = TaxRules(standard_deduction=0.0, mortgage_debt_limit=limit)
+    scenario = dict(home_price=2e6, down_payment_pct=0.25, property_tax_rate_annual=0.0,
+                    months_live_in=12, months_rent_out=0)
+    interest, average_balance = _first_year_interest(1.5e6, 0.06, 30)
+    share = min(1.0, limit / average_balance)
+    assert _taxes(rules, **scenario)["deduction_savings"][0] == pytest.approx(0.30 * interest * share, rel=1e-9)
+
+
+def _rental_scenario(**overrides):
+    # Rented out from the first month, so every year has rental income.
+    return dict(dict(months_live_in=0, months_rent_out=72, rent_collected_home=3000), **overrides)
+
+
+def test_passive_losses_beyond_the_allowance_are_released_on_sale():
+    scenario = _rental_scenario(rent_growth_annual=0.0)
+    unlimited = _taxes(TaxRules(passive_loss_allowance=1e12), **scenario)
+    assert np.all(unlimited["rental_tax"] < 0) and unlimited["loss_release_savings"] == 0
+
+    allowance = 1000.0
+    limited = _taxes(TaxRules(passive_loss_allowance=allowance), **scenario)
+    np.testing.assert_allclose(limited["rental_tax"], -0.30 * allowance)
+    # Every loss is deducted in the end: by the allowance each year, the rest at the sale.
+    assert limited["loss_release_savings"] - limited["total_rental_tax"] == pytest.approx(
+        -unlimited["total_rental_tax"])
+
+
+def test_carried_losses_offset_later_rental_income():
+    # Fast rent growth turns early losses into later profits.
+    scenario = _rental_scenario(rent_growth_annual=0.35, months_rent_out=120)
+    rules = TaxRules(passive_loss_allowance=2000.0)
+    net = _taxes(TaxRules(passive_loss_allowance=1e12), **scenario)["rental_tax"] / 0.30
+    assert net[0] < -rules.passive_loss_allowance and net[-1] > 0
+
+    carry, expected = 0.0, []
+    for year_net in net:
+        expected.append(0.30 * max(year_net - carry, -rules.passive_loss_allowance))
+        carry = max(0.0, carry - year_net - rules.passive_loss_allowance)
+    taxes = _taxes(rules, **scenario)
+    np.testing.assert_allclose(taxes["rental_tax"], expected, rtol=1e-9, atol=1e-6)
+    assert taxes["loss_release_savings"] == pytest.approx(0.30 * carry, abs=1e-6)
+
+
+def test_depreciation_is_recaptured_on_a_gain():
+    rules = TaxRules()
+    scenario = _rental_scenario(tax_rate=0.35, home_appreciation_annual=0.05)
+    taxes = _taxes(rules, **scenario)
+    basis = 900000 * 1.04
+    # Mid-month convention: the first rental month counts half.
+    depreciation = basis * 0.8 / (12 * 27.5) * (72 - 0.5)
+    assert taxes["depreciation"] == pytest.approx(depreciation)
+    assert taxes["recapture_tax"] == pytest.approx(depreciation * 0.25)
+
+    # With the sale below the depreciated basis nothing is recaptured.
+    loss = _taxes(rules, **_rental_scenario(home_appreciation_annual=-0.10))
+    assert loss["recapture_tax"] == 0 and loss["capital_gains_tax"] == 0
+
+
+def _sale_gain(months, appreciation):
+    return 900000 * (1 + appreciation) ** (months / 12) * 0.94 - 900000 * 1.04
+
+
+@pytest.mark.parametrize("live_in, rent_out, eligible", [
+    (36, 0, True),     # lived in 36 months
+    (12, 0, False),    # short of the 24-month use test
+    (24, 36, True),    # 24 of the last 60 months
+    (24, 48, False),   # moved out too long before the sale
+])
+def test_residence_exclusion_use_test(live_in, rent_out, eligible):
+    rules = TaxRules(residence_exclusion=100000.0)
+    taxes = _taxes(rules, months_live_in=live_in, months_rent_out=rent_out, home_appreciation_annual=0.10)
+    # The gain over the original basis; the depreciated part is recapture.
+    gain = _sale_gain(live_in + rent_out, 0.10)
+    exclusion = rules.residence_exclusion if eligible else 0.0
+    assert taxes["capital_gains_tax"] == pytest.approx(max(gain - exclusion, 0.0) * 0.15)
+
+
+def test_gain_under_the_exclusion_is_tax_free():
+    taxes = _taxes(TaxRules(), months_live_in=36, months_rent_out=0, home_appreciation_annual=0.10)
+    assert 0 < _sale_gain(36, 0.10) < 500000
+    assert taxes["capital_gains_tax"] == 0 and taxes["sale_taxes"] == 0